@@ -0,0 +1,160 @@
+-- Roles, páginas y permisos por rol (antes se creaban en cada
+-- carga de pages/9_Configuracion.py), con los valores iniciales.
+
+CREATE TABLE IF NOT EXISTS roles (
+    rol_id SERIAL PRIMARY KEY,
+    clave VARCHAR(50) UNIQUE NOT NULL,
+    nombre VARCHAR(100) NOT NULL,
+    descripcion TEXT,
+    activo BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS paginas_sistema (
+    pagina_id SERIAL PRIMARY KEY,
+    clave VARCHAR(100) UNIQUE NOT NULL,
+    nombre VARCHAR(100) NOT NULL,
+    ruta VARCHAR(200),
+    orden INTEGER DEFAULT 0,
+    activo BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS permisos_rol_pagina (
+    permiso_id SERIAL PRIMARY KEY,
+    rol_id INTEGER REFERENCES roles(rol_id) ON DELETE CASCADE,
+    pagina_id INTEGER REFERENCES paginas_sistema(pagina_id) ON DELETE CASCADE,
+    puede_ver BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT NOW(),
+    UNIQUE (rol_id, pagina_id)
+);
+
+INSERT INTO roles
+(
+    clave,
+    nombre,
+    descripcion,
+    activo
+)
+VALUES
+(
+    'admin',
+    'Administrador',
+    'Acceso completo al sistema',
+    TRUE
+),
+(
+    'empleado',
+    'Empleado',
+    'Acceso operativo limitado',
+    TRUE
+)
+ON CONFLICT (clave) DO NOTHING;
+
+INSERT INTO roles
+(
+    clave,
+    nombre,
+    descripcion,
+    activo
+)
+SELECT DISTINCT
+    LOWER(TRIM(rol)) AS clave,
+    INITCAP(LOWER(TRIM(rol))) AS nombre,
+    'Rol existente importado desde usuarios' AS descripcion,
+    TRUE AS activo
+FROM usuarios
+WHERE rol IS NOT NULL
+AND TRIM(rol) <> ''
+ON CONFLICT (clave) DO NOTHING;
+
+INSERT INTO paginas_sistema
+(
+    clave,
+    nombre,
+    ruta,
+    orden,
+    activo
+)
+VALUES
+(
+    'dashboard',
+    'Dashboard',
+    'pages/1_Dashboard_Farmacias.py',
+    1,
+    TRUE
+),
+(
+    'consulta_financiera',
+    'Consulta Financiera',
+    'pages/2_Consulta_Financiera.py',
+    2,
+    TRUE
+),
+(
+    'registros',
+    'Registros',
+    'pages/3_Registros.py',
+    3,
+    TRUE
+),
+(
+    'administracion_facturas',
+    'Administración de Facturas',
+    'pages/4_Administracion_Facturas.py',
+    4,
+    TRUE
+),
+(
+    'configuracion',
+    'Configuración',
+    'pages/9_Configuracion.py',
+    5,
+    TRUE
+)
+ON CONFLICT (clave) DO UPDATE SET
+    nombre = EXCLUDED.nombre,
+    ruta = EXCLUDED.ruta,
+    orden = EXCLUDED.orden,
+    activo = TRUE;
+
+INSERT INTO permisos_rol_pagina
+(
+    rol_id,
+    pagina_id,
+    puede_ver
+)
+SELECT
+    r.rol_id,
+    p.pagina_id,
+    TRUE
+FROM roles r
+CROSS JOIN paginas_sistema p
+WHERE r.clave IN ('admin', 'administrador')
+ON CONFLICT (rol_id, pagina_id)
+DO UPDATE SET
+    puede_ver = TRUE;
+
+INSERT INTO permisos_rol_pagina
+(
+    rol_id,
+    pagina_id,
+    puede_ver
+)
+SELECT
+    r.rol_id,
+    p.pagina_id,
+    CASE
+        WHEN p.clave IN (
+            'dashboard',
+            'registros',
+            'administracion_facturas'
+        )
+        THEN TRUE
+        ELSE FALSE
+    END
+FROM roles r
+CROSS JOIN paginas_sistema p
+WHERE r.clave = 'empleado'
+ON CONFLICT (rol_id, pagina_id)
+DO NOTHING;
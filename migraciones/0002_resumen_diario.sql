@@ -0,0 +1,241 @@
+-- resumen_diario: una fila por farmacia y día con los totales de
+-- ventas y gastos, mantenida por triggers (utils/resumen_diario.py).
+-- Se llena con lo que ya hay en ventas y gastos.
+
+CREATE TABLE IF NOT EXISTS resumen_diario (
+    farmacia_id INTEGER NOT NULL,
+    fecha DATE NOT NULL,
+    ventas_totales NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    venta_tarjeta NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    venta_efectivo NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    gastos_fijos NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    gastos_variables NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    gastos_total NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    registros_ventas INTEGER NOT NULL DEFAULT 0,
+    registros_gastos INTEGER NOT NULL DEFAULT 0,
+    actualizado_en TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (farmacia_id, fecha)
+);
+
+CREATE INDEX IF NOT EXISTS idx_resumen_diario_fecha
+    ON resumen_diario (fecha);
+
+CREATE OR REPLACE FUNCTION resumen_diario_aplicar(
+    p_farmacia_id INTEGER,
+    p_fecha DATE,
+    p_ventas NUMERIC,
+    p_tarjeta NUMERIC,
+    p_efectivo NUMERIC,
+    p_gastos_fijos NUMERIC,
+    p_gastos_variables NUMERIC,
+    p_gastos_total NUMERIC,
+    p_registros_ventas INTEGER,
+    p_registros_gastos INTEGER
+)
+RETURNS VOID AS $$
+BEGIN
+    IF p_farmacia_id IS NULL OR p_fecha IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO resumen_diario AS r (
+        farmacia_id,
+        fecha,
+        ventas_totales,
+        venta_tarjeta,
+        venta_efectivo,
+        gastos_fijos,
+        gastos_variables,
+        gastos_total,
+        registros_ventas,
+        registros_gastos,
+        actualizado_en
+    )
+    VALUES (
+        p_farmacia_id,
+        p_fecha,
+        p_ventas,
+        p_tarjeta,
+        p_efectivo,
+        p_gastos_fijos,
+        p_gastos_variables,
+        p_gastos_total,
+        p_registros_ventas,
+        p_registros_gastos,
+        NOW()
+    )
+    ON CONFLICT (farmacia_id, fecha) DO UPDATE
+    SET
+        ventas_totales = r.ventas_totales + EXCLUDED.ventas_totales,
+        venta_tarjeta = r.venta_tarjeta + EXCLUDED.venta_tarjeta,
+        venta_efectivo = r.venta_efectivo + EXCLUDED.venta_efectivo,
+        gastos_fijos = r.gastos_fijos + EXCLUDED.gastos_fijos,
+        gastos_variables = r.gastos_variables + EXCLUDED.gastos_variables,
+        gastos_total = r.gastos_total + EXCLUDED.gastos_total,
+        registros_ventas = r.registros_ventas + EXCLUDED.registros_ventas,
+        registros_gastos = r.registros_gastos + EXCLUDED.registros_gastos,
+        actualizado_en = NOW();
+
+    DELETE FROM resumen_diario
+    WHERE farmacia_id = p_farmacia_id
+    AND fecha = p_fecha
+    AND registros_ventas <= 0
+    AND registros_gastos <= 0;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION resumen_diario_trigger_ventas()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM resumen_diario_aplicar(
+            OLD.farmacia_id,
+            OLD.fecha::DATE,
+            -COALESCE(OLD.ventas_totales, 0),
+            -COALESCE(OLD.venta_tarjeta, 0),
+            -GREATEST(
+                COALESCE(OLD.ventas_totales, 0)
+                - COALESCE(OLD.venta_tarjeta, 0),
+                0
+            ),
+            0,
+            0,
+            0,
+            -1,
+            0
+        );
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM resumen_diario_aplicar(
+            NEW.farmacia_id,
+            NEW.fecha::DATE,
+            COALESCE(NEW.ventas_totales, 0),
+            COALESCE(NEW.venta_tarjeta, 0),
+            GREATEST(
+                COALESCE(NEW.ventas_totales, 0)
+                - COALESCE(NEW.venta_tarjeta, 0),
+                0
+            ),
+            0,
+            0,
+            0,
+            1,
+            0
+        );
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION resumen_diario_trigger_gastos()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM resumen_diario_aplicar(
+            OLD.farmacia_id,
+            OLD.fecha::DATE,
+            0,
+            0,
+            0,
+            -CASE WHEN LOWER(OLD.tipo_gasto) = 'fijo' THEN COALESCE(OLD.monto, 0) ELSE 0 END,
+            -CASE WHEN LOWER(OLD.tipo_gasto) = 'fijo' THEN 0 ELSE COALESCE(OLD.monto, 0) END,
+            -COALESCE(OLD.monto, 0),
+            0,
+            -1
+        );
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM resumen_diario_aplicar(
+            NEW.farmacia_id,
+            NEW.fecha::DATE,
+            0,
+            0,
+            0,
+            CASE WHEN LOWER(NEW.tipo_gasto) = 'fijo' THEN COALESCE(NEW.monto, 0) ELSE 0 END,
+            CASE WHEN LOWER(NEW.tipo_gasto) = 'fijo' THEN 0 ELSE COALESCE(NEW.monto, 0) END,
+            COALESCE(NEW.monto, 0),
+            0,
+            1
+        );
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_resumen_diario_ventas
+AFTER INSERT OR UPDATE OR DELETE ON ventas
+FOR EACH ROW
+EXECUTE FUNCTION resumen_diario_trigger_ventas();
+
+CREATE TRIGGER trg_resumen_diario_gastos
+AFTER INSERT OR UPDATE OR DELETE ON gastos
+FOR EACH ROW
+EXECUTE FUNCTION resumen_diario_trigger_gastos();
+
+LOCK TABLE ventas, gastos IN SHARE MODE;
+
+INSERT INTO resumen_diario (
+    farmacia_id,
+    fecha,
+    ventas_totales,
+    venta_tarjeta,
+    venta_efectivo,
+    gastos_fijos,
+    gastos_variables,
+    gastos_total,
+    registros_ventas,
+    registros_gastos,
+    actualizado_en
+)
+SELECT
+    farmacia_id,
+    fecha,
+    SUM(ventas_totales),
+    SUM(venta_tarjeta),
+    SUM(venta_efectivo),
+    SUM(gastos_fijos),
+    SUM(gastos_variables),
+    SUM(gastos_total),
+    SUM(registros_ventas),
+    SUM(registros_gastos),
+    NOW()
+FROM (
+    SELECT
+        farmacia_id,
+        fecha::DATE AS fecha,
+        COALESCE(ventas_totales, 0) AS ventas_totales,
+        COALESCE(venta_tarjeta, 0) AS venta_tarjeta,
+        GREATEST(
+            COALESCE(ventas_totales, 0)
+            - COALESCE(venta_tarjeta, 0),
+            0
+        ) AS venta_efectivo,
+        0 AS gastos_fijos,
+        0 AS gastos_variables,
+        0 AS gastos_total,
+        1 AS registros_ventas,
+        0 AS registros_gastos
+    FROM ventas
+
+    UNION ALL
+
+    SELECT
+        farmacia_id,
+        fecha::DATE AS fecha,
+        0,
+        0,
+        0,
+        CASE WHEN LOWER(tipo_gasto) = 'fijo' THEN COALESCE(monto, 0) ELSE 0 END,
+        CASE WHEN LOWER(tipo_gasto) = 'fijo' THEN 0 ELSE COALESCE(monto, 0) END,
+        COALESCE(monto, 0),
+        0,
+        1
+    FROM gastos
+) movimientos
+WHERE farmacia_id IS NOT NULL
+AND fecha IS NOT NULL
+GROUP BY farmacia_id, fecha;
@@ -0,0 +1,97 @@
+-- Catálogo de periodos (año y mes) con ventas, gastos o facturas
+-- (utils/periodos.py). Solo guarda qué periodos existen; triggers por
+-- sentencia agregan los nuevos y los que se quedan vacíos se podan con
+-- python -m utils.periodos --podar. Se llena con los periodos que ya
+-- hay.
+
+CREATE TABLE IF NOT EXISTS periodos_disponibles (
+    origen VARCHAR(20) NOT NULL,
+    anio INTEGER NOT NULL,
+    mes INTEGER NOT NULL,
+    PRIMARY KEY (origen, anio, mes)
+);
+
+-- TG_ARGV[0]: origen, TG_ARGV[1]: columna de fecha de la tabla.
+-- Una vez por sentencia, con las filas nuevas en la tabla de
+-- transición "nuevas".
+CREATE OR REPLACE FUNCTION periodos_disponibles_registrar()
+RETURNS TRIGGER AS $$
+BEGIN
+    EXECUTE format(
+        'INSERT INTO periodos_disponibles (origen, anio, mes)
+         SELECT DISTINCT
+             %1$L,
+             EXTRACT(YEAR FROM %2$I)::INT,
+             EXTRACT(MONTH FROM %2$I)::INT
+         FROM nuevas
+         WHERE %2$I IS NOT NULL
+         ON CONFLICT (origen, anio, mes) DO NOTHING',
+        TG_ARGV[0],
+        TG_ARGV[1]
+    );
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_periodos_ventas_alta
+AFTER INSERT ON ventas
+REFERENCING NEW TABLE AS nuevas
+FOR EACH STATEMENT
+EXECUTE FUNCTION periodos_disponibles_registrar('ventas', 'fecha');
+
+CREATE TRIGGER trg_periodos_ventas_cambio
+AFTER UPDATE ON ventas
+REFERENCING NEW TABLE AS nuevas
+FOR EACH STATEMENT
+EXECUTE FUNCTION periodos_disponibles_registrar('ventas', 'fecha');
+
+CREATE TRIGGER trg_periodos_gastos_alta
+AFTER INSERT ON gastos
+REFERENCING NEW TABLE AS nuevas
+FOR EACH STATEMENT
+EXECUTE FUNCTION periodos_disponibles_registrar('gastos', 'fecha');
+
+CREATE TRIGGER trg_periodos_gastos_cambio
+AFTER UPDATE ON gastos
+REFERENCING NEW TABLE AS nuevas
+FOR EACH STATEMENT
+EXECUTE FUNCTION periodos_disponibles_registrar('gastos', 'fecha');
+
+CREATE TRIGGER trg_periodos_facturas_alta
+AFTER INSERT ON facturas
+REFERENCING NEW TABLE AS nuevas
+FOR EACH STATEMENT
+EXECUTE FUNCTION periodos_disponibles_registrar('facturas', 'fecha_factura');
+
+CREATE TRIGGER trg_periodos_facturas_cambio
+AFTER UPDATE ON facturas
+REFERENCING NEW TABLE AS nuevas
+FOR EACH STATEMENT
+EXECUTE FUNCTION periodos_disponibles_registrar('facturas', 'fecha_factura');
+
+LOCK TABLE ventas, gastos, facturas IN SHARE MODE;
+
+INSERT INTO periodos_disponibles (origen, anio, mes)
+SELECT DISTINCT
+    'ventas',
+    EXTRACT(YEAR FROM fecha)::INT,
+    EXTRACT(MONTH FROM fecha)::INT
+FROM ventas
+WHERE fecha IS NOT NULL;
+
+INSERT INTO periodos_disponibles (origen, anio, mes)
+SELECT DISTINCT
+    'gastos',
+    EXTRACT(YEAR FROM fecha)::INT,
+    EXTRACT(MONTH FROM fecha)::INT
+FROM gastos
+WHERE fecha IS NOT NULL;
+
+INSERT INTO periodos_disponibles (origen, anio, mes)
+SELECT DISTINCT
+    'facturas',
+    EXTRACT(YEAR FROM fecha_factura)::INT,
+    EXTRACT(MONTH FROM fecha_factura)::INT
+FROM facturas
+WHERE fecha_factura IS NOT NULL;
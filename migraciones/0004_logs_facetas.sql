@@ -0,0 +1,35 @@
+-- Pares (usuario, acción) para los filtros del visor de logs
+-- (utils/logs_facetas.py), mantenidos por un trigger por sentencia.
+-- Se llena con los pares que ya hay en logs_auditoria.
+
+CREATE TABLE IF NOT EXISTS logs_facetas (
+    usuario_nombre TEXT NOT NULL DEFAULT '',
+    accion TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (usuario_nombre, accion)
+);
+
+CREATE OR REPLACE FUNCTION logs_facetas_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO logs_facetas (usuario_nombre, accion)
+    SELECT DISTINCT
+        COALESCE(usuario_nombre, ''),
+        COALESCE(accion, '')
+    FROM nuevos
+    ON CONFLICT DO NOTHING;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_logs_facetas
+AFTER INSERT ON logs_auditoria
+REFERENCING NEW TABLE AS nuevos
+FOR EACH STATEMENT
+EXECUTE FUNCTION logs_facetas_trigger();
+
+INSERT INTO logs_facetas (usuario_nombre, accion)
+SELECT DISTINCT
+    COALESCE(usuario_nombre, ''),
+    COALESCE(accion, '')
+FROM logs_auditoria;
@@ -0,0 +1,12 @@
+-- Versión de los permisos por rol (utils/permisos.py): se incrementa al
+-- guardarlos y cada proceso del servidor la consulta para saber cuándo
+-- recargar su cache.
+
+CREATE TABLE IF NOT EXISTS permisos_version (
+    unica BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (unica),
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO permisos_version (unica, version)
+VALUES (TRUE, 0)
+ON CONFLICT (unica) DO NOTHING;
@@ -0,0 +1,6 @@
+-- Versión de sesión por usuario (utils/sesiones.py): al modificar o
+-- desactivar un usuario se incrementa y los tokens de "Recordarme"
+-- emitidos antes dejan de servir.
+
+ALTER TABLE usuarios
+ADD COLUMN IF NOT EXISTS sesion_version INTEGER NOT NULL DEFAULT 0;
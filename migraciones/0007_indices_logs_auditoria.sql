@@ -0,0 +1,12 @@
+-- pg_trgm para las búsquedas con ILIKE '%x%' e índices del visor de
+-- logs. logs_auditoria puede estar particionada (utils/logs_particiones.py),
+-- donde no se admite CONCURRENTLY; el bloqueo mientras se crean solo
+-- detiene al escritor de logs, que sigue acumulando en su spool.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_logs_auditoria_fecha_id
+ON logs_auditoria (fecha DESC, log_id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_logs_auditoria_descripcion_trgm
+ON logs_auditoria USING gin (descripcion gin_trgm_ops);
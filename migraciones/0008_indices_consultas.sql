@@ -0,0 +1,39 @@
+-- sin transacción
+-- Índices de las consultas más usadas, con CREATE INDEX CONCURRENTLY
+-- para no bloquear escrituras.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_facturas_estatus_vencimiento
+ON facturas (estatus, fecha_vencimiento);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_facturas_proveedor_fecha
+ON facturas (proveedor_id, fecha_factura);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_facturas_fecha_factura
+ON facturas (fecha_factura);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_facturas_folio_trgm
+ON facturas USING gin (folio gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ventas_farmacia_fecha
+ON ventas (farmacia_id, fecha);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_gastos_farmacia_fecha
+ON gastos (farmacia_id, fecha);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ventas_fecha_id
+ON ventas (fecha DESC, venta_id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_gastos_fecha_id
+ON gastos (fecha DESC, gasto_id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ventas_created_id
+ON ventas ((COALESCE(created_at, TIMESTAMP '1900-01-01')) DESC, venta_id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_gastos_created_id
+ON gastos ((COALESCE(created_at, TIMESTAMP '1900-01-01')) DESC, gasto_id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_gastos_folio_trgm
+ON gastos USING gin (folio gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_gastos_descripcion_trgm
+ON gastos USING gin (descripcion gin_trgm_ops);
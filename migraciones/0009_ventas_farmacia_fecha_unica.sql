@@ -0,0 +1,23 @@
+-- independiente
+-- Una sola venta por farmacia y día. Registros la usa con
+-- INSERT ... ON CONFLICT DO NOTHING en lugar de consultar cada farmacia.
+-- Si ya hay duplicados la migración falla y queda pendiente, sin
+-- detener a las demás: hay que resolverlos primero (SELECT farmacia_id,
+-- fecha, COUNT(*) FROM ventas GROUP BY 1, 2 HAVING COUNT(*) > 1).
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1
+        FROM ventas
+        GROUP BY farmacia_id, fecha
+        HAVING COUNT(*) > 1
+    ) THEN
+        RAISE EXCEPTION 'Hay ventas duplicadas por farmacia y fecha; resuélvelas antes de aplicar esta migración.';
+    END IF;
+
+    ALTER TABLE ventas
+    ADD CONSTRAINT ventas_farmacia_fecha_unica
+    UNIQUE (farmacia_id, fecha);
+END
+$$;
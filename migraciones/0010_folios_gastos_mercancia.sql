@@ -0,0 +1,27 @@
+-- independiente
+-- Folio único por farmacia en los gastos de Mercancía, sin distinguir
+-- mayúsculas, en lugar de consultar antes de insertar (dos capturas
+-- simultáneas podían pasar la consulta). Registros inserta directo y
+-- traduce la violación al mensaje de siempre.
+-- Si ya hay duplicados la migración falla y queda pendiente, sin
+-- detener a las demás: hay que resolverlos primero (SELECT farmacia_id,
+-- UPPER(folio), COUNT(*) FROM gastos WHERE categoria = 'Mercancia'
+-- GROUP BY 1, 2 HAVING COUNT(*) > 1).
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1
+        FROM gastos
+        WHERE categoria = 'Mercancia'
+        GROUP BY farmacia_id, UPPER(folio)
+        HAVING COUNT(*) > 1
+    ) THEN
+        RAISE EXCEPTION 'Hay gastos de mercancía con el mismo folio en una farmacia; resuélvelos antes de aplicar esta migración.';
+    END IF;
+END
+$$;
+
+CREATE UNIQUE INDEX IF NOT EXISTS gastos_mercancia_folio_unico
+ON gastos (farmacia_id, UPPER(folio))
+WHERE categoria = 'Mercancia';
@@ -0,0 +1,23 @@
+-- independiente
+-- Folio único por proveedor en facturas, sin distinguir mayúsculas, en
+-- lugar de consultar antes de insertar. Administración de facturas
+-- inserta directo y traduce la violación al mensaje de siempre.
+-- Si ya hay duplicados la migración falla y queda pendiente, sin
+-- detener a las demás: hay que resolverlos primero (SELECT proveedor_id,
+-- UPPER(folio), COUNT(*) FROM facturas GROUP BY 1, 2 HAVING COUNT(*) > 1).
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1
+        FROM facturas
+        GROUP BY proveedor_id, UPPER(folio)
+        HAVING COUNT(*) > 1
+    ) THEN
+        RAISE EXCEPTION 'Hay facturas con el mismo folio para un proveedor; resuélvelas antes de aplicar esta migración.';
+    END IF;
+END
+$$;
+
+CREATE UNIQUE INDEX IF NOT EXISTS facturas_proveedor_folio_unico
+ON facturas (proveedor_id, UPPER(folio));
@@ -5,8 +5,17 @@ import plotly.express as px
 from datetime import datetime, timedelta, date
 from calendar import monthrange
 
+from utils.agregaciones import cargar_agregados_periodo
+from utils.cache_datos import consultar_con_cache
 from utils.conexionASupabase import get_connection
+from utils.navegacion import cerrar_sesion, ir_a_login
+from utils.periodos import (
+    anios_de_periodos,
+    cargar_periodos,
+    meses_de_periodos
+)
 from utils.permisos import validar_acceso_pagina
+from utils.resumen_diario import cargar_resumen_diario
 from reports.reporte_financiero import generar_reporte_financiero
 
 
@@ -21,7 +30,7 @@ st.set_page_config(
 # ==================================================
 
 if "usuario" not in st.session_state:
-    st.switch_page("streamlit_app.py")
+    ir_a_login()
 
 
 # ==================================================
@@ -181,137 +190,21 @@ def obtener_etiqueta_periodo(anio_sel, mes_sel, farmacia_sel):
     return periodo
 
 
-def construir_where(alias_tabla, farmacia_sel, fecha_inicio, fecha_fin):
-    condiciones = []
-    parametros = []
-
-    if farmacia_sel != "Todas":
-        condiciones.append("f.nombre = %s")
-        parametros.append(farmacia_sel)
-
-    if fecha_inicio is not None and fecha_fin is not None:
-        condiciones.append(f"{alias_tabla}.fecha >= %s")
-        parametros.append(fecha_inicio)
-
-        condiciones.append(f"{alias_tabla}.fecha < %s")
-        parametros.append(fecha_fin)
-
-    if condiciones:
-        where_sql = "WHERE " + " AND ".join(condiciones)
-    else:
-        where_sql = ""
-
-    return where_sql, parametros
-
-
 def cargar_ventas(conn, farmacia_sel, fecha_inicio, fecha_fin):
-    where_sql, parametros = construir_where(
-        "v",
-        farmacia_sel,
-        fecha_inicio,
-        fecha_fin
-    )
-
-    query = f"""
-        SELECT
-            v.venta_id,
-            f.farmacia_id,
-            f.nombre AS farmacia,
-            f.estado AS estado_farmacia,
-
-            COALESCE(
-                v.ventas_totales,
-                0
-            ) AS ventas_totales,
-
-            COALESCE(
-                v.venta_tarjeta,
-                0
-            ) AS venta_tarjeta,
-
-            GREATEST(
-                COALESCE(v.ventas_totales, 0)
-                - COALESCE(v.venta_tarjeta, 0),
-                0
-            ) AS venta_efectivo,
-
-            v.tipo_registro,
-            v.fecha
-
-        FROM ventas v
-
-        JOIN farmacias f
-            ON v.farmacia_id = f.farmacia_id
-
-        {where_sql}
-
-        ORDER BY v.fecha;
-    """
-
-    df = pd.read_sql(
-        query,
+    # Ventas diarias por farmacia desde resumen_diario:
+    # una fila por farmacia y día con venta registrada.
+    return cargar_resumen_diario(
         conn,
-        params=tuple(parametros)
-    )
-
-    df["fecha"] = pd.to_datetime(
-        df["fecha"],
-        errors="coerce"
-    )
-
-    columnas_numericas = [
-        "ventas_totales",
-        "venta_efectivo",
-        "venta_tarjeta"
-    ]
-
-    for columna in columnas_numericas:
-        df[columna] = pd.to_numeric(
-            df[columna],
-            errors="coerce"
-        ).fillna(0)
-
-    return df
-
-
-def cargar_gastos(conn, farmacia_sel, fecha_inicio, fecha_fin):
-    where_sql, parametros = construir_where(
-        "g",
-        farmacia_sel,
         fecha_inicio,
-        fecha_fin
-    )
-
-    query = f"""
-        SELECT
-            g.gasto_id,
-            f.farmacia_id,
-            f.nombre AS farmacia,
-            f.estado AS estado_farmacia,
-            COALESCE(g.monto, 0) AS monto,
-            g.fecha,
-            g.tipo_gasto,
-            g.categoria
-        FROM gastos g
-        JOIN farmacias f
-            ON g.farmacia_id = f.farmacia_id
-        {where_sql}
-        ORDER BY g.fecha;
-    """
-
-    df = pd.read_sql(
-        query,
-        conn,
-        params=tuple(parametros)
-    )
-
-    df["fecha"] = pd.to_datetime(
-        df["fecha"],
-        errors="coerce"
+        fecha_fin,
+        farmacias=(
+            None
+            if farmacia_sel == "Todas"
+            else [farmacia_sel]
+        ),
+        solo_ventas=True
     )
 
-    return df
-
 
 def cargar_catalogos(conn):
     df_farmacias = pd.read_sql("""
@@ -324,63 +217,20 @@ def cargar_catalogos(conn):
         ORDER BY nombre;
     """, conn)
 
-    df_anios = pd.read_sql("""
-        SELECT DISTINCT
-            EXTRACT(YEAR FROM fecha)::INT AS anio
-        FROM ventas
-        WHERE fecha IS NOT NULL
-
-        UNION
-
-        SELECT DISTINCT
-            EXTRACT(YEAR FROM fecha)::INT AS anio
-        FROM gastos
-        WHERE fecha IS NOT NULL
-
-        ORDER BY anio DESC;
-    """, conn)
-
-    return df_farmacias, df_anios
-
-
-def cargar_meses_disponibles(conn, anio_sel):
-    if anio_sel == "Todos":
-        df_meses = pd.read_sql("""
-            SELECT DISTINCT
-                EXTRACT(MONTH FROM fecha)::INT AS mes
-            FROM ventas
-            WHERE fecha IS NOT NULL
-
-            UNION
-
-            SELECT DISTINCT
-                EXTRACT(MONTH FROM fecha)::INT AS mes
-            FROM gastos
-            WHERE fecha IS NOT NULL
-
-            ORDER BY mes;
-        """, conn)
-
-    else:
-        df_meses = pd.read_sql("""
-            SELECT DISTINCT
-                EXTRACT(MONTH FROM fecha)::INT AS mes
-            FROM ventas
-            WHERE fecha IS NOT NULL
-            AND EXTRACT(YEAR FROM fecha)::INT = %s
-
-            UNION
+    # Años y meses desde el catálogo de periodos (utils/periodos.py)
+    df_periodos = cargar_periodos(
+        conn,
+        ["ventas", "gastos"]
+    )
 
-            SELECT DISTINCT
-                EXTRACT(MONTH FROM fecha)::INT AS mes
-            FROM gastos
-            WHERE fecha IS NOT NULL
-            AND EXTRACT(YEAR FROM fecha)::INT = %s
+    return df_farmacias, df_periodos
 
-            ORDER BY mes;
-        """, conn, params=(int(anio_sel), int(anio_sel)))
 
-    meses = df_meses["mes"].dropna().astype(int).tolist()
+def cargar_meses_disponibles(df_periodos, anio_sel):
+    meses = meses_de_periodos(
+        df_periodos,
+        None if anio_sel == "Todos" else anio_sel
+    )
 
     if not meses:
         meses = list(range(1, 13))
@@ -389,79 +239,14 @@ def cargar_meses_disponibles(conn, anio_sel):
 
 
 def crear_dataframe_rendimiento(
-    df_ventas,
-    df_gastos,
+    df_totales_farmacia,
     df_farmacias
 ):
-    if not df_ventas.empty:
-
-        ventas_farmacia = (
-            df_ventas
-            .groupby(
-                "farmacia",
-                as_index=False
-            )
-            .agg(
-                ventas_totales=(
-                    "ventas_totales",
-                    "sum"
-                ),
-                venta_efectivo=(
-                    "venta_efectivo",
-                    "sum"
-                ),
-                venta_tarjeta=(
-                    "venta_tarjeta",
-                    "sum"
-                )
-            )
-        )
-
-    else:
-
-        ventas_farmacia = pd.DataFrame(columns=[
-            "farmacia",
-            "ventas_totales",
-            "venta_efectivo",
-            "venta_tarjeta"
-        ])
-
-    gastos_farmacia = (
-        df_gastos
-        .groupby(
-            "farmacia",
-            as_index=False
-        )["monto"]
-        .sum()
-        if not df_gastos.empty
-        else pd.DataFrame(columns=[
-            "farmacia",
-            "monto"
-        ])
-    )
+    # Los totales por farmacia ya vienen sumados desde Postgres
+    # (ver cargar_agregados_periodo); aquí solo se calculan los
+    # indicadores derivados.
 
-    df_rendimiento = ventas_farmacia.merge(
-        gastos_farmacia,
-        on="farmacia",
-        how="outer"
-    )
-
-    columnas_numericas = [
-        "ventas_totales",
-        "venta_efectivo",
-        "venta_tarjeta",
-        "monto"
-    ]
-
-    for columna in columnas_numericas:
-
-        if columna not in df_rendimiento.columns:
-            df_rendimiento[columna] = 0
-
-        df_rendimiento[columna] = (
-            df_rendimiento[columna]
-            .fillna(0)
-        )
+    df_rendimiento = df_totales_farmacia.copy()
 
     df_rendimiento["utilidad"] = (
         df_rendimiento["ventas_totales"]
@@ -600,7 +385,7 @@ def validar_registros_faltantes(
 # CATÁLOGOS Y FILTROS
 # ==================================================
 
-df_farmacias, df_anios = cargar_catalogos(conn)
+df_farmacias, df_periodos = cargar_catalogos(conn)
 
 hoy = datetime.today()
 anio_actual = hoy.year
@@ -616,7 +401,7 @@ farmacia_sel = st.sidebar.selectbox(
     key="dashboard_filtro_farmacia"
 )
 
-anios_disponibles = df_anios["anio"].dropna().astype(int).tolist()
+anios_disponibles = anios_de_periodos(df_periodos)
 
 if not anios_disponibles:
     anios_disponibles = [anio_actual]
@@ -637,7 +422,7 @@ anio_sel = st.sidebar.selectbox(
 )
 
 meses_disponibles = cargar_meses_disponibles(
-    conn,
+    df_periodos,
     anio_sel
 )
 
@@ -674,8 +459,7 @@ if st.sidebar.button(
     "Cerrar sesión",
     key="btn_cerrar_sesion_dashboard"
 ):
-    st.session_state.clear()
-    st.switch_page("streamlit_app.py")
+    cerrar_sesion()
 
 
 # ==================================================
@@ -687,20 +471,6 @@ fecha_inicio, fecha_fin = obtener_fechas_periodo(
     mes_sel
 )
 
-df_ventas = cargar_ventas(
-    conn,
-    farmacia_sel,
-    fecha_inicio,
-    fecha_fin
-)
-
-df_gastos = cargar_gastos(
-    conn,
-    farmacia_sel,
-    fecha_inicio,
-    fecha_fin
-)
-
 periodo_kpi = obtener_etiqueta_periodo(
     anio_sel,
     mes_sel,
@@ -712,23 +482,60 @@ fecha_inicio_ant, fecha_fin_ant, etiqueta_periodo_anterior = obtener_periodo_ant
     mes_sel
 )
 
-df_ventas_ant = pd.DataFrame()
-df_gastos_ant = pd.DataFrame()
+# Totales, rendimiento por farmacia y gastos por categoría
+# (periodo actual y anterior) en una sola consulta agregada.
+# Los resultados se comparten entre sesiones (utils/cache_datos.py);
+# Registros los invalida al escribir en esa farmacia y fecha.
+farmacias_cache = (
+    None
+    if farmacia_sel == "Todas"
+    else [farmacia_sel]
+)
 
-if fecha_inicio_ant is not None and fecha_fin_ant is not None:
-    df_ventas_ant = cargar_ventas(
-        conn,
+agregados = consultar_con_cache(
+    "dashboard_agregados",
+    (
         farmacia_sel,
+        fecha_inicio,
+        fecha_fin,
         fecha_inicio_ant,
         fecha_fin_ant
-    )
-
-    df_gastos_ant = cargar_gastos(
+    ),
+    lambda: cargar_agregados_periodo(
         conn,
         farmacia_sel,
+        fecha_inicio,
+        fecha_fin,
         fecha_inicio_ant,
         fecha_fin_ant
-    )
+    ),
+    farmacias=farmacias_cache,
+    fecha_inicio=fecha_inicio_ant or fecha_inicio,
+    fecha_fin=fecha_fin
+)
+
+resumen_actual = agregados["actual"]
+resumen_anterior = agregados["anterior"]
+
+# Filas diarias de ventas: solo las usan calidad de datos,
+# tendencia, proyección, promedios y el reporte PDF.
+df_ventas = consultar_con_cache(
+    "dashboard_ventas",
+    (
+        farmacia_sel,
+        fecha_inicio,
+        fecha_fin
+    ),
+    lambda: cargar_ventas(
+        conn,
+        farmacia_sel,
+        fecha_inicio,
+        fecha_fin
+    ),
+    farmacias=farmacias_cache,
+    fecha_inicio=fecha_inicio,
+    fecha_fin=fecha_fin
+)
 
 try:
     conn.close()
@@ -743,7 +550,10 @@ except Exception:
 st.title("Dashboard Financiero")
 st.caption(f"Periodo analizado: {periodo_kpi}")
 
-if df_ventas.empty and df_gastos.empty:
+if (
+    resumen_actual["registros_ventas"] == 0
+    and resumen_actual["registros_gastos"] == 0
+):
     st.warning("No hay datos para el periodo seleccionado.")
     st.info(
         "No existen registros de ventas ni gastos en este rango. "
@@ -756,17 +566,17 @@ if df_ventas.empty and df_gastos.empty:
 # 1. RESUMEN EJECUTIVO
 # ==================================================
 
-ventas_total = df_ventas["ventas_totales"].sum()
+ventas_total = resumen_actual["ventas_totales"]
 
 ventas_efectivo_total = (
-    df_ventas["venta_efectivo"].sum()
+    resumen_actual["venta_efectivo"]
 )
 
 ventas_tarjeta_total = (
-    df_ventas["venta_tarjeta"].sum()
+    resumen_actual["venta_tarjeta"]
 )
 
-gastos_total = df_gastos["monto"].sum()
+gastos_total = resumen_actual["monto"]
 
 utilidad = ventas_total - gastos_total
 
@@ -787,26 +597,26 @@ porcentaje_tarjeta = (
 # ----------------------------------
 
 ventas_ant = (
-    df_ventas_ant["ventas_totales"].sum()
-    if not df_ventas_ant.empty
+    resumen_anterior["ventas_totales"]
+    if resumen_anterior
     else 0
 )
 
 ventas_efectivo_ant = (
-    df_ventas_ant["venta_efectivo"].sum()
-    if not df_ventas_ant.empty
+    resumen_anterior["venta_efectivo"]
+    if resumen_anterior
     else 0
 )
 
 ventas_tarjeta_ant = (
-    df_ventas_ant["venta_tarjeta"].sum()
-    if not df_ventas_ant.empty
+    resumen_anterior["venta_tarjeta"]
+    if resumen_anterior
     else 0
 )
 
 gastos_ant = (
-    df_gastos_ant["monto"].sum()
-    if not df_gastos_ant.empty
+    resumen_anterior["monto"]
+    if resumen_anterior
     else 0
 )
 
@@ -1378,8 +1188,7 @@ st.divider()
 st.subheader("Rendimiento por farmacia")
 
 df_rendimiento = crear_dataframe_rendimiento(
-    df_ventas,
-    df_gastos,
+    agregados["rendimiento"],
     df_farmacias
 )
 
@@ -1577,21 +1386,13 @@ st.divider()
 
 st.subheader("Análisis de gastos")
 
-if df_gastos.empty:
+if resumen_actual["registros_gastos"] == 0:
 
     st.info("No hay gastos registrados para el periodo seleccionado.")
 
 else:
 
-    df_gastos_categoria = (
-        df_gastos
-        .assign(
-            categoria=df_gastos["categoria"].fillna("Sin categoría")
-        )
-        .groupby("categoria", as_index=False)["monto"]
-        .sum()
-        .sort_values("monto", ascending=False)
-    )
+    df_gastos_categoria = agregados["categorias"].copy()
 
     df_gastos_categoria["porcentaje"] = (
         df_gastos_categoria["monto"] /
@@ -1654,9 +1455,11 @@ if st.button(
     "Generar reporte PDF",
     key="dashboard_generar_reporte_pdf"
 ):
+    # El reporte solo necesita el gasto total por farmacia,
+    # que ya viene en el rendimiento agregado.
     pdf = generar_reporte_financiero(
         df_ventas,
-        df_gastos,
+        agregados["rendimiento"][["farmacia", "monto"]],
         periodo_kpi
     )
 
@@ -1,15 +1,24 @@
 import streamlit as st
 import pandas as pd
 from io import BytesIO
-from datetime import datetime
+from datetime import datetime, timedelta
 # ===============================
 # FECHA ACTUAL (DEFAULT FILTROS)
 # ===============================
 hoy = datetime.today()
 anio_actual = hoy.year
 mes_actual = hoy.month
+from utils.navegacion import cerrar_sesion, ir_a_login
 from utils.permisos import validar_acceso_pagina
 from utils.conexionASupabase import get_connection
+from utils.filtros import FiltroSQL
+from utils.paginacion import ClaveOrden, PaginadorKeyset
+from utils.periodos import (
+    anios_de_periodos,
+    cargar_periodos,
+    meses_de_periodos
+)
+from utils.resumen_diario import cargar_resumen_diario
 from reports.pdf_gastos import generar_pdf_gastos
 from reports.pdf_resumen import generar_pdf_resumen_financiero
 
@@ -26,7 +35,7 @@ st.title("📄 Consulta Financiera")
 # SEGURIDAD
 # ===============================
 if "usuario" not in st.session_state:
-    st.switch_page("streamlit_app.py")
+    ir_a_login()
 
 if st.session_state["usuario"]["rol"] != "admin":
     st.error("No tienes permisos para esta sección")
@@ -36,40 +45,47 @@ if st.session_state["usuario"]["rol"] != "admin":
 # ===============================
 conn = get_connection()
 validar_acceso_pagina(conn, "consulta_financiera")
-df_ventas = pd.read_sql("""
-    SELECT 
-        v.venta_id,
-        f.nombre AS farmacia,
-
-        COALESCE(
-            v.ventas_totales,
-            0
-        ) AS ventas_totales,
-
-        COALESCE(
-            v.venta_tarjeta,
-            0
-        ) AS venta_tarjeta,
-
-        GREATEST(
-            COALESCE(v.ventas_totales, 0)
-            - COALESCE(v.venta_tarjeta, 0),
-            0
-        ) AS venta_efectivo,
-
-        v.tipo_registro,
-        v.fecha
 
-    FROM ventas v
+# ===============================
+# CONSULTAS FILTRADAS EN SQL
+# ===============================
+
+COLUMNAS_VENTAS = """
+    v.venta_id,
+    f.nombre AS farmacia,
+
+    COALESCE(
+        v.ventas_totales,
+        0
+    ) AS ventas_totales,
+
+    COALESCE(
+        v.venta_tarjeta,
+        0
+    ) AS venta_tarjeta,
 
+    GREATEST(
+        COALESCE(v.ventas_totales, 0)
+        - COALESCE(v.venta_tarjeta, 0),
+        0
+    ) AS venta_efectivo,
+
+    v.tipo_registro,
+    v.fecha
+"""
+
+DESDE_VENTAS = """
+    FROM ventas v
     JOIN farmacias f
         ON v.farmacia_id = f.farmacia_id
+"""
 
-    ORDER BY v.fecha DESC;
-""", conn)
+ORDEN_VENTAS = [
+    ClaveOrden("v.fecha", descendente=True),
+    ClaveOrden("v.venta_id", descendente=True)
+]
 
-df_gastos = pd.read_sql("""
-SELECT
+COLUMNAS_GASTOS = """
     g.gasto_id,
     f.nombre AS farmacia,
     g.monto,
@@ -77,15 +93,55 @@ SELECT
     g.tipo_gasto,
     g.categoria,
     g.descripcion
-FROM gastos g
-JOIN farmacias f ON g.farmacia_id = f.farmacia_id
-ORDER BY g.fecha DESC;
+"""
+
+DESDE_GASTOS = """
+    FROM gastos g
+    JOIN farmacias f
+        ON g.farmacia_id = f.farmacia_id
+"""
+
+ORDEN_GASTOS = [
+    ClaveOrden("g.fecha", descendente=True),
+    ClaveOrden("g.gasto_id", descendente=True)
+]
+
+
+def cargar_ventas(conn, where_sql, parametros):
+    df = pd.read_sql(f"""
+        SELECT {COLUMNAS_VENTAS}
+        {DESDE_VENTAS}
+        {where_sql}
+        ORDER BY v.fecha DESC, v.venta_id DESC;
+    """, conn, params=tuple(parametros))
+
+    df["fecha"] = pd.to_datetime(df["fecha"])
+
+    return df
+
+
+def cargar_gastos(conn, where_sql, parametros):
+    df = pd.read_sql(f"""
+        SELECT {COLUMNAS_GASTOS}
+        {DESDE_GASTOS}
+        {where_sql}
+        ORDER BY g.fecha DESC, g.gasto_id DESC;
+    """, conn, params=tuple(parametros))
+
+    df["fecha"] = pd.to_datetime(df["fecha"])
+
+    return df
+
+
+df_farmacias = pd.read_sql("""
+    SELECT nombre
+    FROM farmacias
+    ORDER BY nombre;
 """, conn)
 
-conn.close()
+farmacias_todas = df_farmacias["nombre"].dropna().tolist()
 
-df_ventas["fecha"] = pd.to_datetime(df_ventas["fecha"])
-df_gastos["fecha"] = pd.to_datetime(df_gastos["fecha"])
+df_periodos = cargar_periodos(conn, ["ventas", "gastos"])
 
 # ===============================
 # TRADUCCIONES MES
@@ -124,10 +180,10 @@ if "pdf_resumen" not in st.session_state:
 # ===============================
 st.sidebar.header("🔎 Filtros")
 
-farmacias = ["Todas"] + sorted(df_ventas["farmacia"].unique())
+farmacias = ["Todas"] + farmacias_todas
 farmacia_sel = st.sidebar.selectbox("Farmacia", farmacias)
 
-anios = ["Todos"] + sorted(df_ventas["fecha"].dt.year.unique())
+anios = ["Todos"] + sorted(anios_de_periodos(df_periodos))
 
 if anio_actual in anios:
     index_anio = anios.index(anio_actual)
@@ -142,7 +198,7 @@ anio_sel = st.sidebar.selectbox(
 
 
 meses = ["Todos"] + [
-    f"{m} - {MESES_ES[m]}" for m in sorted(df_ventas["fecha"].dt.month.unique())
+    f"{m} - {MESES_ES[m]}" for m in meses_de_periodos(df_periodos)
 ]
 
 mes_actual_label = f"{mes_actual} - {MESES_ES[mes_actual]}"
@@ -167,34 +223,46 @@ st.sidebar.success(
 )
 
 if st.sidebar.button("🚪 Cerrar sesión"):
-    st.session_state.clear()
-    st.switch_page("streamlit_app.py")
+    cerrar_sesion()
 
 
 
 # ===============================
 # APLICAR FILTROS
 # ===============================
-df_ventas_filt = df_ventas.copy()
-df_gastos_filt = df_gastos.copy()
+# Los filtros se traducen a un WHERE; cada pestaña consulta
+# solo lo que muestra.
 
 mes_num = None
 if mes_sel != "Todos":
     mes_num = int(mes_sel.split(" - ")[0])
 
+farmacias_filtro = None
 if farmacia_sel != "Todas":
-    df_ventas_filt = df_ventas_filt[df_ventas_filt["farmacia"] == farmacia_sel]
-    df_gastos_filt = df_gastos_filt[df_gastos_filt["farmacia"] == farmacia_sel]
-
-if anio_sel != "Todos":
-    df_ventas_filt = df_ventas_filt[df_ventas_filt["fecha"].dt.year == anio_sel]
-    df_gastos_filt = df_gastos_filt[df_gastos_filt["fecha"].dt.year == anio_sel]
+    farmacias_filtro = [farmacia_sel]
 
-if mes_num is not None:
-    df_ventas_filt = df_ventas_filt[df_ventas_filt["fecha"].dt.month == mes_num]
-    df_gastos_filt = df_gastos_filt[df_gastos_filt["fecha"].dt.month == mes_num]
+anio_filtro = None
 
-# ===============================
+if anio_sel != "Todos":
+    anio_filtro = int(anio_sel)
+
+
+def filtro_periodo(alias_tabla):
+    """
+    Filtro de farmacia y periodo para ventas (v) o gastos (g)
+    unidos a farmacias (f). Cada pestaña agrega lo suyo.
+    """
+
+    return (
+        FiltroSQL()
+        .en_lista("f.nombre", farmacias_filtro)
+        .periodo(
+            f"{alias_tabla}.fecha",
+            anio=anio_filtro,
+            mes=mes_num,
+            anios=anios_de_periodos(df_periodos)
+        )
+    )
 
 
 # ---------------------------------
@@ -233,33 +301,29 @@ with tab_ventas:
     with col2:
         page_size = st.selectbox("Filas por página", [10, 20, 50], key="v_ps")
 
-    if busqueda:
-        df_v = df_ventas_filt[
-            df_ventas_filt["farmacia"]
-            .str.contains(busqueda, case=False, na=False)
-        ]
-    else:
-        df_v = df_ventas_filt.copy()
-
-    df_v = df_v.sort_values("fecha", ascending=False)
-
-    total = len(df_v)
-    total_pages = max(1, (total - 1) // page_size + 1)
+    where_v, parametros_v = (
+        filtro_periodo("v")
+        .contiene("f.nombre", busqueda)
+        .where()
+    )
 
-    page = st.number_input(
-        "Página",
-        1,
-        total_pages,
-        1,
-        key="v_page"
+    paginador_v = PaginadorKeyset(
+        "consulta_ventas_pagina",
+        COLUMNAS_VENTAS,
+        DESDE_VENTAS,
+        ORDEN_VENTAS,
+        where_sql=where_v,
+        parametros=parametros_v,
+        tamano_pagina=page_size,
+        salto_fecha=True
     )
 
-    start = (page - 1) * page_size
-    end = start + page_size
+    df_v = paginador_v.cargar(conn)
+    df_v["fecha"] = pd.to_datetime(df_v["fecha"])
 
-    st.dataframe(df_v.iloc[start:end], use_container_width=True, hide_index=True)
+    st.dataframe(df_v, use_container_width=True, hide_index=True)
 
-    st.caption(f"Página {page} de {total_pages}")
+    paginador_v.mostrar_controles()
 
 # ===============================
 # 🔴 GASTOS
@@ -273,43 +337,52 @@ with tab_gastos:
         buscar_desc = st.text_input("🔍 Buscar descripción")
 
     with c2:
-        categorias = ["Todas"] + sorted(df_gastos_filt["categoria"].dropna().unique())
+        where_categorias, parametros_categorias = filtro_periodo("g").where()
+
+        df_categorias = pd.read_sql(f"""
+            SELECT DISTINCT g.categoria
+            FROM gastos g
+            JOIN farmacias f
+                ON g.farmacia_id = f.farmacia_id
+            {where_categorias}
+            ORDER BY g.categoria;
+        """, conn, params=tuple(parametros_categorias))
+
+        categorias = ["Todas"] + df_categorias["categoria"].dropna().tolist()
         cat_sel = st.selectbox("Categoría", categorias)
 
     with c3:
         page_size = st.selectbox("Filas por página", [10, 20, 50], key="g_ps")
 
-    df_g = df_gastos_filt.copy()
-
-    if buscar_desc:
-        df_g = df_g[df_g["descripcion"].str.contains(buscar_desc, case=False, na=False)]
-
-    if cat_sel != "Todas":
-        df_g = df_g[df_g["categoria"] == cat_sel]
-
-    df_g = df_g.sort_values("fecha", ascending=False)
-
-    total = len(df_g)
-    total_pages = max(1, (total - 1) // page_size + 1)
+    where_g, parametros_g = (
+        filtro_periodo("g")
+        .contiene("g.descripcion", buscar_desc)
+        .igual("g.categoria", None if cat_sel == "Todas" else cat_sel)
+        .where()
+    )
 
-    page = st.number_input(
-        "Página",
-        1,
-        total_pages,
-        1,
-        key="g_page"
+    paginador_g = PaginadorKeyset(
+        "consulta_gastos_pagina",
+        COLUMNAS_GASTOS,
+        DESDE_GASTOS,
+        ORDEN_GASTOS,
+        where_sql=where_g,
+        parametros=parametros_g,
+        tamano_pagina=page_size,
+        salto_fecha=True
     )
 
-    start = (page - 1) * page_size
-    end = start + page_size
+    df_g = paginador_g.cargar(conn)
+    df_g["fecha"] = pd.to_datetime(df_g["fecha"])
 
-    st.dataframe(df_g.iloc[start:end], use_container_width=True, hide_index=True)
+    st.dataframe(df_g, use_container_width=True, hide_index=True)
 
-    st.caption(f"Página {page} de {total_pages}")
+    paginador_g.mostrar_controles()
 
     if st.button("📄 Generar Reporte de Gastos (PDF)"):
+        # Los gastos completos del periodo se leen solo al generar el PDF
         st.session_state["pdf_gastos"] = generar_pdf_gastos(
-            df_gastos_filt,
+            cargar_gastos(conn, *filtro_periodo("g").where()),
             periodo_kpi,
             farmacia_sel
     )
@@ -330,8 +403,15 @@ with tab_gastos:
 with tab_resumen:
     st.subheader("🔵 Resumen del periodo")
 
-    ventas_total = df_ventas_filt["ventas_totales"].sum()
-    gastos_total = df_gastos_filt["monto"].sum()
+    # Totales desde resumen_diario (una fila por farmacia y día), con
+    # el mismo filtro de farmacia y periodo que las otras pestañas.
+    df_resumen = cargar_resumen_diario(
+        conn,
+        filtro=filtro_periodo("r")
+    )
+
+    ventas_total = df_resumen["ventas_totales"].sum()
+    gastos_total = df_resumen["gastos_total"].sum()
     utilidad = ventas_total - gastos_total
 
     st.write(f"🟢 Ventas totales: **${ventas_total:,.2f}**")
@@ -340,8 +420,8 @@ with tab_resumen:
 
     if st.button("📄 Generar Resumen Financiero (PDF)"):
         st.session_state["pdf_resumen"] = generar_pdf_resumen_financiero(
-            df_ventas_filt,
-            df_gastos_filt,
+            cargar_ventas(conn, *filtro_periodo("v").where()),
+            cargar_gastos(conn, *filtro_periodo("g").where()),
             periodo_kpi,
             farmacia_sel
     )
@@ -376,10 +456,7 @@ with tab_consulta:
         key="consulta_fin"
     )
 
-    farmacias_disponibles = sorted(
-        set(df_ventas["farmacia"].dropna().tolist())
-        | set(df_gastos["farmacia"].dropna().tolist())
-    )
+    farmacias_disponibles = farmacias_todas
 
     farmacias_consulta = st.multiselect(
         "Farmacias",
@@ -406,20 +483,32 @@ with tab_consulta:
         # FILTRAR VENTAS Y GASTOS
         # ==================================================
 
-        fecha_inicio_ts = pd.to_datetime(fecha_inicio)
-        fecha_fin_ts = pd.to_datetime(fecha_fin)
+        # fecha_fin es inclusiva en el filtro; en SQL se usa < día siguiente
+        where_v_consulta, parametros_v_consulta = (
+            FiltroSQL()
+            .en_lista("f.nombre", farmacias_consulta)
+            .rango("v.fecha", fecha_inicio, fecha_fin + timedelta(days=1))
+            .where()
+        )
 
-        df_v_consulta = df_ventas[
-            (df_ventas["fecha"] >= fecha_inicio_ts)
-            & (df_ventas["fecha"] <= fecha_fin_ts)
-            & (df_ventas["farmacia"].isin(farmacias_consulta))
-        ].copy()
+        where_g_consulta, parametros_g_consulta = (
+            FiltroSQL()
+            .en_lista("f.nombre", farmacias_consulta)
+            .rango("g.fecha", fecha_inicio, fecha_fin + timedelta(days=1))
+            .where()
+        )
+
+        df_v_consulta = cargar_ventas(
+            conn,
+            where_v_consulta,
+            parametros_v_consulta
+        )
 
-        df_g_consulta = df_gastos[
-            (df_gastos["fecha"] >= fecha_inicio_ts)
-            & (df_gastos["fecha"] <= fecha_fin_ts)
-            & (df_gastos["farmacia"].isin(farmacias_consulta))
-        ].copy()
+        df_g_consulta = cargar_gastos(
+            conn,
+            where_g_consulta,
+            parametros_g_consulta
+        )
 
         columnas_ventas_numericas = [
             "ventas_totales",
@@ -1144,4 +1233,14 @@ with tab_consulta:
                     "spreadsheetml.sheet"
                 ),
                 key="consulta_descargar_excel"
-            )
\ No newline at end of file
+            )
+
+
+# ===============================
+# CIERRE DE CONEXIÓN
+# ===============================
+
+try:
+    conn.close()
+except Exception:
+    pass
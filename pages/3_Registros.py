@@ -1,9 +1,23 @@
 import streamlit as st
 import pandas as pd
-from datetime import date
+from datetime import date, timedelta
 
-from utils.conexionASupabase import get_connection
+from psycopg2.extras import execute_values
+
+from utils.cache_datos import consultar_con_cache, invalidar_datos
+from utils.importacion import (
+    COLUMNAS_GASTOS,
+    COLUMNAS_VENTAS,
+    importar_gastos,
+    importar_ventas,
+    plantilla
+)
+from utils.conexionASupabase import es_violacion_unica, get_connection
+from utils.filtros import FiltroSQL
 from utils.logger import registrar_log
+from utils.migraciones import exigir_migracion
+from utils.navegacion import cerrar_sesion, ir_a_login
+from utils.paginacion import ClaveOrden, PaginadorKeyset
 
 
 st.set_page_config(
@@ -16,7 +30,7 @@ st.set_page_config(
 # ===============================
 
 if "usuario" not in st.session_state:
-    st.switch_page("streamlit_app.py")
+    ir_a_login()
 
 rol_usuario = st.session_state["usuario"]["rol"].strip().lower()
 
@@ -66,39 +80,328 @@ farmacia_reverse = {
 farmacia_nombres = list(farmacia_dict.keys())
 
 
+# ===============================
+# REGISTROS RECIENTES (EDICIÓN)
+# ===============================
+
+# Llave de orden con índice (migraciones/0008_indices_consultas.sql)
+COLUMNAS_EDICION_VENTAS = """
+    v.venta_id,
+    f.nombre AS farmacia,
+    v.fecha,
+    v.tipo_registro,
+    v.ventas_totales AS monto,
+    COALESCE(v.venta_tarjeta, 0) AS venta_tarjeta,
+    COALESCE(v.venta_efectivo, v.ventas_totales) AS venta_efectivo
+"""
+
+DESDE_EDICION_VENTAS = """
+    FROM ventas v
+    JOIN farmacias f
+        ON v.farmacia_id = f.farmacia_id
+"""
+
+ORDEN_EDICION_VENTAS = [
+    ClaveOrden("COALESCE(v.created_at, TIMESTAMP '1900-01-01')", descendente=True),
+    ClaveOrden("v.venta_id", descendente=True)
+]
+
+COLUMNAS_EDICION_GASTOS = """
+    g.gasto_id,
+    f.nombre AS farmacia,
+    g.fecha,
+    g.folio,
+    g.categoria,
+    g.tipo_gasto,
+    g.descripcion,
+    g.monto
+"""
+
+DESDE_EDICION_GASTOS = """
+    FROM gastos g
+    JOIN farmacias f
+        ON g.farmacia_id = f.farmacia_id
+"""
+
+ORDEN_EDICION_GASTOS = [
+    ClaveOrden("COALESCE(g.created_at, TIMESTAMP '1900-01-01')", descendente=True),
+    ClaveOrden("g.gasto_id", descendente=True)
+]
+
+
 # ===============================
 # FUNCIONES AUXILIARES
 # ===============================
 
-def venta_duplicada(cursor, farmacia_id, fecha):
-    cursor.execute("""
-        SELECT 1
+def farmacias_con_venta(fecha):
+    """
+    farmacia_id de las farmacias que ya tienen venta en esa fecha.
+    Una consulta por fecha, guardada en el cache de datos; registrar
+    o editar una venta de ese día la invalida.
+    """
+
+    def cargar():
+        cursor_local = conn.cursor()
+
+        try:
+            cursor_local.execute("""
+                SELECT farmacia_id
+                FROM ventas
+                WHERE fecha = %s;
+            """, (fecha,))
+
+            return frozenset(fila[0] for fila in cursor_local.fetchall())
+
+        finally:
+            cursor_local.close()
+
+    return consultar_con_cache(
+        "registros_farmacias_con_venta",
+        (fecha,),
+        cargar,
+        fecha_inicio=fecha,
+        fecha_fin=fecha + timedelta(days=1)
+    )
+
+
+# Migraciones de las que dependen las escrituras: la llave única de
+# ventas que usan los ON CONFLICT y el índice único de folios de
+# mercancía (INDICE_FOLIO_MERCANCIA).
+MIGRACION_VENTAS_UNICA = 9
+MIGRACION_FOLIO_MERCANCIA = 10
+
+
+def insertar_ventas(cursor, registros):
+    """
+    Inserta las ventas en una sola sentencia. Las que ya existen para
+    esa farmacia y fecha (ventas_farmacia_fecha_unica) se omiten.
+    Devuelve el conjunto de farmacia_id insertados.
+    """
+
+    insertadas = execute_values(
+        cursor,
+        """
+            INSERT INTO ventas
+            (
+                farmacia_id,
+                ventas_totales,
+                venta_tarjeta,
+                venta_efectivo,
+                tipo_registro,
+                fecha
+            )
+            VALUES %s
+            ON CONFLICT DO NOTHING
+            RETURNING farmacia_id;
+        """,
+        registros,
+        fetch=True
+    )
+
+    return {fila[0] for fila in insertadas}
+
+
+def guardar_ventas(cursor, registros):
+    """
+    Alta o actualización de ventas (farmacia_id, ventas_totales,
+    venta_tarjeta, venta_efectivo, tipo_registro, fecha) en una sola
+    sentencia, sobre la llave única (farmacia_id, fecha).
+    """
+
+    execute_values(
+        cursor,
+        """
+            INSERT INTO ventas
+            (
+                farmacia_id,
+                ventas_totales,
+                venta_tarjeta,
+                venta_efectivo,
+                tipo_registro,
+                fecha
+            )
+            VALUES %s
+            ON CONFLICT (farmacia_id, fecha)
+            DO UPDATE SET
+                ventas_totales = EXCLUDED.ventas_totales,
+                venta_tarjeta = EXCLUDED.venta_tarjeta,
+                venta_efectivo = EXCLUDED.venta_efectivo;
+        """,
+        registros
+    )
+
+
+def cuadricula_ventas(inicio, fin):
+    """
+    Dos DataFrames farmacia x día (venta total y tarjeta) con las
+    ventas existentes del rango [inicio, fin); vacío donde no hay venta.
+    """
+
+    dias = [
+        (inicio + timedelta(days=i)).isoformat()
+        for i in range((fin - inicio).days)
+    ]
+
+    df_ventas = pd.read_sql("""
+        SELECT
+            farmacia_id,
+            fecha,
+            ventas_totales,
+            venta_tarjeta
         FROM ventas
-        WHERE farmacia_id = %s
-        AND fecha = %s
-        LIMIT 1;
-    """, (
-        farmacia_id,
-        fecha
-    ))
+        WHERE fecha >= %s
+        AND fecha < %s;
+    """, conn, params=(inicio, fin))
+
+    df_ventas["farmacia"] = df_ventas["farmacia_id"].map(farmacia_reverse)
+    df_ventas["fecha"] = pd.to_datetime(df_ventas["fecha"]).dt.date.astype(str)
+
+    def tabla(columna):
+        return (
+            df_ventas.pivot_table(
+                index="farmacia",
+                columns="fecha",
+                values=columna,
+                aggfunc="sum"
+            )
+            .reindex(index=farmacia_nombres, columns=dias)
+            .astype(float)
+        )
 
-    return cursor.fetchone() is not None
+    return tabla("ventas_totales"), tabla("venta_tarjeta")
 
 
-def folio_mercancia_duplicado(cursor, farmacia_id, folio):
-    cursor.execute("""
-        SELECT 1
-        FROM gastos
-        WHERE farmacia_id = %s
-        AND categoria = 'Mercancia'
-        AND folio = %s
-        LIMIT 1;
-    """, (
-        farmacia_id,
-        folio
-    ))
+def cambios_cuadricula(total_original, tarjeta_original, total_editado, tarjeta_editado):
+    """
+    Compara las cuadrículas y devuelve (registros, errores) solo de las
+    celdas que cambiaron. registros va listo para guardar_ventas.
+    """
+
+    def distinto(a, b):
+        return ~((a == b) | (a.isna() & b.isna()))
+
+    cambiadas = (
+        distinto(total_original, total_editado)
+        | distinto(tarjeta_original, tarjeta_editado)
+    ).stack()
+
+    registros = []
+    errores = []
+
+    for farmacia, dia in cambiadas[cambiadas].index:
+        total = total_editado.at[farmacia, dia]
+        tarjeta = tarjeta_editado.at[farmacia, dia]
+        etiqueta = f"{farmacia} ({dia})"
+
+        if pd.isna(total):
+            if not pd.isna(total_original.at[farmacia, dia]):
+                errores.append(
+                    f"{etiqueta}: para eliminar una venta usa "
+                    "\"Editar o eliminar registros de ventas\"."
+                )
+
+            continue
+
+        tarjeta = 0.0 if pd.isna(tarjeta) else float(tarjeta)
+
+        if total <= 0:
+            errores.append(f"{etiqueta}: la venta total debe ser mayor a 0.")
+        elif tarjeta > total:
+            errores.append(f"{etiqueta}: la venta con tarjeta no puede ser mayor a la venta total.")
+        else:
+            registros.append((
+                farmacia_dict[farmacia],
+                float(total),
+                tarjeta,
+                float(total) - tarjeta,
+                "diario",
+                date.fromisoformat(dia)
+            ))
+
+    return registros, errores
+
+
+def filtros_edicion(prefijo, alias):
+    """
+    Filtros de farmacia y rango de fechas del editor de registros.
+    Devuelve el FiltroSQL para agregar más condiciones.
+    """
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+
+        farmacias_sel = st.multiselect(
+            "Farmacias",
+            farmacia_nombres,
+            placeholder="Todas",
+            key=f"{prefijo}_edicion_farmacias"
+        )
+
+    with col2:
+
+        rango_fechas = st.date_input(
+            "Rango de fechas",
+            value=[],
+            max_value=date.today(),
+            key=f"{prefijo}_edicion_rango"
+        )
+
+    filtro = FiltroSQL().en_lista(
+        f"{alias}.farmacia_id",
+        [farmacia_dict[n] for n in farmacias_sel] or None
+    )
+
+    if len(rango_fechas) == 2:
+        filtro.rango(
+            f"{alias}.fecha",
+            rango_fechas[0],
+            rango_fechas[1] + timedelta(days=1)
+        )
+
+    return filtro
+
+
+def buscar_ventas(filtro, texto):
+    """
+    Agrega al filtro la búsqueda de ventas: un número se busca como
+    venta_id o como monto exacto ($ y comas se ignoran); lo demás, en
+    el nombre de la farmacia.
+    """
+
+    texto = texto.strip()
 
-    return cursor.fetchone() is not None
+    if not texto:
+        return filtro
+
+    numero = texto.replace("$", "").replace(",", "").strip()
+
+    if numero.isdigit():
+        return filtro.agregar(
+            "(v.venta_id = %s OR v.ventas_totales = %s)",
+            int(numero),
+            int(numero)
+        )
+
+    try:
+        monto = float(numero)
+    except ValueError:
+        return filtro.agregar("f.nombre ILIKE %s", f"%{texto}%")
+
+    return filtro.agregar("v.ventas_totales = %s", monto)
+
+
+# Restricción única (farmacia_id, fecha) de ventas
+# (migraciones/0009_ventas_farmacia_fecha_unica.sql).
+RESTRICCION_VENTA_UNICA = "ventas_farmacia_fecha_unica"
+
+MENSAJE_VENTA_DUPLICADA = "Ya existe una venta registrada para esta farmacia en esa fecha."
+
+# Índice único (farmacia_id, UPPER(folio)) de los gastos de Mercancía
+# (migraciones/0010_folios_gastos_mercancia.sql).
+INDICE_FOLIO_MERCANCIA = "gastos_mercancia_folio_unico"
+
+MENSAJE_FOLIO_MERCANCIA = "Ya existe un gasto de mercancía con ese folio en esta farmacia."
 
 
 # ===============================
@@ -107,9 +410,10 @@ def folio_mercancia_duplicado(cursor, farmacia_id, folio):
 
 st.title("Registros")
 
-tab1, tab2 = st.tabs([
+tab1, tab2, tab3 = st.tabs([
     "Registro de ventas",
-    "Registro de gastos"
+    "Registro de gastos",
+    "Importar archivo"
 ])
 
 
@@ -130,7 +434,8 @@ with tab1:
         [
             "Registro Individual",
             "Registro Rápido (Todas las farmacias)",
-            "Registro Personalizado"
+            "Registro Personalizado",
+            "Captura por semana o mes"
         ],
         key="ventas_modo_registro"
     )
@@ -145,12 +450,15 @@ with tab1:
         key="ventas_tipo_registro"
     )
 
-    fecha = st.date_input(
-        "Fecha de la venta",
-        value=date.today(),
-        max_value=date.today(),
-        key="ventas_fecha_registro"
-    )
+    # La captura por semana o mes lleva una fecha por columna.
+    if modo != "Captura por semana o mes":
+
+        fecha = st.date_input(
+            "Fecha de la venta",
+            value=date.today(),
+            max_value=date.today(),
+            key="ventas_fecha_registro"
+        )
 
     st.divider()
 
@@ -205,42 +513,33 @@ with tab1:
                 st.error("La venta con tarjeta no puede ser mayor a la venta total.")
                 st.stop()
 
-            if venta_duplicada(cursor, farmacia_id, fecha):
-                st.error("Ya existe una venta registrada para esta farmacia en esa fecha.")
+            if farmacia_id in farmacias_con_venta(fecha):
+                st.error(MENSAJE_VENTA_DUPLICADA)
                 st.stop()
 
+            exigir_migracion(MIGRACION_VENTAS_UNICA)
+
             try:
 
-                cursor.execute("""
-                    INSERT INTO ventas
-                    (
-                        farmacia_id,
-                        ventas_totales,
-                        venta_tarjeta,
-                        venta_efectivo,
-                        tipo_registro,
-                        fecha
-                    )
-                    VALUES
-                    (
-                        %s,
-                        %s,
-                        %s,
-                        %s,
-                        %s,
-                        %s
-                    );
-                """, (
+                insertadas = insertar_ventas(cursor, [(
                     farmacia_id,
                     monto,
                     venta_tarjeta,
                     venta_efectivo,
                     tipo_registro,
                     fecha
-                ))
+                )])
 
                 conn.commit()
 
+                if not insertadas:
+                    # Otra sesión la registró después de la validación.
+                    invalidar_datos(farmacia_nombre, fecha)
+                    st.error(MENSAJE_VENTA_DUPLICADA)
+                    st.stop()
+
+                invalidar_datos(farmacia_nombre, fecha)
+
                 registrar_log(
                     st.session_state["usuario"],
                     "REGISTRO_VENTA",
@@ -264,6 +563,8 @@ with tab1:
 
         st.subheader("Registro Rápido")
 
+        ya_registradas = farmacias_con_venta(fecha)
+
         registros = []
 
         for nombre, fid in farmacia_dict.items():
@@ -305,7 +606,7 @@ with tab1:
 
             if monto > 0:
 
-                if venta_duplicada(cursor, fid, fecha):
+                if fid in ya_registradas:
 
                     st.warning(f"{nombre} ya tiene venta registrada ese día, se omitirá.")
 
@@ -329,38 +630,43 @@ with tab1:
                 st.warning("No hay montos válidos para registrar.")
                 st.stop()
 
+            exigir_migracion(MIGRACION_VENTAS_UNICA)
+
             try:
 
-                cursor.executemany("""
-                    INSERT INTO ventas
-                    (
-                        farmacia_id,
-                        ventas_totales,
-                        venta_tarjeta,
-                        venta_efectivo,
-                        tipo_registro,
+                insertadas = insertar_ventas(cursor, registros)
+
+                conn.commit()
+
+                for registro_venta in registros:
+                    invalidar_datos(
+                        farmacia_reverse[registro_venta[0]],
                         fecha
                     )
-                    VALUES
-                    (
-                        %s,
-                        %s,
-                        %s,
-                        %s,
-                        %s,
-                        %s
-                    );
-                """, registros)
 
-                conn.commit()
+                omitidas = [
+                    farmacia_reverse[registro_venta[0]]
+                    for registro_venta in registros
+                    if registro_venta[0] not in insertadas
+                ]
+
+                if insertadas:
+                    registrar_log(
+                        st.session_state["usuario"],
+                        "REGISTRO_VENTA",
+                        f"Registró {len(insertadas)} ventas rápidas ({fecha})"
+                    )
 
-                registrar_log(
-                    st.session_state["usuario"],
-                    "REGISTRO_VENTA",
-                    f"Registró {len(registros)} ventas rápidas ({fecha})"
-                )
+                if omitidas:
+                    # Otra sesión las registró mientras se capturaban.
+                    st.warning(
+                        "Ya tenían venta ese día y se omitieron: "
+                        + ", ".join(omitidas)
+                    )
+                    st.success(f"{len(insertadas)} ventas registradas correctamente.")
+                    st.stop()
 
-                st.success(f"{len(registros)} ventas registradas correctamente.")
+                st.success(f"{len(insertadas)} ventas registradas correctamente.")
 
                 st.rerun()
 
@@ -383,6 +689,8 @@ with tab1:
             key="ventas_farmacias_personalizadas"
         )
 
+        ya_registradas = farmacias_con_venta(fecha)
+
         registros = []
 
         for nombre in seleccionadas:
@@ -426,7 +734,7 @@ with tab1:
 
             if monto > 0:
 
-                if venta_duplicada(cursor, fid, fecha):
+                if fid in ya_registradas:
 
                     st.warning(f"{nombre} ya tiene venta registrada ese día, se omitirá.")
 
@@ -450,38 +758,189 @@ with tab1:
                 st.warning("No hay montos válidos para registrar.")
                 st.stop()
 
+            exigir_migracion(MIGRACION_VENTAS_UNICA)
+
             try:
 
-                cursor.executemany("""
-                    INSERT INTO ventas
-                    (
-                        farmacia_id,
-                        ventas_totales,
-                        venta_tarjeta,
-                        venta_efectivo,
-                        tipo_registro,
+                insertadas = insertar_ventas(cursor, registros)
+
+                conn.commit()
+
+                for registro_venta in registros:
+                    invalidar_datos(
+                        farmacia_reverse[registro_venta[0]],
                         fecha
                     )
-                    VALUES
-                    (
-                        %s,
-                        %s,
-                        %s,
-                        %s,
-                        %s,
-                        %s
-                    );
-                """, registros)
+
+                omitidas = [
+                    farmacia_reverse[registro_venta[0]]
+                    for registro_venta in registros
+                    if registro_venta[0] not in insertadas
+                ]
+
+                if insertadas:
+                    registrar_log(
+                        st.session_state["usuario"],
+                        "REGISTRO_VENTA",
+                        f"Registró {len(insertadas)} ventas personalizadas ({fecha})"
+                    )
+
+                if omitidas:
+                    # Otra sesión las registró mientras se capturaban.
+                    st.warning(
+                        "Ya tenían venta ese día y se omitieron: "
+                        + ", ".join(omitidas)
+                    )
+                    st.success(f"{len(insertadas)} ventas registradas correctamente.")
+                    st.stop()
+
+                st.success(f"{len(insertadas)} ventas registradas correctamente.")
+
+                st.rerun()
+
+            except Exception as e:
+
+                conn.rollback()
+                st.error(e)
+
+    # =================================
+    # CAPTURA POR SEMANA O MES
+    # =================================
+
+    if modo == "Captura por semana o mes":
+
+        st.subheader("Captura por semana o mes")
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+
+            periodo_cuadricula = st.radio(
+                "Periodo",
+                ["Semana", "Mes"],
+                horizontal=True,
+                key="ventas_cuadricula_periodo"
+            )
+
+        with col2:
+
+            if periodo_cuadricula == "Semana":
+
+                inicio_cuadricula = st.date_input(
+                    "Desde",
+                    value=date.today() - timedelta(days=6),
+                    max_value=date.today(),
+                    key="ventas_cuadricula_inicio"
+                )
+
+                fin_cuadricula = inicio_cuadricula + timedelta(days=7)
+
+            else:
+
+                dia_mes = st.date_input(
+                    "Mes",
+                    value=date.today(),
+                    max_value=date.today(),
+                    key="ventas_cuadricula_mes"
+                )
+
+                inicio_cuadricula = dia_mes.replace(day=1)
+                fin_cuadricula = (
+                    inicio_cuadricula + timedelta(days=32)
+                ).replace(day=1)
+
+        # No se capturan días futuros
+        fin_cuadricula = min(fin_cuadricula, date.today() + timedelta(days=1))
+
+        total_original, tarjeta_original = cuadricula_ventas(
+            inicio_cuadricula,
+            fin_cuadricula
+        )
+
+        columnas_dias = {
+            dia: st.column_config.NumberColumn(
+                date.fromisoformat(dia).strftime("%d/%m"),
+                min_value=0.0,
+                step=100.0,
+                format="%.2f"
+            )
+            for dia in total_original.columns
+        }
+
+        st.caption(
+            "Las celdas vacías no tienen venta. Solo se guardan las celdas "
+            "que cambies; el efectivo se calcula como total - tarjeta."
+        )
+
+        sufijo = f"{inicio_cuadricula}_{fin_cuadricula}"
+
+        with st.form(f"ventas_cuadricula_form_{sufijo}"):
+
+            st.markdown("**Venta total**")
+
+            total_editado = st.data_editor(
+                total_original,
+                column_config=columnas_dias,
+                use_container_width=True,
+                key=f"ventas_cuadricula_total_{sufijo}"
+            )
+
+            st.markdown("**Venta con tarjeta**")
+
+            tarjeta_editado = st.data_editor(
+                tarjeta_original,
+                column_config=columnas_dias,
+                use_container_width=True,
+                key=f"ventas_cuadricula_tarjeta_{sufijo}"
+            )
+
+            guardar_cuadricula = st.form_submit_button(
+                "Guardar ventas",
+                use_container_width=True
+            )
+
+        if guardar_cuadricula:
+
+            registros, errores = cambios_cuadricula(
+                total_original,
+                tarjeta_original,
+                total_editado.astype(float),
+                tarjeta_editado.astype(float)
+            )
+
+            if errores:
+
+                for error in errores:
+                    st.error(error)
+
+                st.stop()
+
+            if not registros:
+                st.info("No hay cambios para guardar.")
+                st.stop()
+
+            exigir_migracion(MIGRACION_VENTAS_UNICA)
+
+            try:
+
+                guardar_ventas(cursor, registros)
 
                 conn.commit()
 
+                for registro_venta in registros:
+                    invalidar_datos(
+                        farmacia_reverse[registro_venta[0]],
+                        registro_venta[5]
+                    )
+
                 registrar_log(
                     st.session_state["usuario"],
                     "REGISTRO_VENTA",
-                    f"Registró {len(registros)} ventas personalizadas ({fecha})"
+                    f"Capturó o actualizó {len(registros)} ventas en cuadrícula "
+                    f"({inicio_cuadricula} a {fin_cuadricula - timedelta(days=1)})"
                 )
 
-                st.success(f"{len(registros)} ventas registradas correctamente.")
+                st.success(f"{len(registros)} ventas guardadas correctamente.")
 
                 st.rerun()
 
@@ -498,74 +957,62 @@ with tab1:
 
     with st.expander("Editar o eliminar registros de ventas"):
 
-        cantidad = st.selectbox(
-            "Registros a mostrar",
-            ["Últimos 20", "Últimos 100", "Todos"],
-            key="ventas_registros_a_mostrar"
+        filtro_ventas = filtros_edicion("ventas", "v")
+
+        busqueda_ventas = st.text_input(
+            "Buscar por farmacia, monto o ID",
+            key="ventas_edicion_busqueda"
         )
 
-        if cantidad == "Últimos 20":
-            limit_sql = "LIMIT 20"
-        elif cantidad == "Últimos 100":
-            limit_sql = "LIMIT 100"
-        else:
-            limit_sql = ""
-
-        query = f"""
-            SELECT
-                v.venta_id,
-                f.nombre,
-                v.fecha,
-                v.tipo_registro,
-                v.ventas_totales,
-                COALESCE(v.venta_tarjeta, 0) AS venta_tarjeta,
-                COALESCE(v.venta_efectivo, v.ventas_totales) AS venta_efectivo
-            FROM ventas v
-            JOIN farmacias f
-                ON v.farmacia_id = f.farmacia_id
-            ORDER BY v.created_at DESC
-            {limit_sql};
-        """
+        buscar_ventas(filtro_ventas, busqueda_ventas)
 
-        cursor.execute(query)
-
-        df_recent = pd.DataFrame(
-            cursor.fetchall(),
-            columns=[
-                "venta_id",
-                "farmacia",
-                "fecha",
-                "tipo_registro",
-                "monto",
-                "venta_tarjeta",
-                "venta_efectivo"
-            ]
+        where_edicion, parametros_edicion = filtro_ventas.where()
+
+        paginador_ventas = PaginadorKeyset(
+            "registros_ventas_pagina",
+            COLUMNAS_EDICION_VENTAS,
+            DESDE_EDICION_VENTAS,
+            ORDEN_EDICION_VENTAS,
+            where_sql=where_edicion,
+            parametros=parametros_edicion,
+            tamano_pagina=20
         )
 
+        df_recent = paginador_ventas.cargar(conn)
+
         st.dataframe(
             df_recent,
             use_container_width=True,
             hide_index=True
         )
 
+        paginador_ventas.mostrar_controles()
+
         if not df_recent.empty:
 
             st.subheader("Editar registro de venta")
 
-            opciones = {
-                f"{row['farmacia']} | {row['fecha']} | ${row['monto']:,.2f}":
-                row["venta_id"]
-                for _, row in df_recent.iterrows()
-            }
+            # Solo los registros de la página; al escribir en el
+            # selector se filtran sin volver a consultar.
+            opciones = dict(zip(
+                df_recent["venta_id"],
+                [
+                    f"{farmacia} | {fecha_venta} | ${monto_venta:,.2f}"
+                    for farmacia, fecha_venta, monto_venta in zip(
+                        df_recent["farmacia"],
+                        df_recent["fecha"],
+                        df_recent["monto"]
+                    )
+                ]
+            ))
 
-            seleccion = st.selectbox(
+            venta_id_seleccionada = st.selectbox(
                 "Selecciona el registro",
                 options=list(opciones.keys()),
+                format_func=opciones.get,
                 key="ventas_seleccion_editar"
             )
 
-            venta_id_seleccionada = opciones[seleccion]
-
             registro = df_recent[
                 df_recent["venta_id"] == venta_id_seleccionada
             ].iloc[0]
@@ -632,8 +1079,13 @@ with tab1:
                         st.error("La venta con tarjeta no puede ser mayor a la venta total.")
                         st.stop()
 
+                    exigir_migracion(MIGRACION_VENTAS_UNICA)
+
                     try:
 
+                        # Cambiar a una farmacia y fecha que ya tienen
+                        # venta lo detecta la restricción única.
+
                         cursor.execute("""
                             UPDATE ventas
                             SET
@@ -656,6 +1108,9 @@ with tab1:
 
                         conn.commit()
 
+                        invalidar_datos(registro["farmacia"], registro["fecha"])
+                        invalidar_datos(farmacia_edit, fecha_edit)
+
                         registrar_log(
                             st.session_state["usuario"],
                             "MODIFICACION_VENTA",
@@ -669,7 +1124,11 @@ with tab1:
                     except Exception as e:
 
                         conn.rollback()
-                        st.error(e)
+
+                        if es_violacion_unica(e, RESTRICCION_VENTA_UNICA):
+                            st.error(MENSAJE_VENTA_DUPLICADA)
+                        else:
+                            st.error(e)
 
             with col2:
 
@@ -718,6 +1177,8 @@ with tab1:
 
                             conn.commit()
 
+                            invalidar_datos(registro["farmacia"], registro["fecha"])
+
                             registrar_log(
                                 st.session_state["usuario"],
                                 "ELIMINACION_VENTA",
@@ -841,10 +1302,7 @@ with tab2:
             st.stop()
 
         if categoria == "Mercancia":
-
-            if folio_mercancia_duplicado(cursor, farmacia_id, folio):
-                st.error("Ya existe un gasto de mercancía con ese folio en esta farmacia.")
-                st.stop()
+            exigir_migracion(MIGRACION_FOLIO_MERCANCIA)
 
         try:
 
@@ -881,6 +1339,8 @@ with tab2:
 
             conn.commit()
 
+            invalidar_datos(farmacia_nombre, fecha)
+
             registrar_log(
                 st.session_state["usuario"],
                 "REGISTRO_GASTO",
@@ -894,7 +1354,11 @@ with tab2:
         except Exception as e:
 
             conn.rollback()
-            st.error(e)
+
+            if es_violacion_unica(e, INDICE_FOLIO_MERCANCIA):
+                st.error(MENSAJE_FOLIO_MERCANCIA)
+            else:
+                st.error(e)
 
     # =================================
     # EDICIÓN / ELIMINACIÓN DE GASTOS
@@ -904,76 +1368,66 @@ with tab2:
 
     with st.expander("Editar o eliminar registros de gastos"):
 
-        cantidad = st.selectbox(
-            "Registros a mostrar",
-            ["Últimos 20", "Últimos 100", "Todos"],
-            key="gastos_registros_a_mostrar"
+        filtro_gastos = filtros_edicion("gastos", "g")
+
+        busqueda_gastos = st.text_input(
+            "Buscar por folio o descripción",
+            key="gastos_edicion_busqueda"
         )
 
-        if cantidad == "Últimos 20":
-            limit_sql = "LIMIT 20"
-        elif cantidad == "Últimos 100":
-            limit_sql = "LIMIT 100"
-        else:
-            limit_sql = ""
-
-        query = f"""
-            SELECT 
-                g.gasto_id,
-                f.nombre AS farmacia,
-                g.fecha,
-                g.folio,
-                g.categoria,
-                g.tipo_gasto,
-                g.descripcion,
-                g.monto
-            FROM gastos g
-            JOIN farmacias f
-                ON g.farmacia_id = f.farmacia_id
-            ORDER BY g.created_at DESC
-            {limit_sql};
-        """
+        if busqueda_gastos.strip():
+            filtro_gastos.agregar(
+                "(g.folio ILIKE %s OR g.descripcion ILIKE %s)",
+                f"%{busqueda_gastos.strip()}%",
+                f"%{busqueda_gastos.strip()}%"
+            )
+
+        where_edicion, parametros_edicion = filtro_gastos.where()
 
-        cursor.execute(query)
-
-        df_recent = pd.DataFrame(
-            cursor.fetchall(),
-            columns=[
-                "gasto_id",
-                "farmacia",
-                "fecha",
-                "folio",
-                "categoria",
-                "tipo_gasto",
-                "descripcion",
-                "monto"
-            ]
+        paginador_gastos = PaginadorKeyset(
+            "registros_gastos_pagina",
+            COLUMNAS_EDICION_GASTOS,
+            DESDE_EDICION_GASTOS,
+            ORDEN_EDICION_GASTOS,
+            where_sql=where_edicion,
+            parametros=parametros_edicion,
+            tamano_pagina=20
         )
 
+        df_recent = paginador_gastos.cargar(conn)
+
         st.dataframe(
             df_recent,
             use_container_width=True,
             hide_index=True
         )
 
+        paginador_gastos.mostrar_controles()
+
         if not df_recent.empty:
 
             st.subheader("Editar gasto")
 
-            opciones = {
-                f"{row['farmacia']} | {row['fecha']} | {row['categoria']} | ${row['monto']:,.2f}":
-                row["gasto_id"]
-                for _, row in df_recent.iterrows()
-            }
+            opciones = dict(zip(
+                df_recent["gasto_id"],
+                [
+                    f"{farmacia} | {fecha_gasto} | {categoria_gasto} | ${monto_gasto:,.2f}"
+                    for farmacia, fecha_gasto, categoria_gasto, monto_gasto in zip(
+                        df_recent["farmacia"],
+                        df_recent["fecha"],
+                        df_recent["categoria"],
+                        df_recent["monto"]
+                    )
+                ]
+            ))
 
-            seleccion = st.selectbox(
+            gasto_id_seleccionado = st.selectbox(
                 "Selecciona el gasto",
                 options=list(opciones.keys()),
+                format_func=opciones.get,
                 key="gastos_seleccion_editar"
             )
 
-            gasto_id_seleccionado = opciones[seleccion]
-
             registro = df_recent[
                 df_recent["gasto_id"] == gasto_id_seleccionado
             ].iloc[0]
@@ -1045,6 +1499,9 @@ with tab2:
                         st.error("Debes ingresar folio para mercancía.")
                         st.stop()
 
+                    if categoria_edit == "Mercancia":
+                        exigir_migracion(MIGRACION_FOLIO_MERCANCIA)
+
                     try:
 
                         cursor.execute("""
@@ -1071,6 +1528,9 @@ with tab2:
 
                         conn.commit()
 
+                        invalidar_datos(registro["farmacia"], registro["fecha"])
+                        invalidar_datos(farmacia_edit, fecha_edit)
+
                         registrar_log(
                             st.session_state["usuario"],
                             "MODIFICACION_GASTO",
@@ -1084,7 +1544,11 @@ with tab2:
                     except Exception as e:
 
                         conn.rollback()
-                        st.error(e)
+
+                        if es_violacion_unica(e, INDICE_FOLIO_MERCANCIA):
+                            st.error(MENSAJE_FOLIO_MERCANCIA)
+                        else:
+                            st.error(e)
 
             with col2:
 
@@ -1133,6 +1597,8 @@ with tab2:
 
                             conn.commit()
 
+                            invalidar_datos(registro["farmacia"], registro["fecha"])
+
                             registrar_log(
                                 st.session_state["usuario"],
                                 "ELIMINACION_GASTO",
@@ -1162,6 +1628,142 @@ with tab2:
                         st.rerun()
 
 
+# ==================================================
+# TAB 3 - IMPORTACIÓN DE VENTAS Y GASTOS
+# ==================================================
+
+with tab3:
+
+    st.subheader("Importar ventas o gastos")
+
+    tipo_importacion = st.radio(
+        "¿Qué vas a importar?",
+        ["Ventas", "Gastos"],
+        horizontal=True,
+        key="importacion_tipo"
+    )
+
+    columnas_importacion = (
+        COLUMNAS_VENTAS
+        if tipo_importacion == "Ventas"
+        else COLUMNAS_GASTOS
+    )
+
+    st.caption(
+        "Archivo CSV o Excel (.xlsx) con encabezados: "
+        + ", ".join(columnas_importacion)
+        + ". Fechas como 2025-03-31 o 31/03/2025."
+    )
+
+    st.download_button(
+        "Descargar plantilla",
+        plantilla(columnas_importacion),
+        file_name=f"plantilla_{tipo_importacion.lower()}.csv",
+        mime="text/csv",
+        key="importacion_plantilla"
+    )
+
+    archivo_importacion = st.file_uploader(
+        "Archivo",
+        type=["csv", "xlsx"],
+        key=f"importacion_archivo_{tipo_importacion}"
+    )
+
+    if archivo_importacion is not None and st.button(
+        f"Importar {tipo_importacion.lower()}",
+        key="btn_importar_archivo"
+    ):
+
+        exigir_migracion(
+            MIGRACION_VENTAS_UNICA
+            if tipo_importacion == "Ventas"
+            else MIGRACION_FOLIO_MERCANCIA
+        )
+
+        try:
+
+            with st.spinner("Importando..."):
+
+                if tipo_importacion == "Ventas":
+
+                    resultado = importar_ventas(
+                        conn,
+                        archivo_importacion,
+                        archivo_importacion.name,
+                        farmacia_dict,
+                        date.today()
+                    )
+
+                else:
+
+                    resultado = importar_gastos(
+                        conn,
+                        archivo_importacion,
+                        archivo_importacion.name,
+                        farmacia_dict,
+                        date.today(),
+                        categorias,
+                        tipos_gasto
+                    )
+
+            for farmacia_id in resultado["farmacias"]:
+                invalidar_datos(farmacia_reverse[farmacia_id])
+
+            if resultado["insertadas"] > 0:
+                registrar_log(
+                    st.session_state["usuario"],
+                    f"IMPORTACION_{tipo_importacion.upper()}",
+                    f"Importó {resultado['insertadas']} {tipo_importacion.lower()} "
+                    f"de {archivo_importacion.name} "
+                    f"({len(resultado['rechazos'])} filas rechazadas)"
+                )
+
+            st.session_state["importacion_resultado"] = resultado
+
+        except ValueError as e:
+
+            st.error(str(e))
+
+        except Exception as e:
+
+            st.error(f"Error al importar: {e}")
+
+    resultado = st.session_state.get("importacion_resultado")
+
+    if resultado is not None:
+
+        col1, col2, col3 = st.columns(3)
+
+        col1.metric("Filas leídas", f"{resultado['leidas']:,}")
+        col2.metric("Importadas", f"{resultado['insertadas']:,}")
+        col3.metric("Rechazadas", f"{len(resultado['rechazos']):,}")
+
+        if resultado["rechazos"].empty:
+
+            st.success("Todas las filas se importaron correctamente.")
+
+        else:
+
+            st.warning("Estas filas no se importaron:")
+
+            st.dataframe(
+                resultado["rechazos"].rename(columns={
+                    "fila": "Fila",
+                    "motivo": "Motivo"
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+
+            st.download_button(
+                "Descargar filas rechazadas",
+                resultado["rechazos"].to_csv(index=False).encode("utf-8"),
+                file_name="filas_rechazadas.csv",
+                mime="text/csv",
+                key="importacion_rechazos"
+            )
+
+
 # ===============================
 # SIDEBAR INFO
 # ===============================
@@ -1175,5 +1777,14 @@ if st.sidebar.button(
     "Cerrar sesión",
     key="btn_cerrar_sesion_registros"
 ):
-    st.session_state.clear()
-    st.switch_page("streamlit_app.py")
\ No newline at end of file
+    cerrar_sesion()
+
+# ===============================
+# CIERRE DE CONEXIÓN
+# ===============================
+
+try:
+    cursor.close()
+    conn.close()
+except Exception:
+    pass
@@ -6,8 +6,13 @@ import plotly.express as px
 from datetime import date, timedelta
 from html import escape
 
-from utils.conexionASupabase import get_connection
+from utils.conexionASupabase import es_violacion_unica, get_connection
+from utils.filtros import FiltroSQL
 from utils.logger import registrar_log
+from utils.migraciones import exigir_migracion
+from utils.navegacion import cerrar_sesion, ir_a_login
+from utils.paginacion import ClaveOrden, PaginadorKeyset
+from utils.periodos import anios_de_periodos, cargar_periodos
 from utils.permisos import validar_acceso_pagina
 
 # ===============================
@@ -19,8 +24,7 @@ st.sidebar.success(
 )
 
 if st.sidebar.button("🚪 Cerrar sesión"):
-    st.session_state.clear()
-    st.switch_page("streamlit_app.py")
+    cerrar_sesion()
 
 
 
@@ -34,7 +38,7 @@ st.set_page_config(
 )
 
 if "usuario" not in st.session_state:
-    st.switch_page("streamlit_app.py")
+    ir_a_login()
 
 rol_usuario = st.session_state["usuario"]["rol"].strip().lower()
 
@@ -47,6 +51,11 @@ if rol_usuario not in roles_permitidos:
 
 st.title("🧾 Administración de Facturas")
 
+# Índice único (proveedor_id, UPPER(folio))
+# (migraciones/0011_folios_facturas.sql). Sin esa migración no se
+# guardan facturas: el folio duplicado ya no se consulta antes.
+INDICE_FOLIO_FACTURA = "facturas_proveedor_folio_unico"
+MIGRACION_FOLIOS_FACTURAS = 11
 
 conn=get_connection()
 cursor=conn.cursor()
@@ -54,7 +63,7 @@ validar_acceso_pagina(conn, "administracion_facturas")
 
 
 if "usuario" not in st.session_state:
-    st.switch_page("streamlit_app.py")
+    ir_a_login()
 
 
 
@@ -108,31 +117,29 @@ with tab1:
     st.markdown("### Búsqueda de facturas")
 
     df_proveedores_filtro = pd.read_sql("""
-        SELECT DISTINCT
+        SELECT
+            p.proveedor_id,
             p.nombre AS proveedor
-        FROM facturas f
-        LEFT JOIN proveedores p
-            ON f.proveedor_id = p.proveedor_id
+        FROM proveedores p
         WHERE p.nombre IS NOT NULL
+        AND EXISTS (
+            SELECT 1
+            FROM facturas f
+            WHERE f.proveedor_id = p.proveedor_id
+        )
         ORDER BY p.nombre ASC
     """, conn)
 
-    df_anios_filtro = pd.read_sql("""
-        SELECT DISTINCT
-            EXTRACT(YEAR FROM fecha_factura)::INT AS anio
-        FROM facturas
-        WHERE fecha_factura IS NOT NULL
-        ORDER BY anio DESC
-    """, conn)
+    df_periodos_filtro = cargar_periodos(conn, ["facturas"])
 
     proveedores_filtro = (
         ["Todos"] +
-        df_proveedores_filtro["proveedor"].dropna().tolist()
+        df_proveedores_filtro["proveedor"].drop_duplicates().tolist()
     )
 
     anios_filtro = (
         ["Todos"] +
-        df_anios_filtro["anio"].dropna().astype(int).tolist()
+        anios_de_periodos(df_periodos_filtro)
     )
 
     col1, col2, col3, col4 = st.columns(4)
@@ -239,160 +246,63 @@ with tab1:
         "Diciembre": 12
     }
 
-    condiciones_sql = []
-    parametros_sql = []
+    filtro_facturas = FiltroSQL()
 
     if filtro_proveedor_sql != "Todos":
 
-        condiciones_sql.append("p.nombre = %s")
-        parametros_sql.append(filtro_proveedor_sql)
+        # Por id para usar el índice (proveedor_id, fecha_factura)
+        filtro_facturas.en_lista(
+            "f.proveedor_id",
+            df_proveedores_filtro.loc[
+                df_proveedores_filtro["proveedor"] == filtro_proveedor_sql,
+                "proveedor_id"
+            ].astype(int).tolist()
+        )
 
     if filtro_estatus_sql != "Todos":
 
-        condiciones_sql.append("f.estatus = %s")
-        parametros_sql.append(filtro_estatus_sql)
-
-    if filtro_anio_sql != "Todos":
-
-        condiciones_sql.append("EXTRACT(YEAR FROM f.fecha_factura)::INT = %s")
-        parametros_sql.append(int(filtro_anio_sql))
+        filtro_facturas.igual("f.estatus", filtro_estatus_sql)
 
-    if filtro_mes_sql != "Todos":
-
-        condiciones_sql.append("EXTRACT(MONTH FROM f.fecha_factura)::INT = %s")
-        parametros_sql.append(meses_map[filtro_mes_sql])
-
-    if buscar_folio_sql.strip():
+    filtro_facturas.periodo(
+        "f.fecha_factura",
+        anio=None if filtro_anio_sql == "Todos" else int(filtro_anio_sql),
+        mes=None if filtro_mes_sql == "Todos" else meses_map[filtro_mes_sql],
+        anios=anios_de_periodos(df_periodos_filtro)
+    )
 
-        condiciones_sql.append("f.folio ILIKE %s")
-        parametros_sql.append(f"%{buscar_folio_sql.strip()}%")
+    filtro_facturas.contiene("f.folio", buscar_folio_sql)
 
     if filtro_vencimiento_sql == "Vencidas":
 
-        condiciones_sql.append("f.estatus = 'PENDIENTE'")
-        condiciones_sql.append("f.fecha_vencimiento < CURRENT_DATE")
+        filtro_facturas.agregar("f.estatus = 'PENDIENTE'")
+        filtro_facturas.agregar("f.fecha_vencimiento < CURRENT_DATE")
 
     elif filtro_vencimiento_sql == "Vencen en 7 días":
 
-        condiciones_sql.append("f.estatus = 'PENDIENTE'")
-        condiciones_sql.append("""
+        filtro_facturas.agregar("f.estatus = 'PENDIENTE'")
+        filtro_facturas.agregar("""
             f.fecha_vencimiento >= CURRENT_DATE
             AND f.fecha_vencimiento <= CURRENT_DATE + INTERVAL '7 days'
         """)
 
     elif filtro_vencimiento_sql == "En tiempo":
 
-        condiciones_sql.append("f.estatus = 'PENDIENTE'")
-        condiciones_sql.append("f.fecha_vencimiento > CURRENT_DATE + INTERVAL '7 days'")
-
-    if condiciones_sql:
-
-        where_sql = "WHERE " + " AND ".join(condiciones_sql)
-
-    else:
-
-        where_sql = ""
-
-    # ----------------------------
-    # CONTAR REGISTROS FILTRADOS
-    # ----------------------------
-
-    query_total_facturas = f"""
-        SELECT COUNT(*) AS total
-        FROM facturas f
-        LEFT JOIN proveedores p
-            ON f.proveedor_id = p.proveedor_id
-        {where_sql}
-    """
-
-    total_registros = pd.read_sql(
-        query_total_facturas,
-        conn,
-        params=parametros_sql
-    )["total"].iloc[0]
-
-    total_registros = int(total_registros)
-
-    total_paginas = max(
-        1,
-        (total_registros + int(registros_por_pagina) - 1) // int(registros_por_pagina)
-    )
-
-    if "pagina_facturas_tab1" not in st.session_state:
-        st.session_state["pagina_facturas_tab1"] = 1
-
-    if st.session_state["pagina_facturas_tab1"] > total_paginas:
-        st.session_state["pagina_facturas_tab1"] = 1
-
-    col1, col2, col3 = st.columns([1, 1, 2])
-
-    with col1:
-
-        pagina_actual = st.number_input(
-            "Página",
-            min_value=1,
-            max_value=total_paginas,
-            value=st.session_state["pagina_facturas_tab1"],
-            step=1,
-            key="pagina_facturas_tab1"
-        )
-
-    with col2:
-
-        st.metric(
-            "Total resultados",
-            total_registros
-        )
-
-    with col3:
-
-        st.caption(
-            f"Página {pagina_actual} de {total_paginas}. "
-            f"Mostrando máximo {registros_por_pagina} facturas por página."
-        )
-
-    offset = (int(pagina_actual) - 1) * int(registros_por_pagina)
-
-    # ----------------------------
-    # KPIS GENERALES DE LA BÚSQUEDA
-    # ----------------------------
-
-    query_kpis = f"""
-        SELECT
-            COALESCE(SUM(CASE WHEN f.estatus = 'PENDIENTE' THEN f.monto ELSE 0 END), 0) AS saldo_pendiente,
-            COUNT(*) FILTER (WHERE f.estatus = 'PENDIENTE') AS facturas_pendientes,
-            COUNT(*) FILTER (
-                WHERE f.estatus = 'PENDIENTE'
-                AND f.fecha_vencimiento < CURRENT_DATE
-            ) AS facturas_vencidas,
-            COUNT(*) FILTER (
-                WHERE f.estatus = 'PENDIENTE'
-                AND f.fecha_vencimiento >= CURRENT_DATE
-                AND f.fecha_vencimiento <= CURRENT_DATE + INTERVAL '7 days'
-            ) AS facturas_proximas
-        FROM facturas f
-        LEFT JOIN proveedores p
-            ON f.proveedor_id = p.proveedor_id
-        {where_sql}
-    """
-
-    df_kpis = pd.read_sql(
-        query_kpis,
-        conn,
-        params=parametros_sql
-    )
+        filtro_facturas.agregar("f.estatus = 'PENDIENTE'")
+        filtro_facturas.agregar("f.fecha_vencimiento > CURRENT_DATE + INTERVAL '7 days'")
 
-    saldo_pendiente = float(df_kpis["saldo_pendiente"].iloc[0])
-    facturas_pendientes = int(df_kpis["facturas_pendientes"].iloc[0])
-    facturas_vencidas = int(df_kpis["facturas_vencidas"].iloc[0])
-    facturas_proximas = int(df_kpis["facturas_proximas"].iloc[0])
+    where_sql, parametros_sql = filtro_facturas.where()
 
     # ----------------------------
-    # CONSULTA PAGINADA DE FACTURAS
+    # CONSULTA PAGINADA DE FACTURAS Y KPIS
     # ----------------------------
+    # Paginación por llave: la llave sigue el orden del panel
+    # (estatus, vencimiento, captura) y termina en factura_id.
+    # El total y los KPIs de la búsqueda salen de la misma consulta
+    # que la página, sobre el conjunto filtrado.
 
-    query_facturas = f"""
-        SELECT
+    paginador_facturas = PaginadorKeyset(
+        "facturas_pagina_tab1",
+        """
             f.factura_id,
             p.nombre AS proveedor,
             f.folio,
@@ -403,35 +313,51 @@ with tab1:
             f.estatus,
             f.observaciones,
             f.created_at
-        FROM facturas f
-        LEFT JOIN proveedores p
-            ON f.proveedor_id = p.proveedor_id
-        {where_sql}
-        ORDER BY
-            CASE
-                WHEN f.estatus = 'PENDIENTE' THEN 0
-                WHEN f.estatus = 'PAGADA' THEN 1
-                WHEN f.estatus = 'CANCELADA' THEN 2
-                ELSE 3
-            END,
-            f.fecha_vencimiento ASC NULLS LAST,
-            f.created_at DESC
-        LIMIT %s
-        OFFSET %s
-    """
+        """,
+        """
+            FROM facturas f
+            LEFT JOIN proveedores p
+                ON f.proveedor_id = p.proveedor_id
+        """,
+        [
+            ClaveOrden("""
+                CASE
+                    WHEN f.estatus = 'PENDIENTE' THEN 0
+                    WHEN f.estatus = 'PAGADA' THEN 1
+                    WHEN f.estatus = 'CANCELADA' THEN 2
+                    ELSE 3
+                END
+            """),
+            ClaveOrden("COALESCE(f.fecha_vencimiento, DATE '9999-12-31')"),
+            ClaveOrden("COALESCE(f.created_at, TIMESTAMP '1900-01-01')", descendente=True),
+            ClaveOrden("f.factura_id", descendente=True)
+        ],
+        where_sql=where_sql,
+        parametros=parametros_sql,
+        tamano_pagina=registros_por_pagina,
+        totales_sql="""
+            COALESCE(SUM(CASE WHEN estatus = 'PENDIENTE' THEN monto ELSE 0 END), 0) AS saldo_pendiente,
+            COUNT(*) FILTER (WHERE estatus = 'PENDIENTE') AS facturas_pendientes,
+            COUNT(*) FILTER (
+                WHERE estatus = 'PENDIENTE'
+                AND fecha_vencimiento < CURRENT_DATE
+            ) AS facturas_vencidas,
+            COUNT(*) FILTER (
+                WHERE estatus = 'PENDIENTE'
+                AND fecha_vencimiento >= CURRENT_DATE
+                AND fecha_vencimiento <= CURRENT_DATE + INTERVAL '7 days'
+            ) AS facturas_proximas
+        """
+    )
 
-    parametros_facturas = parametros_sql.copy()
+    df_facturas = paginador_facturas.cargar(conn)
 
-    parametros_facturas.extend([
-        int(registros_por_pagina),
-        int(offset)
-    ])
+    paginador_facturas.mostrar_controles()
 
-    df_facturas = pd.read_sql(
-        query_facturas,
-        conn,
-        params=parametros_facturas
-    )
+    saldo_pendiente = float(paginador_facturas.totales["saldo_pendiente"])
+    facturas_pendientes = int(paginador_facturas.totales["facturas_pendientes"])
+    facturas_vencidas = int(paginador_facturas.totales["facturas_vencidas"])
+    facturas_proximas = int(paginador_facturas.totales["facturas_proximas"])
 
     # ----------------------------
     # KPIS
@@ -806,7 +732,8 @@ with tab1:
         )
 
         st.caption(
-            f"Facturas mostradas en esta página: {len(df_filtrado)} de {total_registros} resultados."
+            f"Facturas mostradas en esta página: {len(df_filtrado)}. "
+            f"{paginador_facturas.descripcion()}."
         )
 
         st.divider()
@@ -1100,37 +1027,12 @@ with tab1:
 
                     fecha_vencimiento_final = fecha_vencimiento_edit
 
-                try:
+                exigir_migracion(MIGRACION_FOLIOS_FACTURAS)
 
-                    cursor.execute("""
-                        SELECT proveedor_id
-                        FROM facturas
-                        WHERE factura_id = %s
-                    """, (
-                        factura_id_sel,
-                    ))
-
-                    proveedor_id_actual = cursor.fetchone()[0]
-
-                    cursor.execute("""
-                        SELECT COUNT(*)
-                        FROM facturas
-                        WHERE proveedor_id = %s
-                        AND UPPER(folio) = UPPER(%s)
-                        AND factura_id <> %s
-                    """, (
-                        proveedor_id_actual,
-                        folio_edit.strip(),
-                        factura_id_sel
-                    ))
-
-                    existe_folio = cursor.fetchone()[0]
-
-                    if existe_folio > 0:
-
-                        st.error("Ya existe otra factura con ese folio para este proveedor.")
-                        st.stop()
+                try:
 
+                    # El folio duplicado lo detecta el índice único
+                    # (proveedor_id, UPPER(folio)).
                     cursor.execute("""
                         UPDATE facturas
                         SET
@@ -1169,7 +1071,10 @@ with tab1:
 
                     conn.rollback()
 
-                    st.error(e)
+                    if es_violacion_unica(e, INDICE_FOLIO_FACTURA):
+                        st.error("Ya existe otra factura con ese folio para este proveedor.")
+                    else:
+                        st.error(e)
 
 
             st.divider()
@@ -2542,22 +2447,7 @@ with tab2:
                 st.error("El monto debe ser mayor a 0.")
                 st.stop()
 
-            cursor.execute("""
-                SELECT COUNT(*)
-                FROM facturas
-                WHERE proveedor_id = %s
-                AND UPPER(folio) = UPPER(%s)
-            """, (
-                int(proveedor_id),
-                folio.strip()
-            ))
-
-            existe_factura = cursor.fetchone()[0]
-
-            if existe_factura > 0:
-
-                st.error("Ya existe una factura con ese folio para este proveedor.")
-                st.stop()
+            exigir_migracion(MIGRACION_FOLIOS_FACTURAS)
 
             try:
 
@@ -2615,7 +2505,10 @@ with tab2:
 
                 conn.rollback()
 
-                st.error(e)
+                if es_violacion_unica(e, INDICE_FOLIO_FACTURA):
+                    st.error("Ya existe una factura con ese folio para este proveedor.")
+                else:
+                    st.error(e)
                 st.divider()
 
         # ----------------------------
@@ -3263,3 +3156,14 @@ with tab4:
                     use_container_width=True,
                     hide_index=True
                 )
+
+
+# ===============================
+# CIERRE DE CONEXIÓN
+# ===============================
+
+try:
+    cursor.close()
+    conn.close()
+except Exception:
+    pass
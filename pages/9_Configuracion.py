@@ -1,12 +1,22 @@
 import streamlit as st
 import pandas as pd
-import bcrypt
 import re
 import unicodedata
 
 from utils.conexionASupabase import get_connection
+from utils.contrasenas import hashear_contrasena
+from utils.filtros import FiltroSQL
 from utils.logger import registrar_log
-from utils.permisos import validar_acceso_pagina
+from utils.logs_facetas import resumen_logs
+from utils.navegacion import cerrar_sesion, ir_a_login
+from utils.paginacion import ClaveOrden, PaginadorKeyset
+from utils.permisos import (
+    guardar_permisos,
+    incrementar_version_permisos,
+    invalidar_permisos,
+    validar_acceso_pagina
+)
+from utils.sesiones import revocar_sesiones
 
 
 st.set_page_config(
@@ -27,8 +37,7 @@ if st.sidebar.button(
     "Cerrar sesión",
     key="btn_cerrar_sesion_configuracion"
 ):
-    st.session_state.clear()
-    st.switch_page("streamlit_app.py")
+    cerrar_sesion()
 
 
 
@@ -37,7 +46,7 @@ if st.sidebar.button(
 # ===============================
 
 if "usuario" not in st.session_state:
-    st.switch_page("streamlit_app.py")
+    ir_a_login()
 
 rol_usuario = st.session_state["usuario"]["rol"].strip().lower()
 
@@ -83,194 +92,6 @@ def generar_clave(texto):
     return texto
 
 
-def inicializar_tablas_roles_permisos(conn):
-    cursor_local = conn.cursor()
-
-    try:
-        cursor_local.execute("""
-            CREATE TABLE IF NOT EXISTS roles (
-                rol_id SERIAL PRIMARY KEY,
-                clave VARCHAR(50) UNIQUE NOT NULL,
-                nombre VARCHAR(100) NOT NULL,
-                descripcion TEXT,
-                activo BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP DEFAULT NOW()
-            );
-        """)
-
-        cursor_local.execute("""
-            CREATE TABLE IF NOT EXISTS paginas_sistema (
-                pagina_id SERIAL PRIMARY KEY,
-                clave VARCHAR(100) UNIQUE NOT NULL,
-                nombre VARCHAR(100) NOT NULL,
-                ruta VARCHAR(200),
-                orden INTEGER DEFAULT 0,
-                activo BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP DEFAULT NOW()
-            );
-        """)
-
-        cursor_local.execute("""
-            CREATE TABLE IF NOT EXISTS permisos_rol_pagina (
-                permiso_id SERIAL PRIMARY KEY,
-                rol_id INTEGER REFERENCES roles(rol_id) ON DELETE CASCADE,
-                pagina_id INTEGER REFERENCES paginas_sistema(pagina_id) ON DELETE CASCADE,
-                puede_ver BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT NOW(),
-                UNIQUE (rol_id, pagina_id)
-            );
-        """)
-
-        cursor_local.execute("""
-            INSERT INTO roles
-            (
-                clave,
-                nombre,
-                descripcion,
-                activo
-            )
-            VALUES
-            (
-                'admin',
-                'Administrador',
-                'Acceso completo al sistema',
-                TRUE
-            ),
-            (
-                'empleado',
-                'Empleado',
-                'Acceso operativo limitado',
-                TRUE
-            )
-            ON CONFLICT (clave) DO NOTHING;
-        """)
-
-        cursor_local.execute("""
-            INSERT INTO roles
-            (
-                clave,
-                nombre,
-                descripcion,
-                activo
-            )
-            SELECT DISTINCT
-                LOWER(TRIM(rol)) AS clave,
-                INITCAP(LOWER(TRIM(rol))) AS nombre,
-                'Rol existente importado desde usuarios' AS descripcion,
-                TRUE AS activo
-            FROM usuarios
-            WHERE rol IS NOT NULL
-            AND TRIM(rol) <> ''
-            ON CONFLICT (clave) DO NOTHING;
-        """)
-
-        cursor_local.execute("""
-            INSERT INTO paginas_sistema
-            (
-                clave,
-                nombre,
-                ruta,
-                orden,
-                activo
-            )
-            VALUES
-            (
-                'dashboard',
-                'Dashboard',
-                'pages/1_Dashboard_Farmacias.py',
-                1,
-                TRUE
-            ),
-            (
-                'consulta_financiera',
-                'Consulta Financiera',
-                'pages/2_Consulta_Financiera.py',
-                2,
-                TRUE
-            ),
-            (
-                'registros',
-                'Registros',
-                'pages/3_Registros.py',
-                3,
-                TRUE
-            ),
-            (
-                'administracion_facturas',
-                'Administración de Facturas',
-                'pages/4_Administracion_Facturas.py',
-                4,
-                TRUE
-            ),
-            (
-                'configuracion',
-                'Configuración',
-                'pages/9_Configuracion.py',
-                5,
-                TRUE
-            )
-            ON CONFLICT (clave) DO UPDATE SET
-                nombre = EXCLUDED.nombre,
-                ruta = EXCLUDED.ruta,
-                orden = EXCLUDED.orden,
-                activo = TRUE;
-        """)
-
-        cursor_local.execute("""
-            INSERT INTO permisos_rol_pagina
-            (
-                rol_id,
-                pagina_id,
-                puede_ver
-            )
-            SELECT
-                r.rol_id,
-                p.pagina_id,
-                TRUE
-            FROM roles r
-            CROSS JOIN paginas_sistema p
-            WHERE r.clave IN ('admin', 'administrador')
-            ON CONFLICT (rol_id, pagina_id)
-            DO UPDATE SET
-                puede_ver = TRUE;
-        """)
-
-        cursor_local.execute("""
-            INSERT INTO permisos_rol_pagina
-            (
-                rol_id,
-                pagina_id,
-                puede_ver
-            )
-            SELECT
-                r.rol_id,
-                p.pagina_id,
-                CASE
-                    WHEN p.clave IN (
-                        'dashboard',
-                        'registros',
-                        'administracion_facturas'
-                    )
-                    THEN TRUE
-                    ELSE FALSE
-                END
-            FROM roles r
-            CROSS JOIN paginas_sistema p
-            WHERE r.clave = 'empleado'
-            ON CONFLICT (rol_id, pagina_id)
-            DO NOTHING;
-        """)
-
-        conn.commit()
-
-    except Exception as e:
-        conn.rollback()
-        st.error(f"Error al inicializar roles y permisos: {e}")
-
-    finally:
-        cursor_local.close()
-
-
 def cargar_roles_activos(conn):
     return pd.read_sql("""
         SELECT
@@ -295,6 +116,78 @@ def cargar_roles_todos(conn):
     """, conn)
 
 
+def cargar_matriz_permisos(conn):
+    """
+    Roles x páginas activas en una consulta.
+    Devuelve (df_matriz, paginas): df_matriz tiene índice rol_id, la
+    columna rol y una columna booleana por clave de página; paginas es
+    {clave: (pagina_id, nombre)} en el orden del menú.
+    """
+
+    df = pd.read_sql("""
+        SELECT
+            r.rol_id,
+            r.nombre AS rol,
+            p.pagina_id,
+            p.clave,
+            p.nombre AS pagina,
+            COALESCE(prp.puede_ver, FALSE) AS puede_ver
+        FROM roles r
+        CROSS JOIN paginas_sistema p
+        LEFT JOIN permisos_rol_pagina prp
+            ON prp.rol_id = r.rol_id
+            AND prp.pagina_id = p.pagina_id
+        WHERE p.activo = TRUE
+        ORDER BY p.orden, p.nombre, r.nombre;
+    """, conn)
+
+    paginas = {
+        row["clave"]: (int(row["pagina_id"]), row["pagina"])
+        for _, row in df.drop_duplicates("clave").iterrows()
+    }
+
+    if df.empty:
+        return pd.DataFrame(columns=["rol"]), paginas
+
+    df_matriz = df.pivot(
+        index=["rol_id", "rol"],
+        columns="clave",
+        values="puede_ver"
+    )[list(paginas)].astype(bool)
+
+    df_matriz = df_matriz.reset_index(level="rol").sort_values("rol")
+    df_matriz.columns.name = None
+
+    return df_matriz, paginas
+
+
+def diferencias_permisos(df_original, df_editado, paginas):
+    """
+    Celdas que cambiaron entre la matriz cargada y la editada, como
+    arreglos paralelos (rol_ids, pagina_ids, valores).
+    """
+
+    claves = list(paginas)
+
+    cambios = (
+        df_editado[claves].astype(bool)
+        != df_original[claves]
+    ).stack()
+
+    cambios = cambios[cambios]
+
+    rol_ids = []
+    pagina_ids = []
+    valores = []
+
+    for rol_id, clave in cambios.index:
+        rol_ids.append(int(rol_id))
+        pagina_ids.append(paginas[clave][0])
+        valores.append(bool(df_editado.at[rol_id, clave]))
+
+    return rol_ids, pagina_ids, valores
+
+
 def limpiar_texto(valor):
     if pd.isna(valor) or valor is None or str(valor).strip() == "":
         return ""
@@ -302,10 +195,6 @@ def limpiar_texto(valor):
     return str(valor)
 
 
-# Inicializa tablas de roles/permisos automáticamente
-inicializar_tablas_roles_permisos(conn)
-
-
 # ===============================
 # INTERFAZ
 # ===============================
@@ -412,10 +301,7 @@ with tab1:
 
                         else:
 
-                            password_hash = bcrypt.hashpw(
-                                password.encode(),
-                                bcrypt.gensalt()
-                            ).decode()
+                            password_hash = hashear_contrasena(password)
 
                             cursor.execute("""
                                 INSERT INTO usuarios
@@ -470,7 +356,8 @@ with tab1:
                 usuario_id,
                 nombre,
                 email,
-                rol
+                rol,
+                activo
             FROM usuarios
             ORDER BY nombre
         """, conn)
@@ -550,6 +437,12 @@ with tab1:
                         key=f"config_editar_usuario_rol_{usuario_sel}"
                     )
 
+                    nuevo_activo = st.checkbox(
+                        "Activo",
+                        value=bool(user_data["activo"]),
+                        key=f"config_editar_usuario_activo_{usuario_sel}"
+                    )
+
                     cambiar_pass = st.checkbox(
                         "Cambiar contraseña",
                         key=f"config_editar_usuario_cambiar_pass_{usuario_sel}"
@@ -580,6 +473,13 @@ with tab1:
 
                     st.warning("Ingresa la nueva contraseña.")
 
+                elif not nuevo_activo and usuario_sel == (
+                    st.session_state["usuario"].get("id")
+                    or st.session_state["usuario"].get("usuario_id")
+                ):
+
+                    st.warning("No puedes desactivar tu propio usuario.")
+
                 else:
 
                     try:
@@ -604,10 +504,7 @@ with tab1:
 
                             if cambiar_pass:
 
-                                password_hash = bcrypt.hashpw(
-                                    nueva_pass.encode(),
-                                    bcrypt.gensalt()
-                                ).decode()
+                                password_hash = hashear_contrasena(nueva_pass)
 
                                 cursor.execute("""
                                     UPDATE usuarios
@@ -615,12 +512,14 @@ with tab1:
                                         nombre = %s,
                                         email = %s,
                                         rol = %s,
+                                        activo = %s,
                                         password_hash = %s
                                     WHERE usuario_id = %s
                                 """, (
                                     nuevo_nombre.strip(),
                                     nuevo_email.strip(),
                                     nuevo_rol,
+                                    nuevo_activo,
                                     password_hash,
                                     usuario_sel
                                 ))
@@ -632,15 +531,21 @@ with tab1:
                                     SET
                                         nombre = %s,
                                         email = %s,
-                                        rol = %s
+                                        rol = %s,
+                                        activo = %s
                                     WHERE usuario_id = %s
                                 """, (
                                     nuevo_nombre.strip(),
                                     nuevo_email.strip(),
                                     nuevo_rol,
+                                    nuevo_activo,
                                     usuario_sel
                                 ))
 
+                            # Los "Recordarme" emitidos antes ya no sirven
+                            # (rol, contraseña o desactivación).
+                            revocar_sesiones(cursor, usuario_sel)
+
                             conn.commit()
 
                             registrar_log_seguro(
@@ -817,30 +722,31 @@ with tab1:
 
                             nuevo_rol_id = cursor.fetchone()[0]
 
-                            for _, pagina in df_paginas.iterrows():
+                            cursor.execute("""
+                                INSERT INTO permisos_rol_pagina
+                                (
+                                    rol_id,
+                                    pagina_id,
+                                    puede_ver
+                                )
+                                SELECT
+                                    %s,
+                                    pagina_id,
+                                    FALSE
+                                FROM paginas_sistema
+                                WHERE activo = TRUE
+                                ON CONFLICT (rol_id, pagina_id)
+                                DO NOTHING;
+                            """, (
+                                int(nuevo_rol_id),
+                            ))
 
-                                cursor.execute("""
-                                    INSERT INTO permisos_rol_pagina
-                                    (
-                                        rol_id,
-                                        pagina_id,
-                                        puede_ver
-                                    )
-                                    VALUES
-                                    (
-                                        %s,
-                                        %s,
-                                        FALSE
-                                    )
-                                    ON CONFLICT (rol_id, pagina_id)
-                                    DO NOTHING;
-                                """, (
-                                    int(nuevo_rol_id),
-                                    int(pagina["pagina_id"])
-                                ))
+                            incrementar_version_permisos(cursor)
 
                             conn.commit()
 
+                            invalidar_permisos()
+
                             registrar_log_seguro(
                                 st.session_state["usuario"],
                                 "ALTA_ROL",
@@ -894,10 +800,10 @@ with tab1:
         st.divider()
 
         # -------------------------------
-        # CONFIGURAR PERMISOS
+        # MATRIZ DE PERMISOS
         # -------------------------------
 
-        st.markdown("### Configurar permisos por rol")
+        st.markdown("### Permisos por rol")
 
         if df_roles.empty or df_paginas.empty:
 
@@ -905,6 +811,94 @@ with tab1:
 
         else:
 
+            df_matriz, paginas_matriz = cargar_matriz_permisos(conn)
+
+            st.info(
+                "Marca las páginas que cada rol podrá visualizar. "
+                "Solo se guardan las celdas que cambies."
+            )
+
+            st.caption(
+                "El rol administrador tiene acceso completo por seguridad; "
+                "sus casillas no lo bloquean."
+            )
+
+            with st.form("config_form_matriz_permisos"):
+
+                df_matriz_editada = st.data_editor(
+                    df_matriz,
+                    hide_index=True,
+                    use_container_width=True,
+                    disabled=["rol"],
+                    column_config={
+                        "rol": st.column_config.TextColumn("Rol"),
+                        **{
+                            clave: st.column_config.CheckboxColumn(nombre)
+                            for clave, (_, nombre) in paginas_matriz.items()
+                        }
+                    },
+                    key="config_matriz_permisos"
+                )
+
+                guardar_matriz = st.form_submit_button(
+                    "Guardar permisos",
+                    use_container_width=True
+                )
+
+            if guardar_matriz:
+
+                rol_ids, pagina_ids, valores = diferencias_permisos(
+                    df_matriz,
+                    df_matriz_editada,
+                    paginas_matriz
+                )
+
+                if not rol_ids:
+
+                    st.info("No hay cambios en los permisos.")
+
+                else:
+
+                    try:
+
+                        guardar_permisos(cursor, rol_ids, pagina_ids, valores)
+
+                        conn.commit()
+
+                        invalidar_permisos()
+
+                        roles_modificados = sorted({
+                            df_matriz.at[rol_id, "rol"]
+                            for rol_id in rol_ids
+                        })
+
+                        registrar_log_seguro(
+                            st.session_state["usuario"],
+                            "MODIFICACION_PERMISOS_ROL",
+                            f"Actualizó {len(rol_ids)} permisos de los roles "
+                            f"{', '.join(roles_modificados)}"
+                        )
+
+                        st.success("Permisos actualizados correctamente.")
+
+                        st.rerun()
+
+                    except Exception as e:
+
+                        conn.rollback()
+
+                        st.error(f"Error: {e}")
+
+        st.divider()
+
+        # -------------------------------
+        # EDITAR ROL
+        # -------------------------------
+
+        st.markdown("### Editar rol")
+
+        if not df_roles.empty:
+
             roles_dict = {
                 int(row["rol_id"]): f"{row['nombre']} ({row['clave']})"
                 for _, row in df_roles.iterrows()
@@ -923,62 +917,6 @@ with tab1:
 
             rol_clave = str(rol_data["clave"]).lower()
 
-            try:
-
-                for _, pagina in df_paginas.iterrows():
-
-                    cursor.execute("""
-                        INSERT INTO permisos_rol_pagina
-                        (
-                            rol_id,
-                            pagina_id,
-                            puede_ver
-                        )
-                        VALUES
-                        (
-                            %s,
-                            %s,
-                            FALSE
-                        )
-                        ON CONFLICT (rol_id, pagina_id)
-                        DO NOTHING;
-                    """, (
-                        int(rol_id_sel),
-                        int(pagina["pagina_id"])
-                    ))
-
-                conn.commit()
-
-            except Exception as e:
-
-                conn.rollback()
-
-                st.error(f"Error al preparar permisos: {e}")
-
-            df_permisos = pd.read_sql("""
-                SELECT
-                    p.pagina_id,
-                    p.clave,
-                    p.nombre,
-                    p.ruta,
-                    COALESCE(prp.puede_ver, FALSE) AS puede_ver
-                FROM paginas_sistema p
-                LEFT JOIN permisos_rol_pagina prp
-                    ON p.pagina_id = prp.pagina_id
-                    AND prp.rol_id = %s
-                WHERE p.activo = TRUE
-                ORDER BY p.orden, p.nombre;
-            """, conn, params=(int(rol_id_sel),))
-
-            st.info("Marca las páginas que este rol podrá visualizar.")
-
-            if rol_clave in ["admin", "administrador"]:
-
-                st.warning(
-                    "El rol administrador tiene acceso completo por seguridad. "
-                    "Aunque cambies permisos aquí, no se recomienda bloquearlo."
-                )
-
             with st.form(f"config_form_permisos_rol_{rol_id_sel}"):
 
                 nuevo_nombre_rol = st.text_input(
@@ -993,18 +931,6 @@ with tab1:
                     key=f"config_editar_descripcion_rol_{rol_id_sel}"
                 )
 
-                permisos_nuevos = {}
-
-                st.markdown("#### Páginas visibles")
-
-                for _, pagina in df_permisos.iterrows():
-
-                    permisos_nuevos[int(pagina["pagina_id"])] = st.checkbox(
-                        pagina["nombre"],
-                        value=bool(pagina["puede_ver"]),
-                        key=f"permiso_rol_{rol_id_sel}_pagina_{pagina['pagina_id']}"
-                    )
-
                 estado_rol = st.selectbox(
                     "Estado del rol",
                     [
@@ -1016,12 +942,12 @@ with tab1:
                     disabled=rol_clave in ["admin", "administrador"]
                 )
 
-                guardar_permisos = st.form_submit_button(
+                guardar_permisos_rol = st.form_submit_button(
                     "Guardar cambios del rol",
                     use_container_width=True
                 )
 
-            if guardar_permisos:
+            if guardar_permisos_rol:
 
                 if not nuevo_nombre_rol.strip():
 
@@ -1031,30 +957,6 @@ with tab1:
 
                     try:
 
-                        for pagina_id, puede_ver in permisos_nuevos.items():
-
-                            cursor.execute("""
-                                INSERT INTO permisos_rol_pagina
-                                (
-                                    rol_id,
-                                    pagina_id,
-                                    puede_ver
-                                )
-                                VALUES
-                                (
-                                    %s,
-                                    %s,
-                                    %s
-                                )
-                                ON CONFLICT (rol_id, pagina_id)
-                                DO UPDATE SET
-                                    puede_ver = EXCLUDED.puede_ver;
-                            """, (
-                                int(rol_id_sel),
-                                int(pagina_id),
-                                bool(puede_ver)
-                            ))
-
                         if rol_clave in ["admin", "administrador"]:
 
                             cursor.execute("""
@@ -1086,15 +988,19 @@ with tab1:
                                 int(rol_id_sel)
                             ))
 
+                        incrementar_version_permisos(cursor)
+
                         conn.commit()
 
+                        invalidar_permisos()
+
                         registrar_log_seguro(
                             st.session_state["usuario"],
-                            "MODIFICACION_PERMISOS_ROL",
-                            f"Actualizó permisos del rol {rol_data['nombre']}"
+                            "MODIFICACION_ROL",
+                            f"Actualizó el rol {rol_data['nombre']}"
                         )
 
-                        st.success("Rol y permisos actualizados correctamente.")
+                        st.success("Rol actualizado correctamente.")
 
                         st.rerun()
 
@@ -1411,31 +1317,27 @@ with tab3:
     st.subheader("Logs del sistema")
 
     # ===============================
-    # CARGA DE DATOS
+    # CATÁLOGOS DE FILTROS
     # ===============================
+    # Los logs no se cargan completos: los filtros se aplican en SQL
+    # y solo se lee la página que se muestra. Usuarios, acciones, rango
+    # de fechas y total salen de consultas baratas (logs_facetas,
+    # MIN/MAX por índice, estimado del planificador) con un cache
+    # corto propio que se vacía al escribir logs nuevos.
 
-    df_logs = pd.read_sql("""
-        SELECT
-            log_id,
-            usuario_nombre,
-            accion,
-            descripcion,
-            fecha
-        FROM logs_auditoria
-        ORDER BY fecha DESC;
-    """, conn)
+    (
+        df_catalogo_logs,
+        primera_fecha,
+        ultima_fecha,
+        (total_logs, total_exacto)
+    ) = resumen_logs(conn)
 
-    if df_logs.empty:
+    if pd.isnull(ultima_fecha):
 
         st.info("Todavía no hay logs registrados en el sistema.")
 
     else:
 
-        df_logs["fecha"] = pd.to_datetime(
-            df_logs["fecha"],
-            errors="coerce"
-        )
-
         # ===============================
         # RESUMEN RÁPIDO
         # ===============================
@@ -1448,21 +1350,21 @@ with tab3:
 
             st.metric(
                 "Total de logs",
-                len(df_logs)
+                f"{total_logs:,}" if total_exacto else f"~{total_logs:,}"
             )
 
         with col2:
 
             st.metric(
                 "Usuarios únicos",
-                df_logs["usuario_nombre"].nunique()
+                df_catalogo_logs["usuario_nombre"].nunique()
             )
 
         with col3:
 
             st.metric(
                 "Acciones distintas",
-                df_logs["accion"].nunique()
+                df_catalogo_logs["accion"].nunique()
             )
 
         st.divider()
@@ -1475,23 +1377,21 @@ with tab3:
 
         usuarios = (
             ["Todos"] +
-            sorted(df_logs["usuario_nombre"].dropna().unique().tolist())
+            sorted(df_catalogo_logs["usuario_nombre"].dropna().unique().tolist())
         )
 
         acciones = (
             ["Todas"] +
-            sorted(df_logs["accion"].dropna().unique().tolist())
+            sorted(df_catalogo_logs["accion"].dropna().unique().tolist())
         )
 
-        anios = (
-            ["Todos"] +
-            sorted(df_logs["fecha"].dropna().dt.year.unique().tolist(), reverse=True)
-        )
+        anios = ["Todos"]
 
-        meses = (
-            ["Todos"] +
-            sorted(df_logs["fecha"].dropna().dt.month.unique().tolist())
-        )
+        if pd.notnull(primera_fecha) and pd.notnull(ultima_fecha):
+
+            anios += list(range(ultima_fecha.year, primera_fecha.year - 1, -1))
+
+        meses = ["Todos"] + list(range(1, 13))
 
         col1, col2, col3, col4 = st.columns(4)
 
@@ -1555,90 +1455,45 @@ with tab3:
         # APLICAR FILTROS
         # ===============================
 
-        df_filt = df_logs.copy()
-
-        if usuario_sel != "Todos":
-
-            df_filt = df_filt[
-                df_filt["usuario_nombre"] == usuario_sel
-            ]
-
-        if accion_sel != "Todas":
-
-            df_filt = df_filt[
-                df_filt["accion"] == accion_sel
-            ]
-
-        if anio_sel != "Todos":
-
-            df_filt = df_filt[
-                df_filt["fecha"].dt.year == int(anio_sel)
-            ]
-
-        if mes_sel != "Todos":
-
-            df_filt = df_filt[
-                df_filt["fecha"].dt.month == int(mes_sel)
-            ]
-
-        if busqueda.strip():
-
-            df_filt = df_filt[
-                df_filt["descripcion"]
-                .astype(str)
-                .str.contains(
-                    busqueda.strip(),
-                    case=False,
-                    na=False
-                )
-            ]
+        where_logs, parametros_logs = (
+            FiltroSQL()
+            .igual("usuario_nombre", None if usuario_sel == "Todos" else usuario_sel)
+            .igual("accion", None if accion_sel == "Todas" else accion_sel)
+            .periodo(
+                "fecha",
+                anio=None if anio_sel == "Todos" else int(anio_sel),
+                mes=None if mes_sel == "Todos" else int(mes_sel),
+                anios=anios[1:]
+            )
+            .contiene("descripcion", busqueda)
+            .where()
+        )
 
         # ===============================
         # PAGINACIÓN
         # ===============================
 
-        total = len(df_filt)
-
-        total_pages = max(
-            1,
-            (total - 1) // int(page_size) + 1
+        paginador_logs = PaginadorKeyset(
+            "config_logs_pagina",
+            """
+                log_id,
+                usuario_nombre,
+                accion,
+                descripcion,
+                fecha
+            """,
+            "FROM logs_auditoria",
+            [
+                ClaveOrden("fecha", descendente=True),
+                ClaveOrden("log_id", descendente=True)
+            ],
+            where_sql=where_logs,
+            parametros=parametros_logs,
+            tamano_pagina=page_size,
+            salto_fecha=True
         )
 
-        if "config_logs_page" not in st.session_state:
-            st.session_state["config_logs_page"] = 1
-
-        if st.session_state["config_logs_page"] > total_pages:
-            st.session_state["config_logs_page"] = 1
-
-        col1, col2, col3 = st.columns([1, 1, 2])
-
-        with col1:
-
-            page = st.number_input(
-                "Página",
-                min_value=1,
-                max_value=total_pages,
-                value=st.session_state["config_logs_page"],
-                step=1,
-                key="config_logs_page"
-            )
-
-        with col2:
-
-            st.metric(
-                "Resultados",
-                total
-            )
-
-        with col3:
-
-            st.caption(
-                f"Página {page} de {total_pages}. "
-                f"Mostrando máximo {page_size} registros."
-            )
-
-        start = (int(page) - 1) * int(page_size)
-        end = start + int(page_size)
+        df_pagina_logs = paginador_logs.cargar(conn)
 
         # ===============================
         # TABLA
@@ -1646,15 +1501,18 @@ with tab3:
 
         st.markdown("### Registros de actividad")
 
-        if df_filt.empty:
+        if df_pagina_logs.empty:
 
             st.info("No hay logs que coincidan con los filtros seleccionados.")
 
         else:
 
-            df_mostrar = df_filt.iloc[start:end].copy()
+            df_mostrar = df_pagina_logs.copy()
 
-            df_mostrar["fecha"] = df_mostrar["fecha"].dt.strftime(
+            df_mostrar["fecha"] = pd.to_datetime(
+                df_mostrar["fecha"],
+                errors="coerce"
+            ).dt.strftime(
                 "%d/%m/%Y %H:%M"
             )
 
@@ -1672,9 +1530,7 @@ with tab3:
                 hide_index=True
             )
 
-            st.caption(
-                f"Mostrando {len(df_mostrar)} de {total} registros filtrados."
-            )
+        paginador_logs.mostrar_controles()
 
 
 
@@ -1686,4 +1542,4 @@ try:
     cursor.close()
     conn.close()
 except Exception:
-    pass
\ No newline at end of file
+    pass
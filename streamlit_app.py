@@ -1,58 +1,105 @@
 import streamlit as st
-import bcrypt
-from utils.conexionASupabase import get_connection
-
-st.set_page_config(
-    page_title="Sistema Farmacias",
-    layout="centered",
-    initial_sidebar_state="collapsed"  # 👈 IMPORTANTE
+from utils.conexionASupabase import liberar_conexion_rerun, obtener_conexion
+from utils.contrasenas import (
+    actualizar_hash_si_cambio_costo,
+    nuevo_hash_si_cambio_costo,
+    verificar_contrasena
+)
+from utils.instrumentacion import mostrar_panel_consultas
+from utils.migraciones import asegurar_migraciones, mostrar_estado_migraciones
+from utils.navegacion import construir_navegacion
+from utils.permisos import calcular_paginas_visibles
+from utils.sesiones import (
+    aplicar_cookie,
+    recordar_disponible,
+    recordar_sesion,
+    restaurar_sesion
 )
-# Ocultar sidebar si no hay sesión
-if "usuario" not in st.session_state:
-    st.markdown(
-        """
-        <style>
-        [data-testid="stSidebar"] { display: none; }
-        </style>
-        """,
-        unsafe_allow_html=True
+
+
+def pantalla_login():
+    st.set_page_config(
+        page_title="Sistema Farmacias",
+        layout="centered",
+        initial_sidebar_state="collapsed"  # 👈 IMPORTANTE
     )
-# Si YA hay sesión, redirigir
-if "usuario" in st.session_state:
-    st.switch_page("pages/1_Dashboard_Farmacias.py")
-
-st.title("Farmacias GI")
-
-email = st.text_input("Correo")
-password = st.text_input("Contraseña", type="password")
-
-if st.button("Ingresar"):
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT usuario_id, nombre, password_hash, rol
-        FROM usuarios
-        WHERE email = %s AND activo = TRUE
-    """, (email,))
-
-    user = cursor.fetchone()
-    cursor.close()
-    conn.close()
-
-    if user:
-        if bcrypt.checkpw(password.encode(), user[2].encode()):
-            st.session_state["usuario"] = {
-                "id": user[0],
-                "nombre": user[1],
-                "rol": user[3]
-            }
-            st.success(f"Bienvenido {user[1]}")
-            st.rerun()
+
+    st.title("Farmacias GI")
+
+    email = st.text_input("Correo")
+    password = st.text_input("Contraseña", type="password")
+
+    recordar = False
+
+    if recordar_disponible():
+        recordar = st.checkbox("Recordarme en este equipo")
+
+    if st.button("Ingresar"):
+        with obtener_conexion() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                SELECT usuario_id, nombre, password_hash, rol
+                FROM usuarios
+                WHERE email = %s AND activo = TRUE
+            """, (email,))
+
+            user = cursor.fetchone()
+            cursor.close()
+
+        # bcrypt corre sin conexión prestada: un grupo de logins
+        # esperando su turno no deja sin conexiones a las páginas.
+        valido = (
+            user is not None
+            and verificar_contrasena(password, user[2])
+        )
+
+        if valido:
+            hash_nuevo = nuevo_hash_si_cambio_costo(password, user[2])
+
+            # Solo para escribir: el hash, las páginas y el token.
+            with obtener_conexion() as conn:
+                actualizar_hash_si_cambio_costo(conn, user[0], user[2], hash_nuevo)
+
+                st.session_state["usuario"] = {
+                    "id": user[0],
+                    "nombre": user[1],
+                    "rol": user[3]
+                }
+
+                # Las páginas del rol se calculan una vez aquí;
+                # la navegación y cada página usan este conjunto.
+                calcular_paginas_visibles(conn)
+
+                if recordar:
+                    recordar_sesion(conn, user[0])
+
+        if user:
+            if valido:
+                st.success(f"Bienvenido {user[1]}")
+                st.rerun()
+            else:
+                st.error("❌ Contraseña incorrecta")
         else:
-            st.error("❌ Contraseña incorrecta")
-    else:
-        st.error("❌ Usuario no encontrado")
+            st.error("❌ Usuario no encontrado")
+
+
+# Esquema al día; después de la primera vez solo consulta el cache.
+asegurar_migraciones()
 
+# Una cookie de "Recordarme" válida evita volver a pedir la contraseña.
+restaurar_sesion()
+aplicar_cookie()
 
+# Si una migración falló, solo los administradores ven el error.
+mostrar_estado_migraciones()
 
+# Sin sesión solo existe el login; con sesión, las páginas del rol.
+# st.stop y st.rerun cortan la página antes de su conn.close(); la
+# conexión se devuelve aquí en cualquier caso y el panel de consultas
+# (solo admin) se dibuja también en esos caminos.
+try:
+    construir_navegacion(pantalla_login).run()
+finally:
+    liberar_conexion_rerun()
+    mostrar_panel_consultas()
@@ -0,0 +1,224 @@
+import pandas as pd
+
+from utils.resumen_diario import origen_resumen_diario
+
+
+COLUMNAS_RESUMEN = [
+    "ventas_totales",
+    "venta_efectivo",
+    "venta_tarjeta",
+    "monto",
+    "registros_ventas",
+    "registros_gastos"
+]
+
+
+def _resumen_vacio():
+    return {
+        columna: 0
+        for columna in COLUMNAS_RESUMEN
+    }
+
+
+def cargar_agregados_periodo(
+    conn,
+    farmacia_sel,
+    fecha_inicio,
+    fecha_fin,
+    fecha_inicio_ant=None,
+    fecha_fin_ant=None
+):
+    """
+    Calcula en Postgres, en un solo viaje, los totales que usa el dashboard:
+
+    - resumen ejecutivo del periodo actual y del anterior
+    - rendimiento por farmacia del periodo actual
+    - gastos por categoría del periodo actual
+
+    Los totales salen de resumen_diario (una fila por farmacia y día,
+    ver origen_resumen_diario);
+    solo el desglose por categoría lee gastos, y únicamente del periodo
+    actual. GROUPING SETS sobre (farmacia) y (categoria) devuelve todo
+    en unas cuantas filas. El periodo anterior siempre termina donde
+    empieza el actual, por eso basta un solo rango de fechas.
+    """
+
+    condiciones_dia = []
+    parametros_dia = []
+
+    condiciones_gasto = []
+    parametros_gasto = []
+
+    if farmacia_sel != "Todas":
+        condiciones_dia.append("f.nombre = %s")
+        parametros_dia.append(farmacia_sel)
+
+        condiciones_gasto.append("f.nombre = %s")
+        parametros_gasto.append(farmacia_sel)
+
+    hay_anterior = (
+        fecha_inicio is not None
+        and fecha_inicio_ant is not None
+        and fecha_fin_ant is not None
+    )
+
+    if fecha_inicio is not None and fecha_fin is not None:
+        condiciones_dia.append("r.fecha >= %s")
+        parametros_dia.append(
+            fecha_inicio_ant if hay_anterior else fecha_inicio
+        )
+
+        condiciones_dia.append("r.fecha < %s")
+        parametros_dia.append(fecha_fin)
+
+        condiciones_gasto.append("g.fecha >= %s")
+        parametros_gasto.append(fecha_inicio)
+
+        condiciones_gasto.append("g.fecha < %s")
+        parametros_gasto.append(fecha_fin)
+
+    if hay_anterior:
+        periodo_sql = "CASE WHEN r.fecha >= %s THEN 'actual' ELSE 'anterior' END"
+        parametros_periodo = [fecha_inicio]
+    else:
+        periodo_sql = "'actual'"
+        parametros_periodo = []
+
+    where_dia = (
+        "WHERE " + " AND ".join(condiciones_dia)
+        if condiciones_dia
+        else ""
+    )
+
+    where_gasto = (
+        "WHERE " + " AND ".join(condiciones_gasto)
+        if condiciones_gasto
+        else ""
+    )
+
+    query = f"""
+        WITH movimientos AS (
+            SELECT
+                {periodo_sql} AS periodo,
+                f.nombre AS farmacia,
+                'dia' AS origen,
+                NULL::TEXT AS categoria,
+                r.ventas_totales,
+                r.venta_efectivo,
+                r.venta_tarjeta,
+                r.gastos_total AS monto,
+                r.registros_ventas,
+                r.registros_gastos
+            FROM {origen_resumen_diario()} r
+            JOIN farmacias f
+                ON r.farmacia_id = f.farmacia_id
+            {where_dia}
+
+            UNION ALL
+
+            SELECT
+                'actual' AS periodo,
+                f.nombre AS farmacia,
+                'gasto' AS origen,
+                COALESCE(g.categoria, 'Sin categoría') AS categoria,
+                0 AS ventas_totales,
+                0 AS venta_efectivo,
+                0 AS venta_tarjeta,
+                COALESCE(g.monto, 0) AS monto,
+                0 AS registros_ventas,
+                1 AS registros_gastos
+            FROM gastos g
+            JOIN farmacias f
+                ON g.farmacia_id = f.farmacia_id
+            {where_gasto}
+        )
+        SELECT
+            periodo,
+            origen,
+            farmacia,
+            categoria,
+            GROUPING(farmacia) AS agrupa_farmacia,
+            GROUPING(categoria) AS agrupa_categoria,
+            SUM(ventas_totales) AS ventas_totales,
+            SUM(venta_efectivo) AS venta_efectivo,
+            SUM(venta_tarjeta) AS venta_tarjeta,
+            SUM(monto) AS monto,
+            SUM(registros_ventas) AS registros_ventas,
+            SUM(registros_gastos) AS registros_gastos
+        FROM movimientos
+        GROUP BY GROUPING SETS (
+            (periodo, origen),
+            (periodo, origen, farmacia),
+            (periodo, origen, categoria)
+        );
+    """
+
+    parametros = (
+        parametros_periodo
+        + parametros_dia
+        + parametros_gasto
+    )
+
+    df = pd.read_sql(
+        query,
+        conn,
+        params=tuple(parametros)
+    )
+
+    for columna in COLUMNAS_RESUMEN:
+        df[columna] = pd.to_numeric(
+            df[columna],
+            errors="coerce"
+        ).fillna(0)
+
+    resumenes = {
+        "actual": _resumen_vacio(),
+        "anterior": _resumen_vacio()
+    }
+
+    df_totales = df[
+        (df["origen"] == "dia")
+        & (df["agrupa_farmacia"] == 1)
+        & (df["agrupa_categoria"] == 1)
+    ]
+
+    for _, fila in df_totales.iterrows():
+        resumenes[fila["periodo"]] = {
+            columna: fila[columna]
+            for columna in COLUMNAS_RESUMEN
+        }
+
+    df_rendimiento = df[
+        (df["periodo"] == "actual")
+        & (df["origen"] == "dia")
+        & (df["agrupa_farmacia"] == 0)
+    ][
+        [
+            "farmacia",
+            "ventas_totales",
+            "venta_efectivo",
+            "venta_tarjeta",
+            "monto"
+        ]
+    ].reset_index(drop=True)
+
+    df_categorias = df[
+        (df["periodo"] == "actual")
+        & (df["agrupa_categoria"] == 0)
+        & (df["origen"] == "gasto")
+    ][
+        [
+            "categoria",
+            "monto"
+        ]
+    ].sort_values(
+        "monto",
+        ascending=False
+    ).reset_index(drop=True)
+
+    return {
+        "actual": resumenes["actual"],
+        "anterior": resumenes["anterior"] if hay_anterior else None,
+        "rendimiento": df_rendimiento,
+        "categorias": df_categorias
+    }
@@ -0,0 +1,276 @@
+import sys
+import threading
+import time
+
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+
+
+# ===============================
+# CONFIGURACIÓN
+# ===============================
+
+TTL_DEFAULT = 600
+MEMORIA_MAXIMA_MB_DEFAULT = 64
+
+
+def _secreto(clave, default):
+    try:
+        return st.secrets.get(clave, default)
+    except Exception:
+        return default
+
+
+def tamano_resultado(valor):
+    """
+    Memoria aproximada de un resultado: DataFrames con deep=True,
+    y la suma de sus partes para dict, list y tuple.
+    """
+
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(
+            tamano_resultado(v)
+            for v in valor.values()
+        )
+
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(
+            tamano_resultado(v)
+            for v in valor
+        )
+
+    return sys.getsizeof(valor)
+
+
+def _copiar(valor):
+    # Cada sesión recibe su propia copia para que nadie modifique
+    # el DataFrame guardado en el cache.
+    if isinstance(valor, pd.DataFrame):
+        return valor.copy()
+
+    if isinstance(valor, dict):
+        return {
+            clave: _copiar(v)
+            for clave, v in valor.items()
+        }
+
+    if isinstance(valor, list):
+        return [_copiar(v) for v in valor]
+
+    if isinstance(valor, tuple):
+        return tuple(_copiar(v) for v in valor)
+
+    return valor
+
+
+class _Entrada:
+
+    def __init__(self, valor, tamano, farmacias, fecha_inicio, fecha_fin):
+        self.valor = valor
+        self.tamano = tamano
+        self.creada = time.monotonic()
+        self.farmacias = farmacias
+        self.fecha_inicio = fecha_inicio
+        self.fecha_fin = fecha_fin
+
+    def afectada_por(self, farmacia, fecha):
+        if self.farmacias is not None and farmacia not in self.farmacias:
+            return False
+
+        if fecha is None:
+            return True
+
+        if self.fecha_inicio is not None and fecha < self.fecha_inicio:
+            return False
+
+        if self.fecha_fin is not None and fecha >= self.fecha_fin:
+            return False
+
+        return True
+
+
+class CacheResultados:
+    """
+    Cache de resultados compartido por todas las sesiones.
+
+    - Expira cada entrada después de ttl segundos.
+    - Desaloja la menos usada cuando la memoria total supera el máximo.
+    - Cada entrada recuerda qué farmacias y rango de fechas cubre; al
+      registrar, editar o eliminar una venta o gasto se invalidan solo
+      las entradas que incluyen esa farmacia y fecha.
+    """
+
+    def __init__(self, memoria_maxima, ttl):
+        self._memoria_maxima = memoria_maxima
+        self._ttl = ttl
+
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+        self._memoria = 0
+
+        # Cambia con cada escritura; si cambió mientras se calculaba
+        # un resultado, ese resultado no se guarda.
+        self._version_datos = 0
+
+        self._contadores = {
+            "aciertos": 0,
+            "fallos": 0,
+            "expiradas": 0,
+            "desalojos": 0,
+            "invalidaciones": 0
+        }
+
+    def _quitar(self, clave):
+        entrada = self._entradas.pop(clave)
+        self._memoria -= entrada.tamano
+
+    def obtener(
+        self,
+        clave,
+        cargar,
+        farmacias=None,
+        fecha_inicio=None,
+        fecha_fin=None
+    ):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+
+            if entrada is not None:
+                if time.monotonic() - entrada.creada <= self._ttl:
+                    self._entradas.move_to_end(clave)
+                    self._contadores["aciertos"] += 1
+                    return _copiar(entrada.valor)
+
+                self._quitar(clave)
+                self._contadores["expiradas"] += 1
+
+            self._contadores["fallos"] += 1
+            version = self._version_datos
+
+        valor = cargar()
+        tamano = tamano_resultado(valor)
+
+        with self._lock:
+            if version != self._version_datos:
+                return valor
+
+            if tamano > self._memoria_maxima:
+                return valor
+
+            if clave in self._entradas:
+                self._quitar(clave)
+
+            self._entradas[clave] = _Entrada(
+                _copiar(valor),
+                tamano,
+                farmacias,
+                fecha_inicio,
+                fecha_fin
+            )
+            self._memoria += tamano
+
+            while self._memoria > self._memoria_maxima:
+                clave_vieja = next(iter(self._entradas))
+                self._quitar(clave_vieja)
+                self._contadores["desalojos"] += 1
+
+        return valor
+
+    def invalidar(self, farmacia, fecha=None):
+        with self._lock:
+            self._version_datos += 1
+
+            afectadas = [
+                clave
+                for clave, entrada in self._entradas.items()
+                if entrada.afectada_por(farmacia, fecha)
+            ]
+
+            for clave in afectadas:
+                self._quitar(clave)
+
+            self._contadores["invalidaciones"] += len(afectadas)
+
+        return len(afectadas)
+
+    def limpiar(self):
+        with self._lock:
+            self._version_datos += 1
+            self._entradas.clear()
+            self._memoria = 0
+
+    def estadisticas(self):
+        with self._lock:
+            datos = dict(self._contadores)
+            datos["entradas"] = len(self._entradas)
+            datos["memoria"] = self._memoria
+            datos["memoria_maxima"] = self._memoria_maxima
+
+        return datos
+
+
+@st.cache_resource(show_spinner=False)
+def obtener_cache_datos():
+    """
+    Un solo cache por proceso del servidor, compartido por todas las sesiones.
+    """
+
+    memoria_mb = float(_secreto(
+        "cache_datos_memoria_mb",
+        MEMORIA_MAXIMA_MB_DEFAULT
+    ))
+
+    return CacheResultados(
+        memoria_maxima=int(memoria_mb * 1024 * 1024),
+        ttl=float(_secreto("cache_datos_ttl", TTL_DEFAULT))
+    )
+
+
+def consultar_con_cache(
+    nombre,
+    argumentos,
+    cargar,
+    farmacias=None,
+    fecha_inicio=None,
+    fecha_fin=None
+):
+    """
+    Devuelve el resultado guardado para (nombre, argumentos) o llama
+    cargar() y lo guarda.
+
+    farmacias (nombres, None = todas) y el rango [fecha_inicio, fecha_fin)
+    indican qué escrituras invalidan este resultado.
+    """
+
+    return obtener_cache_datos().obtener(
+        (nombre,) + tuple(argumentos),
+        cargar,
+        farmacias=(
+            frozenset(farmacias)
+            if farmacias is not None
+            else None
+        ),
+        fecha_inicio=fecha_inicio,
+        fecha_fin=fecha_fin
+    )
+
+
+def invalidar_datos(farmacia, fecha=None):
+    """
+    Llamar después de registrar, editar o eliminar una venta o gasto.
+    Sin fecha se invalida todo lo de esa farmacia.
+    """
+
+    try:
+        if fecha is not None:
+            fecha = pd.to_datetime(fecha).date()
+
+        return obtener_cache_datos().invalidar(farmacia, fecha)
+    except Exception as e:
+        print(f"Error al invalidar cache de datos: {e}")
+        return 0
@@ -1,11 +1,382 @@
+import threading
+import time
+import weakref
+
+from contextlib import contextmanager
+
 import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
 import streamlit as st
 
+from utils.instrumentacion import (
+    CursorInstrumentado,
+    reiniciar_consultas_rerun
+)
+
+
+# ===============================
+# CONFIGURACIÓN DEL POOL
+# ===============================
+
+POOL_MAXIMO_DEFAULT = 10
+ESPERA_MAXIMA_DEFAULT = 15
+VIDA_MAXIMA_DEFAULT = 1800
+VALIDAR_DESPUES_DE_DEFAULT = 30
+
+# Conexión de página prestada en el rerun actual. Cada sesión corre su
+# script en su propio hilo, así que basta con un valor por hilo.
+_rerun = threading.local()
+
+
+def _parametros_conexion():
+    return {
+        "host": st.secrets["db_host"],
+        "database": st.secrets["db_name"],
+        "user": st.secrets["db_user"],
+        "password": st.secrets["db_password"],
+        "port": st.secrets["db_port"]
+    }
+
+
+class _ConexionFisica:
+    """
+    Conexión real a Supabase junto con los datos que el pool
+    necesita para decidir si sigue siendo utilizable.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.creada = time.monotonic()
+        self.ultimo_uso = self.creada
+
+
+class ConexionPool:
+    """
+    Conexión prestada por el pool.
+
+    Se comporta como una conexión de psycopg2 (cursor, commit,
+    rollback, etc.). Al llamar close() la conexión regresa al pool
+    en lugar de cerrarse. close() se puede llamar varias veces; el
+    finalizador es solo la última red si nadie la cerró.
+    """
+
+    def __init__(self, pool, fisica):
+        self._pool = pool
+        self._fisica = fisica
+        self._finalizador = weakref.finalize(
+            self,
+            pool._devolver,
+            fisica
+        )
+
+    @property
+    def conexion_fisica(self):
+        return self._fisica.conn
+
+    def close(self):
+        self._finalizador()
+
+    @property
+    def closed(self):
+        if not self._finalizador.alive:
+            return 1
+
+        return self._fisica.conn.closed
+
+    def __getattr__(self, nombre):
+        if nombre.startswith("_"):
+            raise AttributeError(nombre)
+
+        if not self._finalizador.alive:
+            raise psycopg2.InterfaceError("La conexión ya fue devuelta al pool.")
+
+        return getattr(self._fisica.conn, nombre)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_error, error, traza):
+        if tipo_error is not None:
+            try:
+                self._fisica.conn.rollback()
+            except Exception:
+                pass
+
+        self.close()
+        return False
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones compartido por todas las sesiones del servidor.
+
+    - Limita el número de conexiones abiertas a Supabase.
+    - Valida la conexión al prestarla y recicla las viejas o caídas.
+    - Lleva contadores de préstamos, esperas y reconexiones.
+    """
+
+    def __init__(
+        self,
+        parametros,
+        maximo=POOL_MAXIMO_DEFAULT,
+        espera_maxima=ESPERA_MAXIMA_DEFAULT,
+        vida_maxima=VIDA_MAXIMA_DEFAULT,
+        validar_despues_de=VALIDAR_DESPUES_DE_DEFAULT
+    ):
+        self._parametros = parametros
+        self._maximo = maximo
+        self._espera_maxima = espera_maxima
+        self._vida_maxima = vida_maxima
+        self._validar_despues_de = validar_despues_de
+
+        self._condicion = threading.Condition()
+        self._libres = []
+        self._abiertas = 0
+
+        self._contadores = {
+            "prestamos": 0,
+            "esperas": 0,
+            "reconexiones": 0,
+            "conexiones_creadas": 0,
+            "tiempo_espera_total": 0.0
+        }
+
+    # -------------------------------
+    # CICLO DE VIDA DE CONEXIONES
+    # -------------------------------
+
+    def _crear(self):
+        conn = psycopg2.connect(
+            cursor_factory=CursorInstrumentado,
+            **self._parametros
+        )
+
+        with self._condicion:
+            self._contadores["conexiones_creadas"] += 1
+
+        return _ConexionFisica(conn)
+
+    def _descartar(self, fisica):
+        try:
+            fisica.conn.close()
+        except Exception:
+            pass
+
+    def _es_valida(self, fisica):
+        conn = fisica.conn
+
+        if conn.closed:
+            return False
+
+        ahora = time.monotonic()
+
+        if ahora - fisica.creada > self._vida_maxima:
+            return False
+
+        if ahora - fisica.ultimo_uso < self._validar_despues_de:
+            return True
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1;")
+            cursor.close()
+            conn.rollback()
+            return True
+
+        except Exception:
+            return False
+
+    def _devolver(self, fisica):
+        conn = fisica.conn
+        reutilizable = not conn.closed
+
+        if reutilizable:
+            try:
+                if (
+                    conn.get_transaction_status()
+                    != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+                ):
+                    conn.rollback()
+
+                if conn.autocommit:
+                    conn.autocommit = False
+
+            except Exception:
+                reutilizable = False
+
+        with self._condicion:
+            if reutilizable:
+                fisica.ultimo_uso = time.monotonic()
+                self._libres.append(fisica)
+            else:
+                self._abiertas -= 1
+                self._descartar(fisica)
+
+            self._condicion.notify()
+
+    # -------------------------------
+    # API PÚBLICA
+    # -------------------------------
+
+    def obtener(self):
+        """
+        Presta una conexión válida del pool.
+        Si el pool está lleno espera a que otra sesión libere una.
+        """
+
+        inicio_espera = None
+
+        with self._condicion:
+            while True:
+                if self._libres:
+                    fisica = self._libres.pop()
+                    break
+
+                if self._abiertas < self._maximo:
+                    self._abiertas += 1
+                    fisica = None
+                    break
+
+                if inicio_espera is None:
+                    inicio_espera = time.monotonic()
+                    self._contadores["esperas"] += 1
+
+                restante = self._espera_maxima - (time.monotonic() - inicio_espera)
+
+                if restante <= 0:
+                    raise psycopg2.OperationalError(
+                        "No hay conexiones disponibles en el pool."
+                    )
+
+                self._condicion.wait(restante)
+
+            if inicio_espera is not None:
+                self._contadores["tiempo_espera_total"] += (
+                    time.monotonic() - inicio_espera
+                )
+
+            self._contadores["prestamos"] += 1
+
+        try:
+            if fisica is None:
+                fisica = self._crear()
+
+            elif not self._es_valida(fisica):
+                self._descartar(fisica)
+
+                with self._condicion:
+                    self._contadores["reconexiones"] += 1
+
+                fisica = self._crear()
+
+        except Exception:
+            with self._condicion:
+                self._abiertas -= 1
+                self._condicion.notify()
+            raise
+
+        return ConexionPool(self, fisica)
+
+    @contextmanager
+    def conexion(self):
+        """
+        Presta una conexión como context manager y la regresa al pool
+        al salir del bloque. Si hubo un error, hace rollback primero.
+        """
+
+        conn = self.obtener()
+
+        with conn:
+            yield conn
+
+    def estadisticas(self):
+        with self._condicion:
+            datos = dict(self._contadores)
+            datos["abiertas"] = self._abiertas
+            datos["libres"] = len(self._libres)
+            datos["en_uso"] = self._abiertas - len(self._libres)
+            datos["maximo"] = self._maximo
+
+        return datos
+
+
+@st.cache_resource(show_spinner=False)
+def obtener_pool():
+    """
+    Un solo pool por proceso del servidor, compartido por todas las sesiones.
+    """
+
+    return PoolConexiones(
+        _parametros_conexion(),
+        maximo=int(st.secrets.get("db_pool_maximo", POOL_MAXIMO_DEFAULT)),
+        espera_maxima=float(st.secrets.get("db_pool_espera_maxima", ESPERA_MAXIMA_DEFAULT)),
+        vida_maxima=float(st.secrets.get("db_pool_vida_maxima", VIDA_MAXIMA_DEFAULT)),
+        validar_despues_de=float(
+            st.secrets.get("db_pool_validar_despues_de", VALIDAR_DESPUES_DE_DEFAULT)
+        )
+    )
+
+
+def obtener_conexion():
+    """
+    Context manager para bloques cortos (logger, login, comandos).
+
+        with obtener_conexion() as conn:
+            ...
+    """
+
+    return obtener_pool().conexion()
+
+
 def get_connection():
-    return psycopg2.connect(
-        host=st.secrets["db_host"],
-        database=st.secrets["db_name"],
-        user=st.secrets["db_user"],
-        password=st.secrets["db_password"],
-        port=st.secrets["db_port"]
+    """
+    Conexión del pool para toda la ejecución de una página.
+    conn.close() la regresa al pool. Si la página termina antes
+    (st.stop, st.rerun, una excepción), streamlit_app.py la devuelve
+    con liberar_conexion_rerun() al terminar el rerun.
+
+    Cada página la llama una vez al inicio, por eso aquí también
+    se reinicia el registro de consultas del rerun.
+    """
+
+    reiniciar_consultas_rerun()
+
+    # Una conexión que quedó de un rerun anterior se devuelve antes
+    # de pedir otra.
+    liberar_conexion_rerun()
+
+    conn = obtener_pool().obtener()
+    _rerun.conexion = conn
+
+    return conn
+
+
+def liberar_conexion_rerun():
+    """
+    Devuelve al pool la conexión de página del rerun actual, si la
+    página no la cerró. Se llama desde el finally de streamlit_app.py.
+    """
+
+    conn = getattr(_rerun, "conexion", None)
+    _rerun.conexion = None
+
+    if conn is not None:
+        conn.close()
+
+
+# ===============================
+# ERRORES
+# ===============================
+
+def es_violacion_unica(error, nombre):
+    """
+    True si el error es una violación del índice o restricción única
+    `nombre`. Sirve para insertar directo y traducir el duplicado al
+    mensaje de la página, sin consultar antes.
+    """
+
+    return (
+        isinstance(error, psycopg2.errors.UniqueViolation)
+        and error.diag.constraint_name == nombre
     )
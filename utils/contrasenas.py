@@ -0,0 +1,231 @@
+"""
+Hash y verificación de contraseñas con bcrypt en un pool de hilos.
+
+bcrypt es lento a propósito. Hacerlo en el hilo del script ocupa CPU
+en el momento en que otras sesiones necesitan correr; aquí se hace en
+un pool acotado (bcrypt_hilos en st.secrets) para que muchos logins
+al mismo tiempo no se lleven todos los núcleos. El costo se configura
+con bcrypt_costo; los hashes con otro costo se recalculan al iniciar
+sesión correctamente.
+
+Benchmark de latencia de login con N logins simultáneos:
+
+    python -m utils.contrasenas --concurrentes 20
+"""
+
+import argparse
+import os
+import statistics
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+import streamlit as st
+
+
+# ===============================
+# CONFIGURACIÓN
+# ===============================
+
+COSTO_DEFAULT = 12
+HILOS_DEFAULT = max(1, min(4, (os.cpu_count() or 2) // 2))
+
+_pool = None
+_lock_pool = threading.Lock()
+
+
+def _secreto(clave, default):
+    try:
+        return st.secrets.get(clave, default)
+    except Exception:
+        return default
+
+
+def costo_configurado():
+    return int(_secreto("bcrypt_costo", COSTO_DEFAULT))
+
+
+def obtener_pool():
+    """
+    Un solo pool por proceso del servidor.
+    """
+
+    global _pool
+
+    with _lock_pool:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=int(_secreto("bcrypt_hilos", HILOS_DEFAULT)),
+                thread_name_prefix="bcrypt"
+            )
+
+        return _pool
+
+
+# ===============================
+# OPERACIONES
+# ===============================
+
+def _verificar(password, password_hash):
+    try:
+        return bcrypt.checkpw(password.encode(), password_hash.encode())
+    except ValueError:
+        # Hash vacío o con formato inválido
+        return False
+
+
+def _hashear(password, costo):
+    return bcrypt.hashpw(
+        password.encode(),
+        bcrypt.gensalt(rounds=costo)
+    ).decode()
+
+
+def verificar_contrasena(password, password_hash):
+    return obtener_pool().submit(_verificar, password, password_hash).result()
+
+
+def hashear_contrasena(password, costo=None):
+    if costo is None:
+        costo = costo_configurado()
+
+    return obtener_pool().submit(_hashear, password, costo).result()
+
+
+def costo_de_hash(password_hash):
+    """
+    Costo de un hash "$2b$12$...", o None si no se reconoce.
+    """
+
+    try:
+        return int(password_hash.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def necesita_rehash(password_hash):
+    return costo_de_hash(password_hash) != costo_configurado()
+
+
+def nuevo_hash_si_cambio_costo(password, password_hash):
+    """
+    Tras un login correcto, el hash con el costo configurado si el
+    actual se hizo con otro; None si no hace falta. Llamar sin una
+    conexión prestada: es otro bcrypt completo.
+    """
+
+    if not necesita_rehash(password_hash):
+        return None
+
+    return hashear_contrasena(password)
+
+
+def actualizar_hash_si_cambio_costo(conn, usuario_id, password_hash, hash_nuevo):
+    """
+    Guarda el hash de nuevo_hash_si_cambio_costo (si hay). Solo
+    reemplaza el hash que se verificó, por si la contraseña cambió
+    mientras tanto. Un error aquí no impide el login.
+    """
+
+    if hash_nuevo is None:
+        return False
+
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            UPDATE usuarios
+            SET password_hash = %s
+            WHERE usuario_id = %s
+            AND password_hash = %s
+        """, (
+            hash_nuevo,
+            usuario_id,
+            password_hash
+        ))
+
+        conn.commit()
+        return cursor.rowcount > 0
+
+    except Exception as e:
+        conn.rollback()
+        print(f"Error al actualizar el hash del usuario {usuario_id}: {e}")
+        return False
+
+    finally:
+        cursor.close()
+
+
+# ===============================
+# BENCHMARK
+# ===============================
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def medir_logins(concurrentes, rondas, costo):
+    """
+    Lanza `concurrentes` verificaciones al mismo tiempo, `rondas` veces.
+    Devuelve las latencias en milisegundos, contadas desde que cada
+    "login" pide la verificación hasta que recibe la respuesta.
+    """
+
+    password = "benchmark"
+    password_hash = _hashear(password, costo)
+    latencias = []
+    lock = threading.Lock()
+
+    def login():
+        inicio = time.perf_counter()
+        verificar_contrasena(password, password_hash)
+        transcurrido = (time.perf_counter() - inicio) * 1000
+
+        with lock:
+            latencias.append(transcurrido)
+
+    for _ in range(rondas):
+        hilos = [threading.Thread(target=login) for _ in range(concurrentes)]
+
+        for hilo in hilos:
+            hilo.start()
+
+        for hilo in hilos:
+            hilo.join()
+
+    return latencias
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Latencia de login (bcrypt) con logins simultáneos."
+    )
+
+    parser.add_argument("--concurrentes", type=int, default=20)
+    parser.add_argument("--rondas", type=int, default=3)
+    parser.add_argument("--costo", type=int, default=costo_configurado())
+
+    argumentos = parser.parse_args()
+
+    latencias = medir_logins(
+        argumentos.concurrentes,
+        argumentos.rondas,
+        argumentos.costo
+    )
+
+    print(
+        f"{len(latencias)} logins, {argumentos.concurrentes} simultáneos, "
+        f"costo {argumentos.costo}, "
+        f"{obtener_pool()._max_workers} hilos de bcrypt"
+    )
+    print(f"p50: {statistics.median(latencias):.0f} ms")
+    print(f"p99: {_percentil(latencias, 99):.0f} ms")
+    print(f"máx: {max(latencias):.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Constructor de WHERE parametrizados para las páginas.
+
+Los filtros de Año y Mes se convierten en rangos medio abiertos
+[inicio, fin) sobre la columna de fecha para que Postgres pueda usar
+los índices; nunca se aplica EXTRACT(...) sobre la columna.
+"""
+
+from datetime import date
+
+
+# ===============================
+# RANGOS DE FECHA
+# ===============================
+
+def rango_periodo(anio, mes=None):
+    """
+    (inicio, fin) del año completo o de un mes, con fin exclusivo.
+    """
+
+    anio = int(anio)
+
+    if mes is None:
+        return date(anio, 1, 1), date(anio + 1, 1, 1)
+
+    mes = int(mes)
+
+    if mes == 12:
+        return date(anio, 12, 1), date(anio + 1, 1, 1)
+
+    return date(anio, mes, 1), date(anio, mes + 1, 1)
+
+
+# ===============================
+# CONSTRUCTOR
+# ===============================
+
+class FiltroSQL:
+    """
+    Acumula condiciones con sus parámetros.
+
+        filtro = FiltroSQL()
+        filtro.igual("p.nombre", proveedor)
+        filtro.periodo("f.fecha_factura", anio=2025, mes=3)
+        where_sql, parametros = filtro.where()
+
+    Los métodos ignoran los valores None, así cada página solo pasa
+    lo que eligió el usuario.
+    """
+
+    def __init__(self):
+        self.condiciones = []
+        self.parametros = []
+
+    def agregar(self, condicion, *valores):
+        self.condiciones.append(condicion)
+        self.parametros.extend(valores)
+        return self
+
+    def igual(self, expresion, valor):
+        if valor is not None:
+            self.agregar(f"{expresion} = %s", valor)
+
+        return self
+
+    def en_lista(self, expresion, valores):
+        if valores is not None:
+            self.agregar(f"{expresion} = ANY(%s)", list(valores))
+
+        return self
+
+    def contiene(self, expresion, texto):
+        """
+        ILIKE '%texto%'. Con un índice trigram (gin_trgm_ops) sobre la
+        columna Postgres no necesita recorrer la tabla.
+        """
+
+        if texto and texto.strip():
+            self.agregar(f"{expresion} ILIKE %s", f"%{texto.strip()}%")
+
+        return self
+
+    def rango(self, expresion, inicio=None, fin=None):
+        if inicio is not None:
+            self.agregar(f"{expresion} >= %s", inicio)
+
+        if fin is not None:
+            self.agregar(f"{expresion} < %s", fin)
+
+        return self
+
+    def periodo(self, expresion, anio=None, mes=None, anios=None):
+        """
+        Año y/o mes como rango de fechas.
+
+        Con mes pero sin año se arma un rango por cada año de anios
+        (los años con datos, del catálogo de periodos) unidos con OR.
+        """
+
+        if anio is not None:
+            return self.rango(expresion, *rango_periodo(anio, mes))
+
+        if mes is None:
+            return self
+
+        anios = sorted({int(a) for a in anios or []})
+
+        if not anios:
+            # Sin años con datos ningún registro cumple.
+            return self.agregar("FALSE")
+
+        rangos = []
+        parametros = []
+
+        for a in anios:
+            inicio, fin = rango_periodo(a, mes)
+            rangos.append(f"({expresion} >= %s AND {expresion} < %s)")
+            parametros.extend([inicio, fin])
+
+        return self.agregar("(" + " OR ".join(rangos) + ")", *parametros)
+
+    def where(self):
+        """
+        (where_sql, parametros); where_sql es "" si no hay condiciones.
+        """
+
+        if not self.condiciones:
+            return "", list(self.parametros)
+
+        return (
+            "WHERE " + " AND ".join(self.condiciones),
+            list(self.parametros)
+        )
@@ -0,0 +1,576 @@
+"""
+Importación masiva de ventas y gastos desde CSV o Excel (.xlsx).
+
+El archivo se lee por bloques; cada bloque se valida en pandas y las
+filas válidas se cargan con COPY a una tabla temporal. Al final se
+mezclan con ventas/gastos en una sola sentencia y todo va en una sola
+transacción: o se importa lo válido completo o no se importa nada.
+Las filas rechazadas se devuelven con su número de fila y el motivo.
+"""
+
+import io
+import unicodedata
+
+import pandas as pd
+
+
+# ===============================
+# CONFIGURACIÓN
+# ===============================
+
+TAMANO_BLOQUE = 5000
+
+# columna -> otros nombres aceptados en el encabezado
+COLUMNAS_VENTAS = {
+    "farmacia": [],
+    "fecha": [],
+    "venta_total": ["ventas_totales", "total", "monto"],
+    "venta_tarjeta": ["tarjeta"]
+}
+
+COLUMNAS_GASTOS = {
+    "farmacia": [],
+    "fecha": [],
+    "monto": ["importe", "total"],
+    "categoria": [],
+    "tipo_gasto": ["tipo"],
+    "descripcion": [],
+    "folio": []
+}
+
+OBLIGATORIAS_VENTAS = ["farmacia", "fecha", "venta_total"]
+OBLIGATORIAS_GASTOS = ["farmacia", "fecha", "monto", "categoria", "tipo_gasto"]
+
+
+def normalizar_texto(valor):
+    """
+    Minúsculas, sin acentos y sin espacios de más; para comparar
+    nombres de farmacias, categorías y encabezados.
+    """
+
+    texto = unicodedata.normalize("NFKD", str(valor).strip().lower())
+    texto = texto.encode("ascii", "ignore").decode("ascii")
+    return " ".join(texto.split())
+
+
+# ===============================
+# LECTURA POR BLOQUES
+# ===============================
+
+def _bloques_csv(archivo, tamano_bloque):
+    return pd.read_csv(
+        archivo,
+        dtype=str,
+        keep_default_na=False,
+        encoding="utf-8-sig",
+        chunksize=tamano_bloque
+    )
+
+
+def _bloques_xlsx(archivo, tamano_bloque):
+    from openpyxl import load_workbook
+
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        encabezado = next(filas, None)
+
+        if encabezado is None:
+            return
+
+        encabezado = [
+            str(c) if c is not None else f"columna_{i}"
+            for i, c in enumerate(encabezado)
+        ]
+
+        bloque = []
+
+        for fila in filas:
+            bloque.append(fila)
+
+            if len(bloque) >= tamano_bloque:
+                yield pd.DataFrame(bloque, columns=encabezado)
+                bloque = []
+
+        if bloque:
+            yield pd.DataFrame(bloque, columns=encabezado)
+
+    finally:
+        libro.close()
+
+
+def leer_bloques(archivo, nombre_archivo, columnas, tamano_bloque=TAMANO_BLOQUE):
+    """
+    DataFrames de hasta tamano_bloque filas con los encabezados
+    normalizados a los nombres de `columnas` y una columna fila
+    (número de fila en el archivo, el encabezado es la 1).
+    """
+
+    nombre = nombre_archivo.lower()
+
+    if nombre.endswith(".csv"):
+        bloques = _bloques_csv(archivo, tamano_bloque)
+    elif nombre.endswith(".xlsx"):
+        bloques = _bloques_xlsx(archivo, tamano_bloque)
+    else:
+        raise ValueError("Formato no soportado; usa CSV o XLSX.")
+
+    alias = {}
+
+    for columna, otros in columnas.items():
+        for nombre_columna in [columna] + otros:
+            alias[nombre_columna] = columna
+
+    siguiente_fila = 2
+
+    for bloque in bloques:
+        bloque = bloque.rename(columns=lambda c: alias.get(
+            normalizar_texto(c).replace(" ", "_"),
+            c
+        ))
+
+        bloque = bloque.loc[:, ~bloque.columns.duplicated()]
+        bloque.insert(0, "fila", range(siguiente_fila, siguiente_fila + len(bloque)))
+        siguiente_fila += len(bloque)
+
+        # Filas totalmente vacías (comunes al final de un Excel)
+        datos = bloque.drop(columns="fila")
+        vacias = datos.isna().all(axis=1) | (datos.astype(str).apply(
+            lambda c: c.str.strip()
+        ).isin(["", "None", "nan"]).all(axis=1))
+
+        yield bloque[~vacias]
+
+
+# ===============================
+# VALIDACIÓN
+# ===============================
+
+def _convertir_fechas(serie):
+    # ISO (2025-03-31) o día/mes/año (31/03/2025); las celdas de
+    # Excel ya vienen como fecha.
+    iso = pd.to_datetime(serie, errors="coerce", format="ISO8601")
+    dia_primero = pd.to_datetime(serie, errors="coerce", format="%d/%m/%Y")
+    return iso.fillna(dia_primero).dt.date
+
+
+def _convertir_montos(serie):
+    texto = (
+        serie.astype(str)
+        .str.replace(r"[\s$,]", "", regex=True)
+        .replace({"": None, "None": None, "nan": None})
+    )
+
+    return pd.to_numeric(texto, errors="coerce")
+
+
+def _texto(serie):
+    return serie.fillna("").astype(str).str.strip().replace({"None": "", "nan": ""})
+
+
+class _Validacion:
+    """
+    Guarda el primer motivo de rechazo de cada fila.
+    """
+
+    def __init__(self, bloque):
+        self.motivos = pd.Series(None, index=bloque.index, dtype=object)
+
+    def rechazar(self, condicion, motivo):
+        condicion = condicion.fillna(True) & self.motivos.isna()
+        self.motivos[condicion] = motivo
+
+    def validas(self):
+        return self.motivos.isna()
+
+
+def _verificar_columnas(bloque, obligatorias):
+    faltan = [c for c in obligatorias if c not in bloque.columns]
+
+    if faltan:
+        raise ValueError(f"Faltan columnas en el archivo: {', '.join(faltan)}")
+
+
+def validar_ventas(bloque, farmacias, hoy, vistas):
+    """
+    Devuelve (df_validas, rechazos). farmacias es {nombre normalizado:
+    farmacia_id}; vistas guarda (farmacia_id, fecha) -> fila entre
+    bloques para detectar duplicados dentro del archivo.
+    """
+
+    _verificar_columnas(bloque, OBLIGATORIAS_VENTAS)
+
+    validacion = _Validacion(bloque)
+
+    farmacia_id = _texto(bloque["farmacia"]).map(normalizar_texto).map(farmacias)
+    fecha = _convertir_fechas(bloque["fecha"])
+    total = _convertir_montos(bloque["venta_total"])
+
+    if "venta_tarjeta" in bloque.columns:
+        tarjeta = _convertir_montos(bloque["venta_tarjeta"]).fillna(0.0)
+    else:
+        tarjeta = pd.Series(0.0, index=bloque.index)
+
+    validacion.rechazar(farmacia_id.isna(), "Farmacia no registrada")
+    validacion.rechazar(fecha.isna(), "Fecha inválida")
+    validacion.rechazar(fecha > hoy, "Fecha futura")
+    validacion.rechazar(total.isna(), "Venta total inválida")
+    validacion.rechazar(total <= 0, "La venta total debe ser mayor a 0")
+    validacion.rechazar(tarjeta < 0, "Venta con tarjeta inválida")
+    validacion.rechazar(tarjeta > total, "La venta con tarjeta es mayor a la venta total")
+
+    for indice in bloque.index[validacion.validas()]:
+        llave = (int(farmacia_id[indice]), fecha[indice])
+
+        if llave in vistas:
+            validacion.motivos[indice] = (
+                f"Duplicada en el archivo (fila {vistas[llave]})"
+            )
+        else:
+            vistas[llave] = int(bloque.at[indice, "fila"])
+
+    validas = validacion.validas()
+
+    df_validas = pd.DataFrame({
+        "fila": bloque["fila"],
+        "farmacia_id": farmacia_id,
+        "ventas_totales": total,
+        "venta_tarjeta": tarjeta,
+        "fecha": fecha
+    })[validas]
+
+    df_validas["farmacia_id"] = df_validas["farmacia_id"].astype(int)
+
+    rechazos = list(zip(
+        bloque["fila"][~validas],
+        validacion.motivos[~validas]
+    ))
+
+    return df_validas, rechazos
+
+
+def validar_gastos(bloque, farmacias, hoy, vistas, categorias, tipos_gasto):
+    """
+    Igual que validar_ventas. Mercancía requiere folio único por farmacia.
+    """
+
+    _verificar_columnas(bloque, OBLIGATORIAS_GASTOS)
+
+    validacion = _Validacion(bloque)
+
+    categorias_norm = {normalizar_texto(c): c for c in categorias}
+    tipos_norm = {normalizar_texto(t): t for t in tipos_gasto}
+
+    farmacia_id = _texto(bloque["farmacia"]).map(normalizar_texto).map(farmacias)
+    fecha = _convertir_fechas(bloque["fecha"])
+    monto = _convertir_montos(bloque["monto"])
+    categoria = _texto(bloque["categoria"]).map(normalizar_texto).map(categorias_norm)
+    tipo_gasto = _texto(bloque["tipo_gasto"]).map(normalizar_texto).map(tipos_norm)
+
+    descripcion = (
+        _texto(bloque["descripcion"])
+        if "descripcion" in bloque.columns
+        else pd.Series("", index=bloque.index)
+    )
+
+    folio = (
+        _texto(bloque["folio"])
+        if "folio" in bloque.columns
+        else pd.Series("", index=bloque.index)
+    )
+
+    es_mercancia = categoria == "Mercancia"
+
+    validacion.rechazar(farmacia_id.isna(), "Farmacia no registrada")
+    validacion.rechazar(fecha.isna(), "Fecha inválida")
+    validacion.rechazar(fecha > hoy, "Fecha futura")
+    validacion.rechazar(monto.isna(), "Monto inválido")
+    validacion.rechazar(monto <= 0, "El monto debe ser mayor a 0")
+    validacion.rechazar(categoria.isna(), "Categoría no válida")
+    validacion.rechazar(tipo_gasto.isna(), "Tipo de gasto no válido")
+    validacion.rechazar(es_mercancia & (folio == ""), "Mercancía sin folio")
+
+    for indice in bloque.index[validacion.validas() & es_mercancia]:
+        llave = (int(farmacia_id[indice]), folio[indice].upper())
+
+        if llave in vistas:
+            validacion.motivos[indice] = (
+                f"Folio duplicado en el archivo (fila {vistas[llave]})"
+            )
+        else:
+            vistas[llave] = int(bloque.at[indice, "fila"])
+
+    validas = validacion.validas()
+
+    df_validas = pd.DataFrame({
+        "fila": bloque["fila"],
+        "farmacia_id": farmacia_id,
+        "monto": monto,
+        "fecha": fecha,
+        "tipo_gasto": tipo_gasto,
+        "categoria": categoria,
+        "descripcion": descripcion,
+        "folio": folio.where(es_mercancia, "")
+    })[validas]
+
+    df_validas["farmacia_id"] = df_validas["farmacia_id"].astype(int)
+
+    rechazos = list(zip(
+        bloque["fila"][~validas],
+        validacion.motivos[~validas]
+    ))
+
+    return df_validas, rechazos
+
+
+# ===============================
+# CARGA Y MEZCLA
+# ===============================
+
+def _copiar_bloque(cursor, tabla, df):
+    if df.empty:
+        return
+
+    buffer = io.StringIO()
+    df.to_csv(buffer, header=False, index=False)
+    buffer.seek(0)
+
+    cursor.copy_expert(
+        f"COPY {tabla} ({', '.join(df.columns)}) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+
+
+def _mapa_farmacias(farmacia_dict):
+    return {
+        normalizar_texto(nombre): farmacia_id
+        for nombre, farmacia_id in farmacia_dict.items()
+    }
+
+
+def _resultado(leidas, insertadas, rechazos, farmacias):
+    df_rechazos = pd.DataFrame(rechazos, columns=["fila", "motivo"])
+
+    return {
+        "leidas": leidas,
+        "insertadas": insertadas,
+        "rechazos": df_rechazos.sort_values("fila").reset_index(drop=True),
+        "farmacias": farmacias
+    }
+
+
+def importar_ventas(conn, archivo, nombre_archivo, farmacia_dict, hoy):
+    """
+    Importa ventas diarias. Las que ya existen para esa farmacia y
+    fecha se rechazan (ventas_farmacia_fecha_unica).
+    Devuelve {leidas, insertadas, rechazos (DataFrame), farmacias}.
+    """
+
+    farmacias = _mapa_farmacias(farmacia_dict)
+    vistas = {}
+    rechazos = []
+    leidas = 0
+
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            CREATE TEMP TABLE importacion_ventas (
+                fila INTEGER PRIMARY KEY,
+                farmacia_id INTEGER NOT NULL,
+                ventas_totales NUMERIC NOT NULL,
+                venta_tarjeta NUMERIC NOT NULL,
+                fecha DATE NOT NULL
+            ) ON COMMIT DROP;
+        """)
+
+        for bloque in leer_bloques(archivo, nombre_archivo, COLUMNAS_VENTAS):
+            leidas += len(bloque)
+
+            df_validas, rechazos_bloque = validar_ventas(bloque, farmacias, hoy, vistas)
+            rechazos.extend(rechazos_bloque)
+
+            _copiar_bloque(cursor, "importacion_ventas", df_validas)
+
+        # Una sola sentencia; lo que choca con ventas existentes se omite
+        # y se identifica por la llave (única dentro del archivo).
+        cursor.execute("""
+            WITH insertadas AS (
+                INSERT INTO ventas
+                (
+                    farmacia_id,
+                    ventas_totales,
+                    venta_tarjeta,
+                    venta_efectivo,
+                    tipo_registro,
+                    fecha
+                )
+                SELECT
+                    farmacia_id,
+                    ventas_totales,
+                    venta_tarjeta,
+                    ventas_totales - venta_tarjeta,
+                    'diario',
+                    fecha
+                FROM importacion_ventas
+                ORDER BY fila
+                ON CONFLICT DO NOTHING
+                RETURNING farmacia_id, fecha
+            )
+            SELECT
+                s.fila,
+                s.farmacia_id,
+                i.farmacia_id IS NOT NULL
+            FROM importacion_ventas s
+            LEFT JOIN insertadas i
+                ON i.farmacia_id = s.farmacia_id
+                AND i.fecha = s.fecha;
+        """)
+
+        insertadas = 0
+        farmacias_insertadas = set()
+
+        for fila, farmacia_id, insertada in cursor.fetchall():
+            if insertada:
+                insertadas += 1
+                farmacias_insertadas.add(farmacia_id)
+            else:
+                rechazos.append((fila, "Ya existe una venta para esa farmacia y fecha"))
+
+        conn.commit()
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        cursor.close()
+
+    return _resultado(leidas, insertadas, rechazos, farmacias_insertadas)
+
+
+def importar_gastos(
+    conn,
+    archivo,
+    nombre_archivo,
+    farmacia_dict,
+    hoy,
+    categorias,
+    tipos_gasto
+):
+    """
+    Importa gastos. Los de Mercancía cuyo folio ya existe en la
+    farmacia se rechazan (gastos_mercancia_folio_unico).
+    Devuelve {leidas, insertadas, rechazos (DataFrame), farmacias}.
+    """
+
+    farmacias = _mapa_farmacias(farmacia_dict)
+    vistas = {}
+    rechazos = []
+    leidas = 0
+
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            CREATE TEMP TABLE importacion_gastos (
+                fila INTEGER PRIMARY KEY,
+                farmacia_id INTEGER NOT NULL,
+                monto NUMERIC NOT NULL,
+                fecha DATE NOT NULL,
+                tipo_gasto TEXT NOT NULL,
+                categoria TEXT NOT NULL,
+                descripcion TEXT,
+                folio TEXT
+            ) ON COMMIT DROP;
+        """)
+
+        for bloque in leer_bloques(archivo, nombre_archivo, COLUMNAS_GASTOS):
+            leidas += len(bloque)
+
+            df_validas, rechazos_bloque = validar_gastos(
+                bloque,
+                farmacias,
+                hoy,
+                vistas,
+                categorias,
+                tipos_gasto
+            )
+            rechazos.extend(rechazos_bloque)
+
+            _copiar_bloque(cursor, "importacion_gastos", df_validas)
+
+        # Una sola sentencia; los de Mercancía que chocan con un folio
+        # existente (gastos_mercancia_folio_unico) se omiten y se
+        # identifican por farmacia y folio (únicos dentro del archivo).
+        # Los demás gastos no tienen llave única y siempre se insertan.
+        cursor.execute("""
+            WITH insertadas AS (
+                INSERT INTO gastos
+                (
+                    farmacia_id,
+                    monto,
+                    fecha,
+                    tipo_gasto,
+                    categoria,
+                    descripcion,
+                    folio
+                )
+                SELECT
+                    farmacia_id,
+                    monto,
+                    fecha,
+                    tipo_gasto,
+                    categoria,
+                    NULLIF(descripcion, ''),
+                    NULLIF(folio, '')
+                FROM importacion_gastos
+                ORDER BY fila
+                ON CONFLICT (farmacia_id, UPPER(folio))
+                WHERE categoria = 'Mercancia'
+                DO NOTHING
+                RETURNING farmacia_id, UPPER(folio) AS folio
+            )
+            SELECT
+                s.fila,
+                s.farmacia_id,
+                s.categoria <> 'Mercancia' OR EXISTS (
+                    SELECT 1
+                    FROM insertadas i
+                    WHERE i.farmacia_id = s.farmacia_id
+                    AND i.folio = UPPER(s.folio)
+                )
+            FROM importacion_gastos s;
+        """)
+
+        insertadas = 0
+        farmacias_insertadas = set()
+
+        for fila, farmacia_id, insertada in cursor.fetchall():
+            if insertada:
+                insertadas += 1
+                farmacias_insertadas.add(farmacia_id)
+            else:
+                rechazos.append(
+                    (fila, "Ya existe un gasto de mercancía con ese folio en la farmacia")
+                )
+
+        conn.commit()
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        cursor.close()
+
+    return _resultado(leidas, insertadas, rechazos, farmacias_insertadas)
+
+
+def plantilla(columnas):
+    """
+    CSV vacío con los encabezados esperados.
+    """
+
+    return (",".join(columnas) + "\n").encode("utf-8")
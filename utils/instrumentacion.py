@@ -0,0 +1,405 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+
+from logging.handlers import RotatingFileHandler
+
+import pandas as pd
+import psycopg2.extensions
+import streamlit as st
+
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+
+# ===============================
+# CONFIGURACIÓN
+# ===============================
+
+UMBRAL_LENTA_MS_DEFAULT = 500
+ARCHIVO_LENTAS_DEFAULT = "logs/consultas_lentas.log"
+TAMANO_ARCHIVO_LENTAS = 5 * 1024 * 1024
+RESPALDOS_ARCHIVO_LENTAS = 5
+
+CLAVE_CONSULTAS_RERUN = "_consultas_rerun"
+CLAVE_CONSULTAS_ANTERIOR = "_consultas_rerun_anterior"
+
+# Filas que se miden para estimar los bytes de un fetch
+MUESTRA_BYTES = 20
+
+_logger_lentas = None
+_lock_logger = threading.Lock()
+
+
+def _secreto(clave, default):
+    try:
+        return st.secrets.get(clave, default)
+    except Exception:
+        return default
+
+
+def umbral_consulta_lenta_ms():
+    return float(_secreto("slow_query_ms", UMBRAL_LENTA_MS_DEFAULT))
+
+
+def _obtener_logger_lentas():
+    global _logger_lentas
+
+    with _lock_logger:
+        if _logger_lentas is not None:
+            return _logger_lentas
+
+        ruta = _secreto("slow_query_log", ARCHIVO_LENTAS_DEFAULT)
+        directorio = os.path.dirname(ruta)
+
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        handler = RotatingFileHandler(
+            ruta,
+            maxBytes=TAMANO_ARCHIVO_LENTAS,
+            backupCount=RESPALDOS_ARCHIVO_LENTAS,
+            encoding="utf-8"
+        )
+
+        handler.setFormatter(logging.Formatter(
+            "%(asctime)s\t%(message)s"
+        ))
+
+        logger = logging.getLogger("farmacias.consultas_lentas")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(handler)
+
+        _logger_lentas = logger
+        return _logger_lentas
+
+
+# ===============================
+# HUELLA DE CONSULTAS
+# ===============================
+
+def normalizar_sql(sql):
+    """
+    Quita espacios repetidos para que la misma consulta
+    siempre produzca el mismo texto.
+    """
+
+    if isinstance(sql, bytes):
+        sql = sql.decode("utf-8", "replace")
+
+    return re.sub(r"\s+", " ", str(sql)).strip()
+
+
+def huella_sql(sql):
+    """
+    Identificador corto de la consulta, independiente de los parámetros.
+    """
+
+    return hashlib.md5(
+        normalizar_sql(sql).lower().encode("utf-8")
+    ).hexdigest()[:10]
+
+
+def _tamano_filas(filas):
+    """
+    Bytes aproximados de las filas: se mide una muestra y se
+    extrapola, para no convertir a texto cada celda del resultado.
+    """
+
+    muestra = filas[:MUESTRA_BYTES]
+
+    if not muestra:
+        return 0
+
+    total = 0
+
+    for fila in muestra:
+        for valor in fila:
+            if valor is not None:
+                total += len(str(valor))
+
+    return round(total * len(filas) / len(muestra))
+
+
+def _resumir_parametros(parametros):
+    if parametros is None:
+        return ""
+
+    texto = repr(parametros)
+
+    if len(texto) > 200:
+        texto = texto[:197] + "..."
+
+    return texto
+
+
+# ===============================
+# REGISTRO POR RERUN
+# ===============================
+
+def _consultas_rerun():
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None
+
+    if CLAVE_CONSULTAS_RERUN not in st.session_state:
+        st.session_state[CLAVE_CONSULTAS_RERUN] = []
+
+    return st.session_state[CLAVE_CONSULTAS_RERUN]
+
+
+def reiniciar_consultas_rerun():
+    """
+    Vacía la lista de consultas de la sesión.
+    Se llama al inicio de cada rerun, cuando la página pide su conexión.
+    La lista anterior se conserva: si ese rerun terminó con st.stop o
+    st.rerun, el panel la muestra en el siguiente.
+    """
+
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return
+
+    st.session_state[CLAVE_CONSULTAS_ANTERIOR] = st.session_state.get(
+        CLAVE_CONSULTAS_RERUN,
+        []
+    )
+    st.session_state[CLAVE_CONSULTAS_RERUN] = []
+
+
+def obtener_consultas_rerun():
+    consultas = _consultas_rerun()
+
+    if consultas is None:
+        return []
+
+    return list(consultas)
+
+
+class CursorInstrumentado(psycopg2.extensions.cursor):
+    """
+    Cursor que mide cada consulta: huella, parámetros, filas,
+    bytes leídos (estimados) y tiempo. Las consultas lentas se
+    escriben en el log rotativo en cuanto execute() termina, así
+    quedan registradas aunque la página se detenga después.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._entrada = None
+
+    def _iniciar(self, sql, parametros):
+        self._entrada = None
+
+        return {
+            "huella": huella_sql(sql),
+            "sql": normalizar_sql(sql)[:300],
+            "parametros": _resumir_parametros(parametros),
+            "filas": 0,
+            "bytes": 0,
+            "ms": 0.0
+        }
+
+    def _registrar(self, entrada, inicio):
+        entrada["ms"] = (time.perf_counter() - inicio) * 1000
+
+        if self.rowcount is not None and self.rowcount >= 0:
+            entrada["filas"] = self.rowcount
+
+        self._entrada = entrada
+
+        consultas = _consultas_rerun()
+
+        if consultas is not None:
+            consultas.append(entrada)
+
+        if entrada["ms"] >= umbral_consulta_lenta_ms():
+            self._escribir_lenta(entrada)
+
+    def _escribir_lenta(self, entrada):
+        # Los bytes todavía no se leen; filas x columnas da la idea
+        # del tamaño del resultado.
+        columnas = len(self.description) if self.description else 0
+
+        try:
+            _obtener_logger_lentas().info(
+                "%.1f ms\t%s filas\t%s columnas\t%s\t%s\t%s",
+                entrada["ms"],
+                entrada["filas"],
+                columnas,
+                entrada["huella"],
+                entrada["parametros"],
+                entrada["sql"]
+            )
+        except Exception as e:
+            print(f"Error al escribir consulta lenta: {e}")
+
+    def execute(self, sql, parametros=None):
+        entrada = self._iniciar(sql, parametros)
+        inicio = time.perf_counter()
+
+        try:
+            return super().execute(sql, parametros)
+        finally:
+            self._registrar(entrada, inicio)
+
+    def executemany(self, sql, lista_parametros):
+        lista_parametros = list(lista_parametros)
+        entrada = self._iniciar(sql, f"{len(lista_parametros)} filas")
+        inicio = time.perf_counter()
+
+        try:
+            return super().executemany(sql, lista_parametros)
+        finally:
+            self._registrar(entrada, inicio)
+
+    def _contar_bytes(self, filas):
+        if self._entrada is not None and filas:
+            self._entrada["bytes"] += _tamano_filas(filas)
+
+    def fetchone(self):
+        fila = super().fetchone()
+
+        if fila is not None:
+            self._contar_bytes([fila])
+
+        return fila
+
+    def fetchmany(self, size=None):
+        if size is None:
+            filas = super().fetchmany()
+        else:
+            filas = super().fetchmany(size)
+
+        self._contar_bytes(filas)
+        return filas
+
+    def fetchall(self):
+        filas = super().fetchall()
+        self._contar_bytes(filas)
+        return filas
+
+    def close(self):
+        self._entrada = None
+        super().close()
+
+
+# ===============================
+# PANEL DE DEPURACIÓN
+# ===============================
+
+def mostrar_panel_consultas():
+    """
+    Panel opcional en el sidebar (solo administradores) con las consultas
+    ejecutadas en este rerun y sus tiempos.
+    """
+
+    from utils.permisos import usuario_es_admin
+
+    if not usuario_es_admin():
+        return
+
+    mostrar = st.sidebar.checkbox(
+        "Depurar consultas",
+        value=False,
+        key="debug_panel_consultas"
+    )
+
+    if not mostrar:
+        return
+
+    consultas = obtener_consultas_rerun()
+
+    with st.sidebar.expander("Consultas de este rerun", expanded=True):
+
+        _tabla_consultas(consultas, "No se ejecutaron consultas en este rerun.")
+
+        from utils.conexionASupabase import obtener_pool
+
+        try:
+            estadisticas = obtener_pool().estadisticas()
+
+            st.caption(
+                f"Pool: {estadisticas['en_uso']}/{estadisticas['maximo']} en uso · "
+                f"{estadisticas['prestamos']} préstamos · "
+                f"{estadisticas['esperas']} esperas · "
+                f"{estadisticas['reconexiones']} reconexiones"
+            )
+
+        except Exception:
+            pass
+
+        from utils.cache_datos import obtener_cache_datos
+
+        try:
+            estadisticas = obtener_cache_datos().estadisticas()
+
+            st.caption(
+                f"Cache de datos: {estadisticas['aciertos']} aciertos · "
+                f"{estadisticas['fallos']} fallos · "
+                f"{estadisticas['entradas']} entradas · "
+                f"{estadisticas['memoria'] / 1024 / 1024:,.1f}/"
+                f"{estadisticas['memoria_maxima'] / 1024 / 1024:,.0f} MB · "
+                f"{estadisticas['invalidaciones']} invalidadas · "
+                f"{estadisticas['desalojos']} desalojadas"
+            )
+
+        except Exception:
+            pass
+
+        from utils.logger import obtener_escritor
+
+        try:
+            estadisticas = obtener_escritor().estadisticas()
+
+            st.caption(
+                f"Logs de auditoría: {estadisticas['en_spool']} en spool · "
+                f"{estadisticas['escritos']} escritos en "
+                f"{estadisticas['lotes']} lotes · "
+                f"{estadisticas['errores']} errores"
+            )
+
+        except Exception:
+            pass
+
+    anteriores = st.session_state.get(CLAVE_CONSULTAS_ANTERIOR, [])
+
+    if anteriores:
+        with st.sidebar.expander("Consultas del rerun anterior"):
+            _tabla_consultas(anteriores, "")
+
+
+def _tabla_consultas(consultas, mensaje_vacio):
+    if not consultas:
+        st.caption(mensaje_vacio)
+        return
+
+    df_consultas = pd.DataFrame(consultas)
+
+    st.caption(
+        f"{len(df_consultas)} consultas · "
+        f"{df_consultas['ms'].sum():,.1f} ms · "
+        f"~{df_consultas['bytes'].sum():,} bytes"
+    )
+
+    st.dataframe(
+        df_consultas[
+            [
+                "ms",
+                "filas",
+                "bytes",
+                "huella",
+                "sql",
+                "parametros"
+            ]
+        ].sort_values("ms", ascending=False),
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "ms": st.column_config.NumberColumn(
+                "ms",
+                format="%.1f"
+            )
+        }
+    )
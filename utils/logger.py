@@ -1,14 +1,486 @@
-from utils.conexionASupabase import get_connection
+"""
+Registro de auditoría (logs_auditoria).
 
+registrar_log() solo agrega el evento a un spool local (archivos JSONL
+de solo agregar, con fsync y rotación por tamaño). Un hilo de fondo
+vacía el spool en logs_auditoria con un solo INSERT por lote, cuando se
+juntan TAMANO_LOTE eventos o pasan INTERVALO_ESCRITURA segundos, y
+guarda hasta dónde llegó. Si Supabase no responde, los eventos siguen
+en disco y se escriben cuando vuelve; al iniciar el proceso se vacía
+lo que haya quedado de la ejecución anterior. Para vaciarlo a mano:
+
+    python -m utils.logger
+
+La entrega es "al menos una vez": si el proceso muere entre el INSERT
+y el guardado de la posición, ese lote se vuelve a escribir.
+El spool es de un solo proceso del servidor; quien lo vacía (el hilo o
+la línea de comandos) toma antes un candado exclusivo sobre el archivo
+drenado.lock del directorio, así el mismo lote no se inserta dos veces.
+"""
+
+import atexit
+import json
+import os
+import threading
+
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import streamlit as st
+
+from psycopg2.extras import execute_values
+
+from utils.conexionASupabase import obtener_conexion
 
-def registrar_log(usuario, accion, descripcion):
-    conn = None
-    cursor = None
 
+# ===============================
+# CONFIGURACIÓN
+# ===============================
+
+DIRECTORIO_SPOOL_DEFAULT = "logs/auditoria_spool"
+TAMANO_SEGMENTO_MB_DEFAULT = 5
+TAMANO_LOTE = 200
+INTERVALO_ESCRITURA = 2.0
+ESPERA_MAXIMA_REINTENTO = 60.0
+ESPERA_CIERRE = 10.0
+
+SQL_INSERTAR = """
+    INSERT INTO logs_auditoria (
+        usuario_id,
+        usuario_nombre,
+        accion,
+        descripcion,
+        fecha
+    )
+    VALUES %s
+"""
+
+# La hora se toma al registrar el evento (no al escribir el lote) y se
+# convierte a la zona de la sesión como lo hacía NOW().
+PLANTILLA_FILA = "(%s, %s, %s, %s, %s::timestamptz)"
+
+CAMPOS_EVENTO = [
+    "usuario_id",
+    "usuario_nombre",
+    "accion",
+    "descripcion",
+    "fecha"
+]
+
+_escritor = None
+_lock_escritor = threading.Lock()
+
+
+def _secreto(clave, default):
     try:
-        conn = get_connection()
+        return st.secrets.get(clave, default)
+    except Exception:
+        return default
+
+
+def escribir_eventos(eventos):
+    """
+    Inserta una lista de eventos (dicts con CAMPOS_EVENTO)
+    en una sola sentencia.
+    """
+
+    with obtener_conexion() as conn:
         cursor = conn.cursor()
 
+        try:
+            execute_values(
+                cursor,
+                SQL_INSERTAR,
+                [
+                    tuple(evento.get(campo) for campo in CAMPOS_EVENTO)
+                    for evento in eventos
+                ],
+                template=PLANTILLA_FILA,
+                page_size=TAMANO_LOTE
+            )
+
+            conn.commit()
+
+        finally:
+            cursor.close()
+
+    # Los filtros del visor de logs pueden tener usuarios o acciones nuevos.
+    from utils.logs_facetas import invalidar_resumen_logs
+
+    invalidar_resumen_logs()
+
+
+# ===============================
+# SPOOL LOCAL
+# ===============================
+
+class SpoolAuditoria:
+    """
+    Segmentos eventos-000001.jsonl, eventos-000002.jsonl, ... en un
+    directorio. Se agrega siempre al último; cuando pasa del tamaño
+    máximo se abre uno nuevo. posicion.json guarda el segmento y el
+    byte hasta donde ya se escribió en la base de datos; los segmentos
+    terminados se borran.
+    """
+
+    def __init__(self, directorio, tamano_segmento):
+        self._directorio = directorio
+        self._tamano_segmento = tamano_segmento
+        self._lock = threading.Lock()
+
+        os.makedirs(directorio, exist_ok=True)
+
+        segmentos = self._segmentos()
+        self._activo = segmentos[-1] if segmentos else 1
+
+    def _ruta(self, segmento):
+        return os.path.join(
+            self._directorio,
+            f"eventos-{segmento:06d}.jsonl"
+        )
+
+    def _ruta_posicion(self):
+        return os.path.join(self._directorio, "posicion.json")
+
+    @contextmanager
+    def drenado(self, esperar=True):
+        """
+        Candado exclusivo entre procesos para leer y confirmar.
+        Devuelve True si se obtuvo; con esperar=False devuelve False
+        en lugar de esperar a que otro proceso termine.
+        """
+
+        with open(os.path.join(self._directorio, "drenado.lock"), "a+b") as archivo:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(
+                        archivo.fileno(),
+                        fcntl.LOCK_EX | (0 if esperar else fcntl.LOCK_NB)
+                    )
+                else:
+                    archivo.seek(0)
+                    msvcrt.locking(
+                        archivo.fileno(),
+                        msvcrt.LK_LOCK if esperar else msvcrt.LK_NBLCK,
+                        1
+                    )
+
+            except OSError:
+                if esperar:
+                    raise
+
+                yield False
+                return
+
+            try:
+                yield True
+
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(archivo.fileno(), fcntl.LOCK_UN)
+                else:
+                    archivo.seek(0)
+                    msvcrt.locking(archivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _segmentos(self):
+        segmentos = []
+
+        for nombre in os.listdir(self._directorio):
+            if nombre.startswith("eventos-") and nombre.endswith(".jsonl"):
+                segmentos.append(int(nombre[8:-6]))
+
+        return sorted(segmentos)
+
+    # ----------------------------
+    # ESCRITURA
+    # ----------------------------
+
+    def agregar(self, evento):
+        linea = (json.dumps(evento, ensure_ascii=False) + "\n").encode("utf-8")
+
+        with self._lock:
+            ruta = self._ruta(self._activo)
+
+            if (
+                os.path.exists(ruta)
+                and os.path.getsize(ruta) + len(linea) > self._tamano_segmento
+            ):
+                self._activo += 1
+                ruta = self._ruta(self._activo)
+
+            with open(ruta, "ab") as archivo:
+                archivo.write(linea)
+                archivo.flush()
+                os.fsync(archivo.fileno())
+
+    # ----------------------------
+    # LECTURA Y POSICIÓN
+    # ----------------------------
+
+    def posicion(self):
+        try:
+            with open(self._ruta_posicion(), encoding="utf-8") as archivo:
+                datos = json.load(archivo)
+
+            return int(datos["segmento"]), int(datos["offset"])
+
+        except (FileNotFoundError, ValueError, KeyError):
+            segmentos = self._segmentos()
+            return (segmentos[0] if segmentos else 1), 0
+
+    def leer(self, maximo):
+        """
+        Hasta maximo eventos desde la posición guardada.
+        Devuelve (eventos, posición al terminar de leerlos).
+        """
+
+        segmento, offset = self.posicion()
+        eventos = []
+
+        with self._lock:
+            activo = self._activo
+
+        while len(eventos) < maximo:
+            ruta = self._ruta(segmento)
+
+            if os.path.exists(ruta):
+                with open(ruta, "rb") as archivo:
+                    archivo.seek(offset)
+
+                    while len(eventos) < maximo:
+                        linea = archivo.readline()
+
+                        # Una línea sin salto todavía se está escribiendo.
+                        if not linea.endswith(b"\n"):
+                            break
+
+                        offset += len(linea)
+
+                        try:
+                            eventos.append(json.loads(linea))
+                        except ValueError:
+                            print(f"Evento de auditoría ilegible en {ruta}@{offset}")
+
+            if len(eventos) >= maximo or segmento >= activo:
+                break
+
+            segmento += 1
+            offset = 0
+
+        return eventos, (segmento, offset)
+
+    def confirmar(self, posicion):
+        """
+        Guarda la posición (escritura atómica) y borra los segmentos
+        que ya quedaron atrás.
+        """
+
+        segmento, offset = posicion
+        ruta = self._ruta_posicion()
+        temporal = ruta + ".tmp"
+
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump({"segmento": segmento, "offset": offset}, archivo)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+
+        os.replace(temporal, ruta)
+
+        for anterior in self._segmentos():
+            if anterior < segmento:
+                try:
+                    os.remove(self._ruta(anterior))
+                except OSError:
+                    pass
+
+    def segmentos(self):
+        return len(self._segmentos())
+
+
+# ===============================
+# ESCRITOR EN SEGUNDO PLANO
+# ===============================
+
+class EscritorLogs:
+    """
+    Hilo de fondo que vacía el spool en logs_auditoria por lotes.
+
+    Si no se puede escribir en el spool (disco lleno, permisos) el
+    evento se inserta directamente en el hilo de quien lo registra.
+    """
+
+    def __init__(
+        self,
+        spool,
+        tamano_lote=TAMANO_LOTE,
+        intervalo=INTERVALO_ESCRITURA
+    ):
+        self._spool = spool
+        self._tamano_lote = tamano_lote
+        self._intervalo = intervalo
+        self._detener = threading.Event()
+        self._aviso = threading.Event()
+        self._lock = threading.Lock()
+        self._sin_escribir = 0
+
+        self._contadores = {
+            "registrados": 0,
+            "escritos": 0,
+            "lotes": 0,
+            "directos": 0,
+            "errores": 0
+        }
+
+        self._hilo = threading.Thread(
+            target=self._ejecutar,
+            name="escritor-logs-auditoria",
+            daemon=True
+        )
+        self._hilo.start()
+
+    def _contar(self, clave, cantidad=1):
+        with self._lock:
+            self._contadores[clave] += cantidad
+
+    def registrar(self, evento):
+        try:
+            self._spool.agregar(evento)
+
+        except Exception as e:
+            print(f"Error al escribir en el spool de auditoría: {e}")
+            self._contar("directos")
+            escribir_eventos([evento])
+            return
+
+        with self._lock:
+            self._contadores["registrados"] += 1
+            self._sin_escribir += 1
+            lote_completo = self._sin_escribir >= self._tamano_lote
+
+        if lote_completo:
+            self._aviso.set()
+
+    def _drenar(self):
+        """
+        Escribe lotes mientras haya eventos en el spool.
+        Devuelve False si la base de datos falló. Si otro proceso lo
+        está vaciando (python -m utils.logger) no hace nada esta vez.
+        """
+
+        with self._spool.drenado(esperar=False) as obtenido:
+            if not obtenido:
+                return True
+
+            return self._drenar_lotes()
+
+    def _drenar_lotes(self):
+        while True:
+            eventos, posicion = self._spool.leer(self._tamano_lote)
+
+            if not eventos:
+                # Puede haber avanzado a otro segmento sin eventos nuevos.
+                if posicion != self._spool.posicion():
+                    self._spool.confirmar(posicion)
+
+                return True
+
+            try:
+                escribir_eventos(eventos)
+
+            except Exception as e:
+                self._contar("errores")
+                print(f"Error al escribir {len(eventos)} logs, se reintentará: {e}")
+                return False
+
+            self._spool.confirmar(posicion)
+
+            with self._lock:
+                self._contadores["escritos"] += len(eventos)
+                self._contadores["lotes"] += 1
+                self._sin_escribir = max(0, self._sin_escribir - len(eventos))
+
+    def _ejecutar(self):
+        from utils.logs_particiones import mantener_particiones
+
+        # Particiones de los meses siguientes, una vez por proceso.
+        mantener_particiones()
+
+        espera_reintento = None
+
+        # Lo que haya quedado de la ejecución anterior se escribe al iniciar.
+        self._aviso.set()
+
+        while not self._detener.is_set():
+            if espera_reintento is None:
+                self._aviso.wait(self._intervalo)
+            else:
+                # Con la base de datos caída no se reintenta con cada
+                # evento nuevo, solo al cumplirse la espera.
+                self._detener.wait(espera_reintento)
+
+            self._aviso.clear()
+
+            if self._drenar():
+                espera_reintento = None
+            else:
+                espera_reintento = min(
+                    (espera_reintento or self._intervalo) * 2,
+                    ESPERA_MAXIMA_REINTENTO
+                )
+
+        self._drenar()
+
+    def detener(self, espera=ESPERA_CIERRE):
+        """
+        Escribe lo pendiente y termina el hilo. Lo que no alcance
+        a escribirse queda en el spool para el siguiente inicio.
+        """
+
+        self._detener.set()
+        self._aviso.set()
+        self._hilo.join(espera)
+
+    def estadisticas(self):
+        with self._lock:
+            datos = dict(self._contadores)
+            datos["en_spool"] = self._sin_escribir
+
+        datos["segmentos"] = self._spool.segmentos()
+        return datos
+
+
+def obtener_escritor():
+    """
+    Un solo escritor por proceso del servidor.
+    """
+
+    global _escritor
+
+    with _lock_escritor:
+        if _escritor is None:
+            tamano_mb = float(_secreto(
+                "audit_spool_segmento_mb",
+                TAMANO_SEGMENTO_MB_DEFAULT
+            ))
+
+            _escritor = EscritorLogs(SpoolAuditoria(
+                _secreto("audit_spool_dir", DIRECTORIO_SPOOL_DEFAULT),
+                int(tamano_mb * 1024 * 1024)
+            ))
+
+            atexit.register(_escritor.detener)
+
+        return _escritor
+
+
+def registrar_log(usuario, accion, descripcion):
+    try:
         usuario_id = (
             usuario.get("id")
             or usuario.get("usuario_id")
@@ -16,33 +488,49 @@ def registrar_log(usuario, accion, descripcion):
 
         usuario_nombre = usuario.get("nombre", "Usuario desconocido")
 
-        cursor.execute("""
-            INSERT INTO logs_auditoria (
-                usuario_id,
-                usuario_nombre,
-                accion,
-                descripcion,
-                fecha
-            )
-            VALUES (%s, %s, %s, %s, NOW())
-        """, (
-            usuario_id,
-            usuario_nombre,
-            accion,
-            descripcion
-        ))
-
-        conn.commit()
+        obtener_escritor().registrar({
+            "usuario_id": usuario_id,
+            "usuario_nombre": usuario_nombre,
+            "accion": accion,
+            "descripcion": descripcion,
+            "fecha": datetime.now(timezone.utc).isoformat()
+        })
 
     except Exception as e:
-        if conn:
-            conn.rollback()
-
         print(f"Error al registrar log: {e}")
 
-    finally:
-        if cursor:
-            cursor.close()
 
-        if conn:
-            conn.close()
\ No newline at end of file
+# ===============================
+# LÍNEA DE COMANDOS
+# ===============================
+
+def main():
+    spool = SpoolAuditoria(
+        _secreto("audit_spool_dir", DIRECTORIO_SPOOL_DEFAULT),
+        int(float(_secreto(
+            "audit_spool_segmento_mb",
+            TAMANO_SEGMENTO_MB_DEFAULT
+        )) * 1024 * 1024)
+    )
+
+    total = 0
+
+    # Si el servidor está vaciando el spool se espera a que termine.
+    with spool.drenado():
+        while True:
+            eventos, posicion = spool.leer(TAMANO_LOTE)
+
+            if eventos:
+                escribir_eventos(eventos)
+                total += len(eventos)
+
+            spool.confirmar(posicion)
+
+            if not eventos:
+                break
+
+    print(f"{total} eventos del spool escritos en logs_auditoria.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Valores de los filtros del visor de logs (usuarios y acciones).
+
+En lugar de un SELECT DISTINCT sobre todo logs_auditoria, los pares
+(usuario_nombre, accion) se guardan en logs_facetas con un trigger por
+sentencia: cada lote de logs agrega solo los pares nuevos (tabla y
+trigger en migraciones/0004_logs_facetas.sql; mientras no esté aplicada
+los pares se leen de logs_auditoria). Para reconstruirla (por ejemplo
+después de archivar particiones):
+
+    python -m utils.logs_facetas
+"""
+
+import pandas as pd
+import streamlit as st
+
+from utils.migraciones import migracion_aplicada
+
+
+# ===============================
+# CONFIGURACIÓN
+# ===============================
+
+# Migración que crea logs_facetas y su trigger
+MIGRACION_LOGS_FACETAS = 4
+
+# Segundos que el visor reutiliza facetas, rango y total. El escritor
+# de logs además vacía el cache después de cada lote.
+TTL_RESUMEN = 60
+
+
+# ===============================
+# RECONSTRUCCIÓN
+# ===============================
+
+def _reconstruir(cursor):
+    cursor.execute("DELETE FROM logs_facetas;")
+
+    cursor.execute("""
+        INSERT INTO logs_facetas (usuario_nombre, accion)
+        SELECT DISTINCT
+            COALESCE(usuario_nombre, ''),
+            COALESCE(accion, '')
+        FROM logs_auditoria;
+    """)
+
+
+def reconstruir_logs_facetas(conn):
+    cursor = conn.cursor()
+
+    try:
+        _reconstruir(cursor)
+        conn.commit()
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        cursor.close()
+
+
+# ===============================
+# LECTURA
+# ===============================
+
+def cargar_facetas_logs(conn):
+    """
+    Usuarios, acciones y primer/último día con logs.
+    Devuelve (df_facetas, primera_fecha, ultima_fecha).
+    """
+
+    if migracion_aplicada(MIGRACION_LOGS_FACETAS):
+        df_facetas = pd.read_sql("""
+            SELECT
+                NULLIF(usuario_nombre, '') AS usuario_nombre,
+                NULLIF(accion, '') AS accion
+            FROM logs_facetas;
+        """, conn)
+    else:
+        df_facetas = pd.read_sql("""
+            SELECT DISTINCT
+                usuario_nombre,
+                accion
+            FROM logs_auditoria;
+        """, conn)
+
+    # MIN y MAX se resuelven con el índice (fecha, log_id).
+    df_rango = pd.read_sql("""
+        SELECT
+            (SELECT MIN(fecha) FROM logs_auditoria) AS primera,
+            (SELECT MAX(fecha) FROM logs_auditoria) AS ultima;
+    """, conn)
+
+    return (
+        df_facetas,
+        pd.to_datetime(df_rango["primera"].iloc[0]),
+        pd.to_datetime(df_rango["ultima"].iloc[0])
+    )
+
+
+@st.cache_data(ttl=TTL_RESUMEN, show_spinner=False)
+def resumen_logs(_conn):
+    """
+    (df_facetas, primera_fecha, ultima_fecha, (total, exacto)) para
+    el visor de logs. Cache propio: las escrituras de ventas y gastos
+    no lo afectan y los logs nuevos lo invalidan.
+    """
+
+    from utils.paginacion import contar_aproximado
+
+    df_facetas, primera, ultima = cargar_facetas_logs(_conn)
+
+    total = contar_aproximado(
+        _conn,
+        "FROM logs_auditoria",
+        "",
+        []
+    )
+
+    return df_facetas, primera, ultima, total
+
+
+def invalidar_resumen_logs():
+    resumen_logs.clear()
+
+
+# ===============================
+# LÍNEA DE COMANDOS
+# ===============================
+
+def main():
+    from utils.conexionASupabase import obtener_conexion
+
+    with obtener_conexion() as conn:
+        reconstruir_logs_facetas(conn)
+
+    print("logs_facetas reconstruida.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,499 @@
+"""
+Particiones mensuales de logs_auditoria, retención y archivo.
+
+logs_auditoria se convierte (una vez) en una tabla particionada por
+rango de fecha, con una partición por mes y una partición DEFAULT para
+lo que no tenga mes creado. Las particiones más viejas que la retención
+se exportan a CSV comprimido y se separan de la tabla (DETACH + DROP),
+sin un DELETE masivo.
+
+    python -m utils.logs_particiones --convertir
+    python -m utils.logs_particiones                 # crea los meses siguientes
+    python -m utils.logs_particiones --archivar      # archiva lo vencido
+"""
+
+import argparse
+import gzip
+import os
+
+from datetime import date
+
+import streamlit as st
+
+from utils.filtros import rango_periodo
+
+
+# ===============================
+# CONFIGURACIÓN
+# ===============================
+
+TABLA = "logs_auditoria"
+PARTICION_DEFAULT = "logs_auditoria_pdefault"
+MESES_FUTUROS_DEFAULT = 3
+RETENCION_MESES_DEFAULT = 12
+DIRECTORIO_ARCHIVO_DEFAULT = "logs/archivo_auditoria"
+
+
+def _secreto(clave, default):
+    try:
+        return st.secrets.get(clave, default)
+    except Exception:
+        return default
+
+
+def _nombre_particion(anio, mes):
+    return f"logs_auditoria_p{anio:04d}_{mes:02d}"
+
+
+def _sumar_meses(anio, mes, meses):
+    total = anio * 12 + (mes - 1) + meses
+    return total // 12, total % 12 + 1
+
+
+def es_particionada(cursor):
+    cursor.execute("""
+        SELECT c.relkind = 'p'
+        FROM pg_class c
+        WHERE c.oid = to_regclass(%s);
+    """, (TABLA,))
+
+    fila = cursor.fetchone()
+    return bool(fila and fila[0])
+
+
+def particiones_mensuales(cursor):
+    """
+    [(anio, mes, nombre)] de las particiones mensuales existentes.
+    """
+
+    cursor.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c
+            ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        ORDER BY c.relname;
+    """, (TABLA,))
+
+    particiones = []
+
+    for (nombre,) in cursor.fetchall():
+        if nombre == PARTICION_DEFAULT:
+            continue
+
+        anio, mes = nombre.rsplit("_p", 1)[1].split("_")
+        particiones.append((int(anio), int(mes), nombre))
+
+    return particiones
+
+
+# ===============================
+# CREACIÓN DE PARTICIONES
+# ===============================
+
+def _crear_particion(cursor, anio, mes):
+    nombre = _nombre_particion(anio, mes)
+    inicio, fin = rango_periodo(anio, mes)
+
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL;", (nombre,))
+
+    if cursor.fetchone()[0]:
+        return False
+
+    cursor.execute(f"""
+        SELECT EXISTS (
+            SELECT 1
+            FROM {PARTICION_DEFAULT}
+            WHERE fecha >= %s
+            AND fecha < %s
+        );
+    """, (inicio, fin))
+
+    if not cursor.fetchone()[0]:
+        cursor.execute(f"""
+            CREATE TABLE {nombre}
+            PARTITION OF {TABLA}
+            FOR VALUES FROM (%s) TO (%s);
+        """, (inicio, fin))
+
+        return True
+
+    # Hay filas de ese mes en la partición DEFAULT: se mueven a la
+    # tabla nueva antes de adjuntarla.
+    cursor.execute(f"""
+        CREATE TABLE {nombre}
+        (LIKE {TABLA} INCLUDING DEFAULTS);
+    """)
+
+    cursor.execute(f"""
+        WITH movidas AS (
+            DELETE FROM {PARTICION_DEFAULT}
+            WHERE fecha >= %s
+            AND fecha < %s
+            RETURNING *
+        )
+        INSERT INTO {nombre}
+        SELECT *
+        FROM movidas;
+    """, (inicio, fin))
+
+    cursor.execute(f"""
+        ALTER TABLE {TABLA}
+        ATTACH PARTITION {nombre}
+        FOR VALUES FROM (%s) TO (%s);
+    """, (inicio, fin))
+
+    return True
+
+
+def crear_particiones_futuras(conn, meses=MESES_FUTUROS_DEFAULT):
+    """
+    Crea las particiones del mes actual y de los meses siguientes.
+    Devuelve cuántas se crearon.
+    """
+
+    cursor = conn.cursor()
+
+    try:
+        if not es_particionada(cursor):
+            return 0
+
+        hoy = date.today()
+        creadas = 0
+
+        for i in range(meses + 1):
+            anio, mes = _sumar_meses(hoy.year, hoy.month, i)
+
+            if _crear_particion(cursor, anio, mes):
+                creadas += 1
+
+        conn.commit()
+        return creadas
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        cursor.close()
+
+
+# ===============================
+# CONVERSIÓN
+# ===============================
+
+def _definiciones_tabla(cursor):
+    """
+    Índices, restricciones y triggers de la tabla actual, como
+    sentencias para repetirlos sobre la tabla nueva. Se excluyen los
+    que la tabla nueva ya trae: la llave primaria (se crea con fecha),
+    los CHECK y NOT NULL (LIKE ... INCLUDING CONSTRAINTS), los índices
+    de las restricciones y los triggers internos.
+    """
+
+    cursor.execute("""
+        SELECT pg_get_indexdef(i.indexrelid)
+        FROM pg_index i
+        WHERE i.indrelid = %s::regclass
+        AND NOT EXISTS (
+            SELECT 1
+            FROM pg_constraint c
+            WHERE c.conindid = i.indexrelid
+        )
+        ORDER BY i.indexrelid;
+    """, (TABLA,))
+
+    definiciones = [fila[0] for fila in cursor.fetchall()]
+
+    cursor.execute("""
+        SELECT
+            conname,
+            pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid = %s::regclass
+        AND contype NOT IN ('p', 'c', 'n')
+        ORDER BY oid;
+    """, (TABLA,))
+
+    definiciones += [
+        f'ALTER TABLE {TABLA} ADD CONSTRAINT "{nombre}" {definicion}'
+        for nombre, definicion in cursor.fetchall()
+    ]
+
+    cursor.execute("""
+        SELECT pg_get_triggerdef(t.oid)
+        FROM pg_trigger t
+        WHERE t.tgrelid = %s::regclass
+        AND NOT t.tgisinternal
+        ORDER BY t.oid;
+    """, (TABLA,))
+
+    definiciones += [fila[0] for fila in cursor.fetchall()]
+
+    return definiciones
+
+
+def convertir_a_particionada(conn, meses_futuros=MESES_FUTUROS_DEFAULT):
+    """
+    Reemplaza logs_auditoria por una tabla particionada por mes con
+    los mismos datos, índices, restricciones y triggers, en una sola
+    transacción. log_id conserva su secuencia de valores; la llave
+    primaria pasa a ser (log_id, fecha) porque en una tabla particionada
+    debe incluir la columna de partición. No hace nada si ya está
+    particionada.
+    """
+
+    cursor = conn.cursor()
+
+    try:
+        if es_particionada(cursor):
+            return False
+
+        cursor.execute(f"LOCK TABLE {TABLA} IN ACCESS EXCLUSIVE MODE;")
+
+        cursor.execute(f"""
+            SELECT
+                MIN(fecha)::DATE,
+                COALESCE(MAX(log_id), 0)
+            FROM {TABLA};
+        """)
+
+        primera_fecha, ultimo_id = cursor.fetchone()
+
+        # Se borran con la tabla vieja; la nueva tiene el mismo nombre.
+        definiciones = _definiciones_tabla(cursor)
+
+        # Una fila sin fecha no cabe en la llave primaria: la conversión
+        # falla completa y la tabla vieja queda igual.
+        cursor.execute(f"""
+            CREATE TABLE logs_auditoria_particionada
+            (
+                LIKE {TABLA} INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+                PRIMARY KEY (log_id, fecha)
+            )
+            PARTITION BY RANGE (fecha);
+        """)
+
+        # Secuencia propia: la del serial/identity se borra con la tabla vieja.
+        cursor.execute("""
+            CREATE SEQUENCE logs_auditoria_log_id_particion_seq
+            OWNED BY logs_auditoria_particionada.log_id;
+        """)
+
+        cursor.execute(
+            "SELECT setval('logs_auditoria_log_id_particion_seq', %s + 1, FALSE);",
+            (int(ultimo_id),)
+        )
+
+        cursor.execute("""
+            ALTER TABLE logs_auditoria_particionada
+            ALTER COLUMN log_id
+            SET DEFAULT nextval('logs_auditoria_log_id_particion_seq');
+        """)
+
+        cursor.execute(f"""
+            CREATE TABLE {PARTICION_DEFAULT}
+            PARTITION OF logs_auditoria_particionada DEFAULT;
+        """)
+
+        hoy = date.today()
+        anio, mes = (
+            (primera_fecha.year, primera_fecha.month)
+            if primera_fecha is not None
+            else (hoy.year, hoy.month)
+        )
+        anio_final, mes_final = _sumar_meses(hoy.year, hoy.month, meses_futuros)
+
+        while (anio, mes) <= (anio_final, mes_final):
+            inicio, fin = rango_periodo(anio, mes)
+
+            cursor.execute(f"""
+                CREATE TABLE {_nombre_particion(anio, mes)}
+                PARTITION OF logs_auditoria_particionada
+                FOR VALUES FROM (%s) TO (%s);
+            """, (inicio, fin))
+
+            anio, mes = _sumar_meses(anio, mes, 1)
+
+        cursor.execute(f"""
+            INSERT INTO logs_auditoria_particionada
+            SELECT *
+            FROM {TABLA};
+        """)
+
+        cursor.execute(f"DROP TABLE {TABLA};")
+
+        cursor.execute(f"""
+            ALTER TABLE logs_auditoria_particionada
+            RENAME TO {TABLA};
+        """)
+
+        cursor.execute(f"""
+            ALTER TABLE {TABLA}
+            RENAME CONSTRAINT logs_auditoria_particionada_pkey TO {TABLA}_pkey;
+        """)
+
+        for definicion in definiciones:
+            cursor.execute(definicion)
+
+        conn.commit()
+        return True
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        cursor.close()
+
+
+# ===============================
+# RETENCIÓN Y ARCHIVO
+# ===============================
+
+def archivar_particiones(
+    conn,
+    retencion_meses=RETENCION_MESES_DEFAULT,
+    directorio=DIRECTORIO_ARCHIVO_DEFAULT
+):
+    """
+    Exporta a CSV comprimido (.csv.gz) cada partición mensual que
+    terminó hace más de retencion_meses y después la separa y borra.
+    Devuelve la lista de archivos creados.
+    """
+
+    os.makedirs(directorio, exist_ok=True)
+
+    hoy = date.today()
+    anio_limite, mes_limite = _sumar_meses(hoy.year, hoy.month, -int(retencion_meses))
+
+    cursor = conn.cursor()
+    archivos = []
+
+    try:
+        if not es_particionada(cursor):
+            return archivos
+
+        for anio, mes, nombre in particiones_mensuales(cursor):
+            if (anio, mes) >= (anio_limite, mes_limite):
+                continue
+
+            ruta = os.path.join(directorio, f"{nombre}.csv.gz")
+            temporal = ruta + ".tmp"
+
+            # El archivo queda completo en disco antes de borrar la partición.
+            with gzip.open(temporal, "wt", encoding="utf-8", newline="") as archivo:
+                cursor.copy_expert(
+                    f"COPY (SELECT * FROM {nombre} ORDER BY fecha, log_id) "
+                    "TO STDOUT WITH CSV HEADER",
+                    archivo
+                )
+
+            with open(temporal, "rb") as archivo:
+                os.fsync(archivo.fileno())
+
+            os.replace(temporal, ruta)
+
+            cursor.execute(f"ALTER TABLE {TABLA} DETACH PARTITION {nombre};")
+            cursor.execute(f"DROP TABLE {nombre};")
+            conn.commit()
+
+            archivos.append(ruta)
+
+        return archivos
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        cursor.close()
+
+
+def mantener_particiones():
+    """
+    Crea los meses siguientes si la tabla ya está particionada.
+    Se llama al iniciar el escritor de logs; un error no detiene nada
+    porque la partición DEFAULT recibe lo que no tenga mes.
+    """
+
+    from utils.conexionASupabase import obtener_conexion
+
+    try:
+        with obtener_conexion() as conn:
+            crear_particiones_futuras(
+                conn,
+                int(_secreto("logs_meses_futuros", MESES_FUTUROS_DEFAULT))
+            )
+
+    except Exception as e:
+        print(f"Error al crear particiones de logs: {e}")
+
+
+# ===============================
+# LÍNEA DE COMANDOS
+# ===============================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Particiones mensuales de logs_auditoria."
+    )
+
+    parser.add_argument(
+        "--convertir",
+        action="store_true",
+        help="Convierte logs_auditoria en tabla particionada (una vez)."
+    )
+
+    parser.add_argument(
+        "--meses-futuros",
+        type=int,
+        default=int(_secreto("logs_meses_futuros", MESES_FUTUROS_DEFAULT))
+    )
+
+    parser.add_argument(
+        "--archivar",
+        action="store_true",
+        help="Exporta y separa las particiones fuera de la retención."
+    )
+
+    parser.add_argument(
+        "--retencion-meses",
+        type=int,
+        default=int(_secreto("logs_retencion_meses", RETENCION_MESES_DEFAULT))
+    )
+
+    parser.add_argument(
+        "--directorio",
+        default=_secreto("logs_archivo_dir", DIRECTORIO_ARCHIVO_DEFAULT)
+    )
+
+    argumentos = parser.parse_args()
+
+    from utils.conexionASupabase import obtener_conexion
+
+    with obtener_conexion() as conn:
+        if argumentos.convertir:
+            if convertir_a_particionada(conn, argumentos.meses_futuros):
+                print("logs_auditoria convertida a tabla particionada.")
+            else:
+                print("logs_auditoria ya estaba particionada.")
+
+        creadas = crear_particiones_futuras(conn, argumentos.meses_futuros)
+        print(f"Particiones nuevas: {creadas}.")
+
+        if argumentos.archivar:
+            archivos = archivar_particiones(
+                conn,
+                argumentos.retencion_meses,
+                argumentos.directorio
+            )
+
+            for ruta in archivos:
+                print(f"Archivada: {ruta}")
+
+            print(f"Particiones archivadas: {len(archivos)}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""
+Migraciones del esquema, por versiones.
+
+Cada archivo de migraciones/ se llama NNNN_descripcion.sql y se aplica
+una sola vez, en orden, cada uno en su propia transacción. La tabla
+schema_version guarda las versiones aplicadas y es la única fuente de
+la versión del esquema. Para aplicarlas al desplegar:
+
+    python -m utils.migraciones
+
+Las primeras líneas de un archivo pueden marcarlo:
+
+- "-- sin transacción": se ejecuta sentencia por sentencia en
+  autocommit; es solo para CREATE INDEX CONCURRENTLY, que no puede ir
+  dentro de una transacción. Sus sentencias deben poder repetirse
+  (IF NOT EXISTS).
+- "-- independiente": si falla (una restricción que los datos
+  existentes no cumplen) queda pendiente sin detener a las siguientes.
+  Van al final y ninguna otra depende de ellas.
+
+streamlit_app.py llama asegurar_migraciones() en cada rerun; el intento
+real se hace una vez por proceso del servidor, también si falla: el
+error queda guardado, se muestra solo a los administradores y las
+escrituras que dependen de una migración pendiente se niegan
+(exigir_migracion).
+"""
+
+import os
+import re
+
+import streamlit as st
+
+
+# ===============================
+# ARCHIVOS
+# ===============================
+
+DIRECTORIO = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "migraciones"
+)
+
+PATRON_ARCHIVO = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+MARCA_SIN_TRANSACCION = "-- sin transacción"
+MARCA_INDEPENDIENTE = "-- independiente"
+MARCAS = {MARCA_SIN_TRANSACCION, MARCA_INDEPENDIENTE}
+
+# Fin de sentencia en un archivo sin transacción
+PATRON_FIN_SENTENCIA = re.compile(r";\s*$", re.MULTILINE)
+
+PATRON_INDICE_CONCURRENTE = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)",
+    re.IGNORECASE
+)
+
+# Evita que dos procesos del servidor apliquen la misma migración.
+LLAVE_BLOQUEO = 7310019
+
+SQL_TABLA = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        nombre TEXT NOT NULL,
+        aplicada_en TIMESTAMP DEFAULT NOW()
+    );
+"""
+
+
+def listar_migraciones():
+    """
+    [(version, nombre, ruta)] ordenadas por versión.
+    """
+
+    migraciones = []
+
+    for archivo in os.listdir(DIRECTORIO):
+        coincidencia = PATRON_ARCHIVO.match(archivo)
+
+        if coincidencia:
+            migraciones.append((
+                int(coincidencia.group(1)),
+                coincidencia.group(2),
+                os.path.join(DIRECTORIO, archivo)
+            ))
+
+    return sorted(migraciones)
+
+
+def version_disponible():
+    migraciones = listar_migraciones()
+    return migraciones[-1][0] if migraciones else 0
+
+
+# ===============================
+# APLICACIÓN
+# ===============================
+
+def versiones_aplicadas(conn):
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(SQL_TABLA)
+        cursor.execute("SELECT version FROM schema_version;")
+        versiones = {fila[0] for fila in cursor.fetchall()}
+        conn.commit()
+        return versiones
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        cursor.close()
+
+
+class ErrorMigracion(Exception):
+    """
+    Fallaron las migraciones [(version, nombre, error)]; las demás que
+    se intentaron quedaron aplicadas.
+    """
+
+    def __init__(self, fallidas):
+        super().__init__(" ".join(
+            f"Migración {version:04d}_{nombre}: {error}"
+            for version, nombre, error in fallidas
+        ))
+        self.versiones = [version for version, _, _ in fallidas]
+
+
+def _marcas(sql):
+    marcas = set()
+
+    for linea in sql.splitlines():
+        if linea.strip() not in MARCAS:
+            break
+
+        marcas.add(linea.strip())
+
+    return marcas
+
+
+def _sentencias(sql):
+    """
+    Sentencias de un archivo sin transacción (separadas por ; al final
+    de la línea), sin las que son solo comentarios.
+    """
+
+    sentencias = []
+
+    for bloque in PATRON_FIN_SENTENCIA.split(sql):
+        codigo = [
+            linea
+            for linea in bloque.splitlines()
+            if linea.strip() and not linea.strip().startswith("--")
+        ]
+
+        if codigo:
+            sentencias.append(bloque.strip())
+
+    return sentencias
+
+
+def _aplicar_sin_transaccion(conn, cursor, sql):
+    # El pool presta un envoltorio; autocommit se cambia en la conexión real.
+    fisica = getattr(conn, "conexion_fisica", conn)
+    fisica.commit()
+    fisica.autocommit = True
+
+    try:
+        for sentencia in _sentencias(sql):
+            indice = PATRON_INDICE_CONCURRENTE.search(sentencia)
+
+            if indice:
+                # Un CREATE INDEX CONCURRENTLY interrumpido deja el
+                # índice inválido; se borra para volver a crearlo.
+                cursor.execute("""
+                    SELECT NOT i.indisvalid
+                    FROM pg_index i
+                    JOIN pg_class c
+                        ON c.oid = i.indexrelid
+                    WHERE c.relname = %s;
+                """, (indice.group(1),))
+
+                fila = cursor.fetchone()
+
+                if fila is not None and fila[0]:
+                    cursor.execute(
+                        f"DROP INDEX CONCURRENTLY IF EXISTS {indice.group(1)};"
+                    )
+
+            cursor.execute(sentencia)
+
+    finally:
+        fisica.autocommit = False
+
+
+def aplicar_migraciones(conn):
+    """
+    Aplica las migraciones pendientes. Devuelve la lista de versiones
+    aplicadas. Una que falla se revierte completa (las sin transacción
+    se reanudan al reintentar); si no es independiente ahí se detiene.
+    Al final lanza ErrorMigracion con las que fallaron.
+    """
+
+    cursor = conn.cursor()
+    aplicadas = []
+    fallidas = []
+
+    try:
+        cursor.execute("SELECT pg_advisory_lock(%s);", (LLAVE_BLOQUEO,))
+        conn.commit()
+
+        # Se leen después del bloqueo: otro proceso pudo aplicarlas.
+        ya_aplicadas = versiones_aplicadas(conn)
+
+        for version, nombre, ruta in listar_migraciones():
+            if version in ya_aplicadas:
+                continue
+
+            with open(ruta, encoding="utf-8") as archivo:
+                sql = archivo.read()
+
+            marcas = _marcas(sql)
+
+            try:
+                if MARCA_SIN_TRANSACCION in marcas:
+                    _aplicar_sin_transaccion(conn, cursor, sql)
+                else:
+                    cursor.execute(sql)
+
+                cursor.execute("""
+                    INSERT INTO schema_version (version, nombre)
+                    VALUES (%s, %s);
+                """, (version, nombre))
+
+                conn.commit()
+
+            except Exception as e:
+                conn.rollback()
+                fallidas.append((version, nombre, e))
+
+                if MARCA_INDEPENDIENTE in marcas:
+                    continue
+
+                break
+
+            aplicadas.append(version)
+
+        if fallidas:
+            raise ErrorMigracion(fallidas)
+
+        return aplicadas
+
+    finally:
+        try:
+            cursor.execute("SELECT pg_advisory_unlock(%s);", (LLAVE_BLOQUEO,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+
+        cursor.close()
+
+
+# ===============================
+# ESTADO EN LA APLICACIÓN
+# ===============================
+
+@st.cache_resource(show_spinner=False)
+def asegurar_migraciones():
+    """
+    Aplica lo pendiente una sola vez por proceso del servidor y
+    devuelve el estado; no lanza. Un error también queda en el cache
+    para no repetir el intento (y el bloqueo) en cada rerun; un
+    administrador puede reintentar desde la barra lateral.
+
+        {"aplicadas": {versiones}, "error": texto o None}
+    """
+
+    from utils.conexionASupabase import obtener_conexion
+
+    error = None
+
+    try:
+        with obtener_conexion() as conn:
+            aplicar_migraciones(conn)
+
+    except Exception as e:
+        error = str(e)
+        print(f"Error al aplicar migraciones: {e}")
+
+    try:
+        with obtener_conexion() as conn:
+            aplicadas = versiones_aplicadas(conn)
+
+    except Exception:
+        aplicadas = set()
+
+    return {
+        "aplicadas": aplicadas,
+        "error": error
+    }
+
+
+def migracion_aplicada(version):
+    return version in asegurar_migraciones()["aplicadas"]
+
+
+def exigir_migracion(version):
+    """
+    Detiene una escritura que depende de la migración `version` (una
+    restricción única, un índice de ON CONFLICT) si no está aplicada.
+    """
+
+    if migracion_aplicada(version):
+        return
+
+    st.error(
+        "No se puede guardar: la base de datos tiene cambios de "
+        "estructura pendientes. Avisa al administrador."
+    )
+    st.stop()
+
+
+def mostrar_estado_migraciones():
+    """
+    Error de migraciones en la barra lateral, solo para administradores,
+    con un botón para reintentar.
+    """
+
+    from utils.permisos import usuario_es_admin
+
+    error = asegurar_migraciones()["error"]
+
+    if error is None or not usuario_es_admin():
+        return
+
+    st.sidebar.error(f"Migraciones pendientes. {error}")
+
+    if st.sidebar.button("Reintentar migraciones", key="reintentar_migraciones"):
+        asegurar_migraciones.clear()
+        st.rerun()
+
+
+# ===============================
+# LÍNEA DE COMANDOS
+# ===============================
+
+def main():
+    from utils.conexionASupabase import obtener_conexion
+
+    with obtener_conexion() as conn:
+        aplicadas = aplicar_migraciones(conn)
+
+    if aplicadas:
+        print(f"Migraciones aplicadas: {aplicadas}.")
+    else:
+        print(f"Esquema al día (versión {version_disponible()}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Navegación de la aplicación (st.navigation).
+
+streamlit_app.py es el punto de entrada en cada rerun: sin sesión solo
+registra la pantalla de login; con sesión registra únicamente las
+páginas que el rol puede ver (utils.permisos.paginas_visibles). Una
+página prohibida no aparece en la barra lateral ni se puede abrir por
+URL, así que su script nunca se ejecuta.
+"""
+
+import streamlit as st
+
+from utils.permisos import paginas_visibles, usuario_es_admin
+from utils.sesiones import olvidar_sesion
+
+
+# ===============================
+# PÁGINAS
+# ===============================
+
+# (clave en paginas_sistema, archivo, título, ícono), en orden del menú
+PAGINAS = [
+    (
+        "dashboard",
+        "pages/1_Dashboard_Farmacias.py",
+        "Dashboard",
+        "📊"
+    ),
+    (
+        "consulta_financiera",
+        "pages/2_Consulta_Financiera.py",
+        "Consulta Financiera",
+        "📄"
+    ),
+    (
+        "registros",
+        "pages/3_Registros.py",
+        "Registros",
+        "📝"
+    ),
+    (
+        "administracion_facturas",
+        "pages/7_Administracion_Facturas.py",
+        "Administración de Facturas",
+        "🧾"
+    ),
+    (
+        "configuracion",
+        "pages/9_Configuracion.py",
+        "Configuración",
+        "⚙️"
+    )
+]
+
+
+def claves_navegables(conn=None):
+    """
+    Claves de PAGINAS que el usuario actual puede abrir.
+    Admin ve todas, igual que en utils.permisos.puede_ver_pagina.
+    """
+
+    if usuario_es_admin():
+        return {clave for clave, _, _, _ in PAGINAS}
+
+    return paginas_visibles(conn)
+
+
+def construir_navegacion(pantalla_login):
+    """
+    Devuelve el st.navigation de la sesión actual.
+    pantalla_login es la función que dibuja el formulario de acceso.
+    """
+
+    if "usuario" not in st.session_state:
+        return st.navigation(
+            [st.Page(pantalla_login, title="Ingresar", default=True)],
+            position="hidden"
+        )
+
+    claves = claves_navegables()
+
+    paginas = [
+        st.Page(ruta, title=titulo, icon=icono)
+        for clave, ruta, titulo, icono in PAGINAS
+        if clave in claves
+    ]
+
+    if not paginas:
+        # Un rol sin páginas solo ve el aviso y puede cerrar sesión.
+        paginas = [st.Page(sin_paginas, title="Sin acceso", default=True)]
+
+    return st.navigation(paginas)
+
+
+# ===============================
+# SESIÓN
+# ===============================
+
+def ir_a_login():
+    """
+    Sin usuario en la sesión el siguiente rerun solo tiene el login.
+    """
+
+    st.rerun()
+
+
+def cerrar_sesion():
+    st.session_state.clear()
+    olvidar_sesion()
+    st.rerun()
+
+
+def sin_paginas():
+    st.warning("Tu rol no tiene páginas asignadas. Contacta al administrador.")
+
+    if st.button("Cerrar sesión", key="btn_cerrar_sesion_sin_paginas"):
+        cerrar_sesion()
@@ -0,0 +1,569 @@
+"""
+Paginación por llave (keyset / seek) para las tablas de la aplicación.
+
+En lugar de LIMIT/OFFSET, cada página se pide a partir de la llave de
+orden de la última (o primera) fila mostrada:
+
+    WHERE (v.fecha, v.venta_id) < (%s, %s)
+    ORDER BY v.fecha DESC, v.venta_id DESC
+    LIMIT 26
+
+Así la página 500 cuesta lo mismo que la página 1. El total se toma
+del estimado del planificador (EXPLAIN) y solo se cuenta exacto cuando
+el estimado es pequeño.
+"""
+
+import math
+
+import pandas as pd
+import streamlit as st
+
+from datetime import timedelta
+
+
+# ===============================
+# CONFIGURACIÓN
+# ===============================
+
+# Debajo de este estimado el COUNT(*) exacto es barato.
+UMBRAL_CONTEO_EXACTO = 5000
+
+
+class ClaveOrden:
+    """
+    Una columna de la llave de orden.
+
+    La expresión no debe ser NULL; para columnas que aceptan NULL se
+    usa COALESCE con un valor centinela (ej. DATE '9999-12-31' para
+    ordenar los NULL al final en orden ascendente, TIMESTAMP
+    '1900-01-01' en descendente). El centinela debe ser finito:
+    psycopg2 lee '-infinity' como datetime.min y al volver a enviarlo
+    como llave ya no es el mismo valor.
+    """
+
+    def __init__(self, expresion, descendente=False):
+        self.expresion = expresion
+        self.descendente = descendente
+
+    def orden_sql(self, invertir=False):
+        descendente = self.descendente != invertir
+        return f"{self.expresion} {'DESC' if descendente else 'ASC'}"
+
+
+def _condicion_busqueda(orden, valores, despues, inclusiva=False):
+    """
+    Condición que deja solo las filas posteriores (despues=True) o
+    anteriores a los valores de la llave, según el orden de cada columna.
+    valores puede cubrir solo las primeras columnas de la llave.
+    """
+
+    orden = orden[:len(valores)]
+
+    def operador(clave, ultima):
+        mayor = clave.descendente != despues
+        op = ">" if mayor else "<"
+
+        if inclusiva and ultima:
+            op += "="
+
+        return op
+
+    # Todas en la misma dirección: comparación de filas, que Postgres
+    # resuelve directo sobre un índice compuesto.
+    if len({clave.descendente for clave in orden}) == 1:
+        expresiones = ", ".join(clave.expresion for clave in orden)
+        marcadores = ", ".join(["%s"] * len(orden))
+
+        return (
+            f"({expresiones}) {operador(orden[0], True)} ({marcadores})",
+            list(valores)
+        )
+
+    terminos = []
+    parametros = []
+
+    for i, clave in enumerate(orden):
+        partes = []
+
+        for anterior, valor in zip(orden[:i], valores[:i]):
+            partes.append(f"{anterior.expresion} = %s")
+            parametros.append(valor)
+
+        partes.append(
+            f"{clave.expresion} {operador(clave, i == len(orden) - 1)} %s"
+        )
+        parametros.append(valores[i])
+
+        terminos.append("(" + " AND ".join(partes) + ")")
+
+    return "(" + " OR ".join(terminos) + ")", parametros
+
+
+def _agregar_condicion(where_sql, condicion):
+    if where_sql.strip():
+        return f"{where_sql} AND {condicion}"
+
+    return f"WHERE {condicion}"
+
+
+def _valor_llave(valor):
+    if isinstance(valor, pd.Timestamp):
+        return valor.to_pydatetime()
+
+    if hasattr(valor, "item"):
+        return valor.item()
+
+    return valor
+
+
+# ===============================
+# CONTEO APROXIMADO
+# ===============================
+
+def contar_aproximado(conn, desde_sql, where_sql, parametros):
+    """
+    Total de filas según el planificador. Si el estimado es menor que
+    UMBRAL_CONTEO_EXACTO se hace el COUNT(*) real.
+    Devuelve (total, exacto).
+    """
+
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            f"EXPLAIN (FORMAT JSON) SELECT 1 {desde_sql} {where_sql}",
+            tuple(parametros)
+        )
+
+        plan = cursor.fetchone()[0]
+        estimado = int(plan[0]["Plan"]["Plan Rows"])
+
+        if estimado >= UMBRAL_CONTEO_EXACTO:
+            return estimado, False
+
+        cursor.execute(
+            f"SELECT COUNT(*) {desde_sql} {where_sql}",
+            tuple(parametros)
+        )
+
+        return int(cursor.fetchone()[0]), True
+
+    finally:
+        cursor.close()
+
+
+# ===============================
+# PAGINADOR
+# ===============================
+
+class PaginadorKeyset:
+    """
+    Paginador por llave con estado en st.session_state.
+
+    - columnas_sql: lista SELECT sin la palabra SELECT.
+    - desde_sql: FROM y JOINs.
+    - where_sql / parametros: filtros, como los arma cada página.
+    - orden: lista de ClaveOrden; la última debe ser única (el id).
+    - totales_sql: agregados opcionales sobre todo el conjunto filtrado
+      (ej. "SUM(monto) AS saldo"), con los nombres de columnas_sql.
+      Se calculan en la misma consulta que la página y quedan en
+      self.totales; el total de registros entonces es exacto.
+
+    Si cambian los filtros o el tamaño de página se vuelve a la
+    primera página.
+    """
+
+    def __init__(
+        self,
+        clave,
+        columnas_sql,
+        desde_sql,
+        orden,
+        where_sql="",
+        parametros=None,
+        tamano_pagina=25,
+        salto_fecha=False,
+        totales_sql=None
+    ):
+        self.clave = clave
+        self.columnas_sql = columnas_sql
+        self.desde_sql = desde_sql
+        self.orden = orden
+        self.where_sql = where_sql
+        self.parametros = list(parametros or [])
+        self.tamano_pagina = int(tamano_pagina)
+        self.salto_fecha = salto_fecha
+        self.totales_sql = totales_sql
+        self.totales = {}
+
+        # Con totales la página se lee del conjunto filtrado (CTE),
+        # donde la llave ya viene calculada como _llave_i.
+        if totales_sql:
+            self._orden_consulta = [
+                ClaveOrden(f"_llave_{i}", clave.descendente)
+                for i, clave in enumerate(orden)
+            ]
+        else:
+            self._orden_consulta = orden
+
+        self._firma = repr((
+            columnas_sql,
+            desde_sql,
+            [(c.expresion, c.descendente) for c in orden],
+            where_sql,
+            self.parametros,
+            self.tamano_pagina,
+            totales_sql
+        ))
+
+        estado = st.session_state.get(self.clave)
+
+        if estado is None or estado["firma"] != self._firma:
+            st.session_state[self.clave] = {
+                "firma": self._firma,
+                "modo": "inicio",
+                "llave": None,
+                "pagina": 1,
+                "primera": None,
+                "ultima": None,
+                "total": None
+            }
+
+    @property
+    def estado(self):
+        return st.session_state[self.clave]
+
+    # ----------------------------
+    # NAVEGACIÓN
+    # ----------------------------
+
+    def _ir(self, modo, llave=None, pagina=None):
+        estado = self.estado
+        estado["modo"] = modo
+        estado["llave"] = llave
+        estado["pagina"] = pagina
+
+    def ir_inicio(self):
+        self._ir("inicio", pagina=1)
+
+    def ir_final(self):
+        self._ir("final")
+
+    def ir_siguiente(self):
+        estado = self.estado
+
+        if estado["ultima"] is None:
+            return
+
+        pagina = estado["pagina"] + 1 if estado["pagina"] else None
+        self._ir("despues", estado["ultima"], pagina)
+
+    def ir_anterior(self):
+        estado = self.estado
+
+        if estado["primera"] is None:
+            return
+
+        pagina = estado["pagina"] - 1 if estado["pagina"] else None
+        self._ir("antes", estado["primera"], pagina)
+
+    def ir_fecha(self, fecha):
+        """
+        Salta a la primera fila de esa fecha según el orden de la
+        primera columna de la llave (debe ser una fecha).
+        """
+
+        if fecha is None:
+            self.ir_inicio()
+            return
+
+        self._ir("desde", (fecha,))
+
+    # ----------------------------
+    # CONSULTA
+    # ----------------------------
+
+    def _consultar(self, conn, condicion=None, parametros_condicion=None, invertir=False):
+        where_sql = self.where_sql
+        parametros = list(self.parametros)
+
+        if condicion:
+            where_sql = _agregar_condicion(where_sql, condicion)
+            parametros += parametros_condicion
+
+        llaves_sql = ", ".join(
+            f"{clave.expresion} AS _llave_{i}"
+            for i, clave in enumerate(self.orden)
+        )
+
+        orden_sql = ", ".join(
+            clave.orden_sql(invertir)
+            for clave in self.orden
+        )
+
+        df = pd.read_sql(f"""
+            SELECT
+                {self.columnas_sql},
+                {llaves_sql}
+            {self.desde_sql}
+            {where_sql}
+            ORDER BY {orden_sql}
+            LIMIT %s
+        """, conn, params=tuple(parametros + [self.tamano_pagina + 1]))
+
+        return self._recortar(df, invertir)
+
+    def _consultar_con_totales(self, conn, condicion=None, parametros_condicion=None, invertir=False):
+        """
+        Una sola consulta: el conjunto filtrado se evalúa una vez y de él
+        salen los totales y la página.
+        """
+
+        parametros = list(self.parametros)
+        where_pagina = ""
+
+        if condicion:
+            where_pagina = f"WHERE {condicion}"
+            parametros += parametros_condicion
+
+        llaves_sql = ", ".join(
+            f"{clave.expresion} AS _llave_{i}"
+            for i, clave in enumerate(self.orden)
+        )
+
+        orden_sql = ", ".join(
+            clave.orden_sql(invertir)
+            for clave in self._orden_consulta
+        )
+
+        df = pd.read_sql(f"""
+            WITH filtradas AS (
+                SELECT
+                    {self.columnas_sql},
+                    {llaves_sql}
+                {self.desde_sql}
+                {self.where_sql}
+            ),
+            totales AS (
+                SELECT
+                    COUNT(*) AS _total,
+                    {self.totales_sql}
+                FROM filtradas
+            ),
+            pagina AS (
+                SELECT *
+                FROM filtradas
+                {where_pagina}
+                ORDER BY {orden_sql}
+                LIMIT %s
+            )
+            SELECT
+                pagina.*,
+                totales.*
+            FROM totales
+            LEFT JOIN pagina
+                ON TRUE
+            ORDER BY {orden_sql}
+        """, conn, params=tuple(parametros + [self.tamano_pagina + 1]))
+
+        ultima_llave = f"_llave_{len(self.orden) - 1}"
+        columnas_totales = list(
+            df.columns[df.columns.get_loc(ultima_llave) + 1:]
+        )
+
+        self.totales = df[columnas_totales].iloc[0].to_dict()
+        self.estado["total"] = (int(self.totales.pop("_total")), True)
+
+        # Sin filas en la página el LEFT JOIN deja una fila con NULL.
+        df = df[df[ultima_llave].notna()]
+
+        return self._recortar(df.drop(columns=columnas_totales), invertir)
+
+    def _recortar(self, df, invertir):
+        hay_mas = len(df) > self.tamano_pagina
+        df = df.iloc[:self.tamano_pagina]
+
+        if invertir:
+            df = df.iloc[::-1]
+
+        return df.reset_index(drop=True), hay_mas
+
+    def cargar(self, conn):
+        """
+        Lee solo la página actual. Devuelve un DataFrame sin las
+        columnas de llave.
+        """
+
+        estado = self.estado
+        modo = estado["modo"]
+        hay_anterior = modo != "inicio"
+        hay_siguiente = modo != "final"
+
+        orden = self._orden_consulta
+
+        if self.totales_sql:
+            consultar = self._consultar_con_totales
+        else:
+            consultar = self._consultar
+
+        if modo == "despues":
+            df, hay_siguiente = consultar(
+                conn,
+                *_condicion_busqueda(orden, estado["llave"], despues=True)
+            )
+
+        elif modo == "desde":
+            fecha = estado["llave"][0]
+
+            # En orden descendente "desde el día X" son las filas antes
+            # del día siguiente; así también sirve con columnas TIMESTAMP.
+            if self.orden[0].descendente:
+                condicion = _condicion_busqueda(
+                    orden,
+                    (fecha + timedelta(days=1),),
+                    despues=True
+                )
+            else:
+                condicion = _condicion_busqueda(
+                    orden,
+                    (fecha,),
+                    despues=True,
+                    inclusiva=True
+                )
+
+            df, hay_siguiente = consultar(conn, *condicion)
+
+        elif modo == "antes":
+            df, hay_anterior = consultar(
+                conn,
+                *_condicion_busqueda(orden, estado["llave"], despues=False),
+                invertir=True
+            )
+
+            # Quedaban menos filas que una página: es la primera.
+            if not hay_anterior:
+                self.ir_inicio()
+                return self.cargar(conn)
+
+        elif modo == "final":
+            df, hay_anterior = consultar(conn, invertir=True)
+
+        else:
+            df, hay_siguiente = consultar(conn)
+
+        if estado["total"] is None:
+            estado["total"] = contar_aproximado(
+                conn,
+                self.desde_sql,
+                self.where_sql,
+                self.parametros
+            )
+
+        if modo == "final" and estado["total"][0]:
+            estado["pagina"] = max(
+                1,
+                math.ceil(estado["total"][0] / self.tamano_pagina)
+            )
+
+        columnas_llave = [f"_llave_{i}" for i in range(len(self.orden))]
+
+        if df.empty:
+            estado["primera"] = None
+            estado["ultima"] = None
+        else:
+            estado["primera"] = tuple(
+                _valor_llave(v) for v in df[columnas_llave].iloc[0]
+            )
+            estado["ultima"] = tuple(
+                _valor_llave(v) for v in df[columnas_llave].iloc[-1]
+            )
+
+        self.hay_anterior = hay_anterior and not df.empty or modo == "desde"
+        self.hay_siguiente = hay_siguiente and not df.empty
+
+        return df.drop(columns=columnas_llave)
+
+    # ----------------------------
+    # CONTROLES
+    # ----------------------------
+
+    def descripcion(self):
+        estado = self.estado
+        total, exacto = estado["total"] or (0, True)
+        total_txt = f"{total:,}" if exacto else f"~{total:,}"
+        paginas = max(1, math.ceil(total / self.tamano_pagina))
+
+        if estado["modo"] == "desde":
+            return (
+                f"Desde {estado['llave'][0]:%d/%m/%Y} · "
+                f"{total_txt} registros"
+            )
+
+        if estado["pagina"]:
+            return (
+                f"Página {estado['pagina']} de "
+                f"{paginas if exacto else f'~{paginas:,}'} · "
+                f"{total_txt} registros"
+            )
+
+        return f"{total_txt} registros"
+
+    def mostrar_controles(self):
+        """
+        Botones de navegación. Se llama después de cargar().
+        """
+
+        columnas = st.columns([1, 1, 1, 1, 2])
+
+        with columnas[0]:
+            st.button(
+                "⏮️ Inicio",
+                key=f"{self.clave}_inicio",
+                on_click=self.ir_inicio,
+                disabled=self.estado["modo"] == "inicio",
+                use_container_width=True
+            )
+
+        with columnas[1]:
+            st.button(
+                "◀️ Anterior",
+                key=f"{self.clave}_anterior",
+                on_click=self.ir_anterior,
+                disabled=not self.hay_anterior,
+                use_container_width=True
+            )
+
+        with columnas[2]:
+            st.button(
+                "Siguiente ▶️",
+                key=f"{self.clave}_siguiente",
+                on_click=self.ir_siguiente,
+                disabled=not self.hay_siguiente,
+                use_container_width=True
+            )
+
+        with columnas[3]:
+            st.button(
+                "Final ⏭️",
+                key=f"{self.clave}_final",
+                on_click=self.ir_final,
+                disabled=self.estado["modo"] == "final",
+                use_container_width=True
+            )
+
+        with columnas[4]:
+            if self.salto_fecha:
+                clave_fecha = f"{self.clave}_fecha"
+
+                st.date_input(
+                    "Ir a fecha",
+                    value=None,
+                    key=clave_fecha,
+                    format="DD/MM/YYYY",
+                    on_change=lambda: self.ir_fecha(
+                        st.session_state.get(clave_fecha)
+                    ),
+                    label_visibility="collapsed"
+                )
+
+            st.caption(self.descripcion())
@@ -0,0 +1,217 @@
+"""
+Catálogo de periodos (año y mes) con registros de ventas, gastos y facturas.
+
+Los filtros de Año y Mes leen esta tabla pequeña en lugar de recorrer
+las tablas completas con SELECT DISTINCT EXTRACT(...).
+
+Solo guarda qué periodos existen. Triggers por sentencia agregan los
+periodos nuevos con ON CONFLICT DO NOTHING, así las capturas del mismo
+mes no compiten por una fila de contador (tabla y triggers en
+migraciones/0003_periodos_disponibles.sql; mientras no esté aplicada
+los filtros se leen de las tablas completas). Los borrados no se
+siguen: un periodo que se quedó sin registros sigue en los filtros
+hasta que se poda, fuera de las páginas porque bloquea las escrituras
+de la tabla mientras revisa. Para podar (periódicamente) o
+reconstruirla:
+
+    python -m utils.periodos --podar
+    python -m utils.periodos
+"""
+
+import argparse
+
+import pandas as pd
+
+from utils.migraciones import migracion_aplicada
+
+
+# ===============================
+# ORÍGENES
+# ===============================
+
+# Migración que crea periodos_disponibles y sus triggers
+MIGRACION_PERIODOS = 3
+
+# origen -> (tabla, columna de fecha)
+ORIGENES = {
+    "ventas": ("ventas", "fecha"),
+    "gastos": ("gastos", "fecha"),
+    "facturas": ("facturas", "fecha_factura")
+}
+
+
+# ===============================
+# RECONSTRUCCIÓN Y PODA
+# ===============================
+
+def _reconstruir(cursor, origenes):
+    for origen in origenes:
+        tabla, columna = ORIGENES[origen]
+
+        cursor.execute(f"LOCK TABLE {tabla} IN SHARE MODE;")
+
+        cursor.execute("""
+            DELETE FROM periodos_disponibles
+            WHERE origen = %s;
+        """, (origen,))
+
+        cursor.execute(f"""
+            INSERT INTO periodos_disponibles (origen, anio, mes)
+            SELECT DISTINCT
+                %s,
+                EXTRACT(YEAR FROM {columna})::INT,
+                EXTRACT(MONTH FROM {columna})::INT
+            FROM {tabla}
+            WHERE {columna} IS NOT NULL;
+        """, (origen,))
+
+
+def _podar(cursor, origenes):
+    """
+    Quita los periodos que ya no tienen registros. Cada revisión es
+    una búsqueda por rango en el índice de fecha de la tabla.
+    """
+
+    for origen in origenes:
+        tabla, columna = ORIGENES[origen]
+
+        # Sin escrituras mientras se revisa: un alta concurrente en un
+        # mes vacío no vería su periodo borrado.
+        cursor.execute(f"LOCK TABLE {tabla} IN SHARE MODE;")
+
+        cursor.execute(f"""
+            DELETE FROM periodos_disponibles p
+            WHERE p.origen = %s
+            AND NOT EXISTS (
+                SELECT 1
+                FROM {tabla} t
+                WHERE t.{columna} >= make_date(p.anio, p.mes, 1)
+                AND t.{columna} < make_date(p.anio, p.mes, 1) + INTERVAL '1 month'
+            );
+        """, (origen,))
+
+
+def reconstruir_periodos(conn, origenes=None):
+    cursor = conn.cursor()
+
+    try:
+        _reconstruir(cursor, origenes or list(ORIGENES))
+        conn.commit()
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        cursor.close()
+
+
+def podar_periodos(conn, origenes=None):
+    cursor = conn.cursor()
+
+    try:
+        _podar(cursor, origenes or list(ORIGENES))
+        conn.commit()
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        cursor.close()
+
+
+# ===============================
+# LECTURA
+# ===============================
+
+def _cargar_periodos_tablas(conn, origenes):
+    consultas = []
+
+    for origen in origenes:
+        tabla, columna = ORIGENES[origen]
+
+        consultas.append(f"""
+            SELECT DISTINCT
+                EXTRACT(YEAR FROM {columna})::INT AS anio,
+                EXTRACT(MONTH FROM {columna})::INT AS mes
+            FROM {tabla}
+            WHERE {columna} IS NOT NULL
+        """)
+
+    return pd.read_sql(f"""
+        SELECT DISTINCT
+            anio,
+            mes
+        FROM ({" UNION ".join(consultas)}) periodos
+        ORDER BY anio DESC, mes;
+    """, conn)
+
+
+def cargar_periodos(conn, origenes):
+    """
+    Años y meses con registros en alguno de los orígenes (un mes que
+    se vació puede aparecer hasta la siguiente poda).
+    Devuelve un DataFrame con columnas anio y mes, sin repetidos.
+    """
+
+    if not migracion_aplicada(MIGRACION_PERIODOS):
+        return _cargar_periodos_tablas(conn, origenes)
+
+    return pd.read_sql("""
+        SELECT DISTINCT
+            anio,
+            mes
+        FROM periodos_disponibles
+        WHERE origen = ANY(%s)
+        ORDER BY anio DESC, mes;
+    """, conn, params=(list(origenes),))
+
+
+def anios_de_periodos(df_periodos):
+    return sorted(
+        df_periodos["anio"].dropna().astype(int).unique().tolist(),
+        reverse=True
+    )
+
+
+def meses_de_periodos(df_periodos, anio=None):
+    if anio is not None:
+        df_periodos = df_periodos[df_periodos["anio"] == int(anio)]
+
+    return sorted(
+        df_periodos["mes"].dropna().astype(int).unique().tolist()
+    )
+
+
+# ===============================
+# LÍNEA DE COMANDOS
+# ===============================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Reconstruye o poda la tabla periodos_disponibles."
+    )
+
+    parser.add_argument(
+        "--podar",
+        action="store_true",
+        help="Solo quita los periodos que se quedaron sin registros."
+    )
+
+    args = parser.parse_args()
+
+    from utils.conexionASupabase import obtener_conexion
+
+    with obtener_conexion() as conn:
+
+        if args.podar:
+            podar_periodos(conn)
+            print("periodos_disponibles podado.")
+        else:
+            reconstruir_periodos(conn)
+            print("periodos_disponibles reconstruido.")
+
+
+if __name__ == "__main__":
+    main()
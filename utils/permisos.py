@@ -1,5 +1,10 @@
+import threading
+import time
+
 import streamlit as st
 
+from utils.migraciones import migracion_aplicada
+
 
 def obtener_rol_usuario():
     """
@@ -31,25 +36,49 @@ def usuario_es_admin():
     return False
 
 
-def puede_ver_pagina(conn, clave_pagina):
-    """
-    Consulta si el rol del usuario puede ver una página específica.
-    """
+# ===============================
+# CACHE DE PERMISOS
+# ===============================
 
-    rol_usuario = obtener_rol_usuario()
+# Cada cuánto se consulta permisos_version para notar cambios hechos
+# desde otro proceso del servidor.
+TTL_PERMISOS = 60
 
-    if rol_usuario is None:
-        return False
+# Clave de session_state con las páginas visibles del usuario
+CLAVE_PAGINAS_VISIBLES = "paginas_visibles"
 
-    if usuario_es_admin():
-        return True
+# Migración que crea permisos_version. Mientras no esté aplicada la
+# versión queda fija en 0 y los cambios solo se notan en este proceso
+# (invalidar_permisos).
+MIGRACION_VERSION_PERMISOS = 5
+
+
+def _version_bd(conn):
+    if not migracion_aplicada(MIGRACION_VERSION_PERMISOS):
+        return 0
 
     cursor = conn.cursor()
 
     try:
+        cursor.execute("SELECT version FROM permisos_version;")
+        fila = cursor.fetchone()
+        return fila[0] if fila else 0
 
+    finally:
+        cursor.close()
+
+
+def _cargar_mapa_permisos(conn, rol):
+    """
+    {clave_pagina: puede_ver} de todas las páginas activas del rol.
+    """
+
+    cursor = conn.cursor()
+
+    try:
         cursor.execute("""
             SELECT
+                p.clave,
                 COALESCE(prp.puede_ver, FALSE)
             FROM roles r
             JOIN permisos_rol_pagina prp
@@ -57,30 +86,219 @@ def puede_ver_pagina(conn, clave_pagina):
             JOIN paginas_sistema p
                 ON prp.pagina_id = p.pagina_id
             WHERE LOWER(r.clave) = LOWER(%s)
-            AND p.clave = %s
             AND r.activo = TRUE
-            AND p.activo = TRUE
-            LIMIT 1;
-        """, (
-            rol_usuario,
-            clave_pagina
-        ))
+            AND p.activo = TRUE;
+        """, (rol,))
 
-        resultado = cursor.fetchone()
+        return {
+            clave: bool(puede_ver)
+            for clave, puede_ver in cursor.fetchall()
+        }
 
-        if resultado is None:
-            return False
+    finally:
+        cursor.close()
 
-        return bool(resultado[0])
 
-    except Exception as e:
+class CachePermisos:
+    """
+    Mapa de permisos por rol compartido por todas las sesiones.
 
-        st.error(f"Error al validar permisos: {e}")
+    Cada mapa recuerda la versión de permisos_version con la que se
+    cargó. Mientras no pase TTL_PERMISOS se responde desde memoria;
+    después se lee solo el número de versión y el mapa se recarga
+    únicamente si cambió. Configuración incrementa la versión al
+    guardar roles o permisos.
+    """
+
+    def __init__(self, ttl=TTL_PERMISOS):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._mapas = {}
+        self._version = None
+        self._verificada = 0.0
+
+    def mapa(self, conn, rol):
+        ahora = time.monotonic()
+
+        with self._lock:
+            entrada = self._mapas.get(rol)
+            vigente = ahora - self._verificada <= self._ttl
+
+            if entrada is not None and vigente and entrada[0] == self._version:
+                return entrada[1]
+
+        if vigente and self._version is not None:
+            version = self._version
+        else:
+            version = _version_bd(conn)
+
+        with self._lock:
+            if version != self._version:
+                self._mapas.clear()
+
+            self._version = version
+            self._verificada = ahora
+
+            entrada = self._mapas.get(rol)
+
+            if entrada is not None:
+                return entrada[1]
+
+        mapa = _cargar_mapa_permisos(conn, rol)
+
+        with self._lock:
+            if self._version == version:
+                self._mapas[rol] = (version, mapa)
+
+        return mapa
+
+    def invalidar(self):
+        with self._lock:
+            self._mapas.clear()
+            self._version = None
+
+
+@st.cache_resource(show_spinner=False)
+def obtener_cache_permisos():
+    """
+    Un solo cache por proceso del servidor, compartido por todas las sesiones.
+    """
+
+    return CachePermisos()
+
+
+def incrementar_version_permisos(cursor):
+    """
+    Llamar dentro de la misma transacción que modifica roles,
+    páginas o permisos, antes del commit. Después del commit
+    llamar invalidar_permisos().
+    """
+
+    if not migracion_aplicada(MIGRACION_VERSION_PERMISOS):
+        return
+
+    cursor.execute("""
+        UPDATE permisos_version
+        SET version = version + 1;
+    """)
+
+
+def guardar_permisos(cursor, rol_ids, pagina_ids, valores):
+    """
+    Guarda una lista de cambios (rol_id, pagina_id, puede_ver) en una
+    sola sentencia, con arreglos paralelos. Incrementa la versión de
+    permisos; el commit y invalidar_permisos() quedan a quien llama.
+    """
+
+    cursor.execute("""
+        INSERT INTO permisos_rol_pagina
+        (
+            rol_id,
+            pagina_id,
+            puede_ver
+        )
+        SELECT *
+        FROM unnest(
+            %s::INTEGER[],
+            %s::INTEGER[],
+            %s::BOOLEAN[]
+        )
+        ON CONFLICT (rol_id, pagina_id)
+        DO UPDATE SET
+            puede_ver = EXCLUDED.puede_ver;
+    """, (
+        [int(x) for x in rol_ids],
+        [int(x) for x in pagina_ids],
+        [bool(x) for x in valores]
+    ))
+
+    incrementar_version_permisos(cursor)
+
+
+def invalidar_permisos():
+    obtener_cache_permisos().invalidar()
+
+    # La sesión actual recalcula su navegación en el siguiente rerun.
+    st.session_state.pop(CLAVE_PAGINAS_VISIBLES, None)
+
+
+# ===============================
+# PÁGINAS VISIBLES DE LA SESIÓN
+# ===============================
+
+def calcular_paginas_visibles(conn):
+    """
+    Claves de las páginas que el rol del usuario puede ver.
+    Se guarda en la sesión al iniciar sesión; con ella se arma la
+    navegación y se valida el acceso sin consultar la base de datos.
+    """
+
+    rol_usuario = obtener_rol_usuario()
+
+    if rol_usuario is None:
+        claves = set()
+    else:
+        claves = {
+            clave
+            for clave, puede_ver in obtener_cache_permisos().mapa(conn, rol_usuario).items()
+            if puede_ver
+        }
+
+    st.session_state[CLAVE_PAGINAS_VISIBLES] = {
+        "claves": claves,
+        "calculadas": time.monotonic()
+    }
+
+    return claves
+
+
+def paginas_visibles(conn=None):
+    """
+    Páginas visibles guardadas en la sesión. Pasado TTL_PERMISOS se
+    recalculan desde el cache de permisos, así los cambios hechos en
+    Configuración llegan también a las sesiones ya abiertas.
+    Sin conn se toma una conexión del pool solo si hace falta.
+    """
+
+    guardadas = st.session_state.get(CLAVE_PAGINAS_VISIBLES)
+
+    if (
+        guardadas is not None
+        and time.monotonic() - guardadas["calculadas"] <= TTL_PERMISOS
+    ):
+        return guardadas["claves"]
+
+    if conn is not None:
+        return calcular_paginas_visibles(conn)
+
+    from utils.conexionASupabase import obtener_conexion
+
+    with obtener_conexion() as conn_local:
+        return calcular_paginas_visibles(conn_local)
+
+
+def puede_ver_pagina(conn, clave_pagina):
+    """
+    Consulta si el rol del usuario puede ver una página específica.
+    Responde desde las páginas visibles guardadas en la sesión.
+    """
+
+    rol_usuario = obtener_rol_usuario()
+
+    if rol_usuario is None:
         return False
 
-    finally:
+    if usuario_es_admin():
+        return True
 
-        cursor.close()
+    try:
+
+        return clave_pagina in paginas_visibles(conn)
+
+    except Exception as e:
+
+        st.error(f"Error al validar permisos: {e}")
+        return False
 
 
 def validar_acceso_pagina(conn, clave_pagina):
@@ -91,7 +309,8 @@ def validar_acceso_pagina(conn, clave_pagina):
     """
 
     if "usuario" not in st.session_state:
-        st.switch_page("streamlit_app.py")
+        # Sin sesión streamlit_app.py solo registra la pantalla de login.
+        st.rerun()
 
     if not puede_ver_pagina(conn, clave_pagina):
         st.error("No tienes permisos para esta sección.")
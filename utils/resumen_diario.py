@@ -0,0 +1,305 @@
+"""
+Tabla resumen_diario: una fila por farmacia y día con los totales de
+ventas y gastos.
+
+Se mantiene al día con triggers sobre ventas y gastos (altas, cambios y
+bajas aplican solo la diferencia), así que cualquier escritura queda
+reflejada sin tocar las páginas. La tabla, las funciones y los triggers
+están en migraciones/0002_resumen_diario.sql; mientras no esté aplicada
+las lecturas calculan lo mismo desde ventas y gastos. Para cargas
+masivas o para corregir diferencias se reconstruye con:
+
+    python -m utils.resumen_diario
+    python -m utils.resumen_diario --desde 2024-01-01 --hasta 2025-01-01
+"""
+
+import argparse
+
+from datetime import date
+
+import pandas as pd
+
+from utils.migraciones import migracion_aplicada
+
+
+# ===============================
+# CÁLCULO
+# ===============================
+
+# Migración que crea resumen_diario y sus triggers
+MIGRACION_RESUMEN_DIARIO = 2
+
+# Una fila por farmacia y día calculada desde ventas y gastos, con las
+# columnas de resumen_diario. {where_sql} filtra ambas tablas por fecha.
+SQL_DIARIO = """
+    SELECT
+        farmacia_id,
+        fecha,
+        SUM(ventas_totales) AS ventas_totales,
+        SUM(venta_tarjeta) AS venta_tarjeta,
+        SUM(venta_efectivo) AS venta_efectivo,
+        SUM(gastos_fijos) AS gastos_fijos,
+        SUM(gastos_variables) AS gastos_variables,
+        SUM(gastos_total) AS gastos_total,
+        SUM(registros_ventas) AS registros_ventas,
+        SUM(registros_gastos) AS registros_gastos
+    FROM (
+        SELECT
+            farmacia_id,
+            fecha::DATE AS fecha,
+            COALESCE(ventas_totales, 0) AS ventas_totales,
+            COALESCE(venta_tarjeta, 0) AS venta_tarjeta,
+            GREATEST(
+                COALESCE(ventas_totales, 0)
+                - COALESCE(venta_tarjeta, 0),
+                0
+            ) AS venta_efectivo,
+            0 AS gastos_fijos,
+            0 AS gastos_variables,
+            0 AS gastos_total,
+            1 AS registros_ventas,
+            0 AS registros_gastos
+        FROM ventas
+        {where_sql}
+
+        UNION ALL
+
+        SELECT
+            farmacia_id,
+            fecha::DATE AS fecha,
+            0,
+            0,
+            0,
+            CASE WHEN LOWER(tipo_gasto) = 'fijo' THEN COALESCE(monto, 0) ELSE 0 END,
+            CASE WHEN LOWER(tipo_gasto) = 'fijo' THEN 0 ELSE COALESCE(monto, 0) END,
+            COALESCE(monto, 0),
+            0,
+            1
+        FROM gastos
+        {where_sql}
+    ) movimientos
+    WHERE farmacia_id IS NOT NULL
+    AND fecha IS NOT NULL
+    GROUP BY farmacia_id, fecha
+"""
+
+
+def origen_resumen_diario():
+    """
+    Lo que las consultas leen como resumen_diario: la tabla o, mientras
+    su migración no esté aplicada, el mismo cálculo sobre ventas y
+    gastos (más lento, mismo resultado).
+    """
+
+    if migracion_aplicada(MIGRACION_RESUMEN_DIARIO):
+        return "resumen_diario"
+
+    return "(" + SQL_DIARIO.format(where_sql="") + ")"
+
+
+# ===============================
+# RECONSTRUCCIÓN
+# ===============================
+
+def _reconstruir(cursor, fecha_desde, fecha_hasta):
+    condiciones = []
+    parametros = []
+
+    if fecha_desde is not None:
+        condiciones.append("fecha >= %s")
+        parametros.append(fecha_desde)
+
+    if fecha_hasta is not None:
+        condiciones.append("fecha < %s")
+        parametros.append(fecha_hasta)
+
+    if condiciones:
+        where_sql = "WHERE " + " AND ".join(condiciones)
+    else:
+        where_sql = ""
+
+    # Bloquea escrituras mientras se recalcula el rango para que
+    # ningún trigger aplique diferencias sobre filas a medio reconstruir.
+    cursor.execute("LOCK TABLE ventas, gastos IN SHARE MODE;")
+
+    cursor.execute(
+        f"DELETE FROM resumen_diario {where_sql};",
+        tuple(parametros)
+    )
+
+    cursor.execute(f"""
+        INSERT INTO resumen_diario (
+            farmacia_id,
+            fecha,
+            ventas_totales,
+            venta_tarjeta,
+            venta_efectivo,
+            gastos_fijos,
+            gastos_variables,
+            gastos_total,
+            registros_ventas,
+            registros_gastos,
+            actualizado_en
+        )
+        SELECT
+            diario.*,
+            NOW()
+        FROM ({SQL_DIARIO.format(where_sql=where_sql)}) diario;
+    """, tuple(parametros + parametros))
+
+    return cursor.rowcount
+
+
+def reconstruir_resumen_diario(conn, fecha_desde=None, fecha_hasta=None):
+    """
+    Recalcula resumen_diario desde ventas y gastos en el rango
+    [fecha_desde, fecha_hasta). Sin fechas recalcula todo.
+    Devuelve el número de filas (farmacia, día) escritas.
+    """
+
+    cursor = conn.cursor()
+
+    try:
+        filas = _reconstruir(cursor, fecha_desde, fecha_hasta)
+        conn.commit()
+        return filas
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        cursor.close()
+
+
+# ===============================
+# LECTURA
+# ===============================
+
+def cargar_resumen_diario(
+    conn,
+    fecha_inicio=None,
+    fecha_fin=None,
+    farmacias=None,
+    solo_ventas=False,
+    filtro=None
+):
+    """
+    Filas de resumen_diario con el nombre y estado de la farmacia.
+
+    - fecha_inicio / fecha_fin: rango medio abierto [inicio, fin)
+    - farmacias: lista de nombres; None para todas
+    - solo_ventas: solo días con al menos una venta registrada
+    - filtro: FiltroSQL con más condiciones sobre r (resumen_diario)
+      y f (farmacias)
+    """
+
+    condiciones = []
+    parametros = []
+
+    if filtro is not None:
+        condiciones.extend(filtro.condiciones)
+        parametros.extend(filtro.parametros)
+
+    if farmacias is not None:
+        condiciones.append("f.nombre = ANY(%s)")
+        parametros.append(list(farmacias))
+
+    if fecha_inicio is not None:
+        condiciones.append("r.fecha >= %s")
+        parametros.append(fecha_inicio)
+
+    if fecha_fin is not None:
+        condiciones.append("r.fecha < %s")
+        parametros.append(fecha_fin)
+
+    if solo_ventas:
+        condiciones.append("r.registros_ventas > 0")
+
+    if condiciones:
+        where_sql = "WHERE " + " AND ".join(condiciones)
+    else:
+        where_sql = ""
+
+    df = pd.read_sql(f"""
+        SELECT
+            r.farmacia_id,
+            f.nombre AS farmacia,
+            f.estado AS estado_farmacia,
+            r.fecha,
+            r.ventas_totales,
+            r.venta_tarjeta,
+            r.venta_efectivo,
+            r.gastos_fijos,
+            r.gastos_variables,
+            r.gastos_total,
+            r.registros_ventas,
+            r.registros_gastos
+        FROM {origen_resumen_diario()} r
+        JOIN farmacias f
+            ON r.farmacia_id = f.farmacia_id
+        {where_sql}
+        ORDER BY r.fecha, f.nombre;
+    """, conn, params=tuple(parametros))
+
+    df["fecha"] = pd.to_datetime(
+        df["fecha"],
+        errors="coerce"
+    )
+
+    columnas_numericas = [
+        "ventas_totales",
+        "venta_tarjeta",
+        "venta_efectivo",
+        "gastos_fijos",
+        "gastos_variables",
+        "gastos_total"
+    ]
+
+    for columna in columnas_numericas:
+        df[columna] = pd.to_numeric(
+            df[columna],
+            errors="coerce"
+        ).fillna(0)
+
+    return df
+
+
+# ===============================
+# LÍNEA DE COMANDOS
+# ===============================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Reconstruye la tabla resumen_diario desde ventas y gastos."
+    )
+
+    parser.add_argument(
+        "--desde",
+        type=date.fromisoformat,
+        help="Fecha inicial incluida (AAAA-MM-DD)."
+    )
+
+    parser.add_argument(
+        "--hasta",
+        type=date.fromisoformat,
+        help="Fecha final excluida (AAAA-MM-DD)."
+    )
+
+    args = parser.parse_args()
+
+    from utils.conexionASupabase import obtener_conexion
+
+    with obtener_conexion() as conn:
+
+        filas = reconstruir_resumen_diario(
+            conn,
+            args.desde,
+            args.hasta
+        )
+
+    print(f"resumen_diario reconstruido: {filas} filas.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Sesiones recordadas ("Recordarme") sin volver a pasar por bcrypt.
+
+Al iniciar sesión con "Recordarme" se guarda en una cookie un token
+firmado con HMAC-SHA256:
+
+    usuario_id.sesion_version.expira.firma
+
+Al recargar el navegador session_state está vacío; si la cookie es
+válida (firma, vencimiento) se busca al usuario por su llave primaria y
+la sesión se restaura sin bcrypt.checkpw. usuarios.sesion_version se
+incrementa al modificar o desactivar un usuario en Configuración, así
+los tokens emitidos antes dejan de servir.
+
+La cookie no es HttpOnly: Streamlit no deja agregar encabezados
+Set-Cookie a la respuesta al ejecutarse con streamlit run, así que se
+escribe desde JavaScript y cualquier script de la página puede leerla.
+Un XSS en la app filtraría el token. Para acotar el daño dura poco
+(DIAS_DEFAULT, nunca más de DIAS_MAXIMO aunque sesion_dias pida más),
+va con SameSite=Strict y Secure bajo https, y se revoca al modificar o
+desactivar al usuario.
+
+Es opcional: sin session_secret en st.secrets, o mientras la migración
+0006 (usuarios.sesion_version) no esté aplicada, no se ofrece.
+"""
+
+import hashlib
+import hmac
+import json
+import time
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from utils.migraciones import migracion_aplicada
+
+
+# ===============================
+# CONFIGURACIÓN
+# ===============================
+
+NOMBRE_COOKIE = "farmacias_sesion"
+DIAS_DEFAULT = 1
+DIAS_MAXIMO = 2
+
+# Claves de session_state
+CLAVE_COOKIE_PENDIENTE = "sesion_cookie_pendiente"
+CLAVE_SESION_CERRADA = "sesion_cerrada"
+
+# Migración que agrega usuarios.sesion_version
+MIGRACION_SESIONES = 6
+
+
+def _secreto(clave, default):
+    try:
+        return st.secrets.get(clave, default)
+    except Exception:
+        return default
+
+
+def _llave():
+    secreto = _secreto("session_secret", None)
+    return str(secreto).encode() if secreto else None
+
+
+def _dias():
+    return min(float(_secreto("sesion_dias", DIAS_DEFAULT)), DIAS_MAXIMO)
+
+
+def recordar_disponible():
+    return _llave() is not None and migracion_aplicada(MIGRACION_SESIONES)
+
+
+# ===============================
+# REVOCACIÓN
+# ===============================
+
+def revocar_sesiones(cursor, usuario_id):
+    """
+    Invalida los tokens del usuario. Llamar dentro de la transacción
+    que lo modifica, antes del commit. Sin la migración de la columna
+    no hay tokens emitidos y no hay nada que revocar.
+    """
+
+    if not migracion_aplicada(MIGRACION_SESIONES):
+        return
+
+    cursor.execute("""
+        UPDATE usuarios
+        SET sesion_version = sesion_version + 1
+        WHERE usuario_id = %s
+    """, (usuario_id,))
+
+
+# ===============================
+# TOKEN
+# ===============================
+
+def _firma(llave, contenido):
+    return hmac.new(llave, contenido.encode(), hashlib.sha256).hexdigest()
+
+
+def crear_token(usuario_id, sesion_version, dias=None):
+    llave = _llave()
+
+    if llave is None:
+        return None
+
+    if dias is None:
+        dias = _dias()
+
+    expira = int(time.time() + dias * 86400)
+    contenido = f"{int(usuario_id)}.{int(sesion_version)}.{expira}"
+
+    return f"{contenido}.{_firma(llave, contenido)}"
+
+
+def leer_token(token):
+    """
+    (usuario_id, sesion_version) si la firma es válida y no ha vencido;
+    None en cualquier otro caso.
+    """
+
+    llave = _llave()
+
+    if llave is None or not token:
+        return None
+
+    try:
+        contenido, firma = token.rsplit(".", 1)
+        usuario_id, sesion_version, expira = (int(x) for x in contenido.split("."))
+
+    except ValueError:
+        return None
+
+    if not hmac.compare_digest(firma, _firma(llave, contenido)):
+        return None
+
+    if expira < time.time():
+        return None
+
+    return usuario_id, sesion_version
+
+
+# ===============================
+# COOKIE
+# ===============================
+
+def _programar_cookie(valor, max_age):
+    st.session_state[CLAVE_COOKIE_PENDIENTE] = (valor, max_age)
+
+
+def aplicar_cookie():
+    """
+    Escribe o borra la cookie pendiente. Streamlit no tiene una API
+    para escribir cookies; se hace desde un componente sin altura, por
+    eso no puede llevar HttpOnly (ver el docstring del módulo).
+    Se llama en cada rerun desde streamlit_app.py.
+    """
+
+    pendiente = st.session_state.pop(CLAVE_COOKIE_PENDIENTE, None)
+
+    if pendiente is None:
+        return
+
+    valor, max_age = pendiente
+
+    components.html(f"""
+        <script>
+        const doc = window.parent.document;
+        const seguro = window.parent.location.protocol === "https:" ? "; Secure" : "";
+        doc.cookie = {json.dumps(NOMBRE_COOKIE)} + "=" + {json.dumps(valor)}
+            + "; Max-Age=" + {int(max_age)} + "; Path=/; SameSite=Strict" + seguro;
+        </script>
+    """, height=0)
+
+
+def recordar_sesion(conn, usuario_id):
+    """
+    Emite el token del usuario que acaba de iniciar sesión.
+    """
+
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            SELECT sesion_version
+            FROM usuarios
+            WHERE usuario_id = %s
+        """, (usuario_id,))
+
+        fila = cursor.fetchone()
+
+    finally:
+        cursor.close()
+
+    token = crear_token(usuario_id, fila[0]) if fila else None
+
+    if token:
+        _programar_cookie(token, _dias() * 86400)
+
+
+def olvidar_sesion():
+    """
+    Al cerrar sesión (después de limpiar session_state): borra la cookie
+    y evita que este mismo navegador la vuelva a usar, porque
+    st.context.cookies conserva los valores de cuando se abrió.
+    """
+
+    st.session_state[CLAVE_SESION_CERRADA] = True
+    _programar_cookie("", 0)
+
+
+def restaurar_sesion():
+    """
+    Si no hay usuario en la sesión y la cookie es válida, restaura la
+    sesión con una consulta por llave primaria. Devuelve True si lo hizo.
+    """
+
+    if "usuario" in st.session_state or st.session_state.get(CLAVE_SESION_CERRADA):
+        return False
+
+    if not recordar_disponible():
+        return False
+
+    try:
+        token = st.context.cookies.get(NOMBRE_COOKIE)
+    except Exception:
+        return False
+
+    datos = leer_token(token)
+
+    if datos is None:
+        return False
+
+    usuario_id, sesion_version = datos
+
+    from utils.conexionASupabase import obtener_conexion
+    from utils.permisos import calcular_paginas_visibles
+
+    with obtener_conexion() as conn:
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+                SELECT nombre, rol
+                FROM usuarios
+                WHERE usuario_id = %s
+                AND activo = TRUE
+                AND sesion_version = %s
+            """, (usuario_id, sesion_version))
+
+            fila = cursor.fetchone()
+
+        finally:
+            cursor.close()
+
+        if fila is None:
+            # Usuario desactivado, eliminado o modificado: token revocado.
+            _programar_cookie("", 0)
+            return False
+
+        st.session_state["usuario"] = {
+            "id": usuario_id,
+            "nombre": fila[0],
+            "rol": fila[1]
+        }
+
+        calcular_paginas_visibles(conn)
+
+    return True